@@ -3,9 +3,16 @@
 Implementa JWT tokens, hash de passwords y validaciones de seguridad
 """
 
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional, Union
+import asyncio
+import hashlib
+import logging
 import os
+import threading
+import time
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
@@ -13,6 +20,9 @@ from passlib.context import CryptContext
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 from .database import get_db
+from .ventanas import abrir_estado_compartido, SECURITY_STATE_DB
+
+logger = logging.getLogger(__name__)
 
 # ===================================================
 # 🔧 CONFIGURACIÓN DE SEGURIDAD
@@ -23,12 +33,20 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
-# Context para hash de passwords
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Context para hash de passwords (coste calibrable con calibrar_bcrypt.py)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+# Executor dedicado para bcrypt: hilos acotados y cola máxima (más allá se rechaza con 503)
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", "2"))
+BCRYPT_MAX_PENDING = int(os.getenv("BCRYPT_MAX_PENDING", "16"))
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# Tokens verificados que se recuerdan (LRU) para no repetir firma + modelo en cada request
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "1024"))
+
 # ===================================================
 # 📋 MODELOS PYDANTIC
 # ===================================================
@@ -61,6 +79,53 @@ def get_password_hash(password: str) -> str:
     """Genera hash de la contraseña"""
     return pwd_context.hash(password)
 
+# ===================================================
+# 🧵 BCRYPT FUERA DEL EVENT LOOP
+# ===================================================
+
+class EjecutorAcotado:
+    """ThreadPoolExecutor acotado para trabajo bloqueante (bcrypt libera el GIL, LDAP espera red).
+
+    Como mucho `max_pendientes` tareas en curso o en cola; las siguientes se rechazan al
+    instante con 503 en vez de acumular latencia para todos.
+    """
+
+    def __init__(self, nombre: str, workers: int, max_pendientes: int, detalle_saturado: str):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=nombre)
+        self.max_pendientes = max_pendientes
+        self.detalle_saturado = detalle_saturado
+        self._pendientes = 0
+        self._lock = threading.Lock()
+        self.rechazadas = 0
+
+    async def ejecutar(self, funcion, *args):
+        with self._lock:
+            if self._pendientes >= self.max_pendientes:
+                self.rechazadas += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail=self.detalle_saturado,
+                    headers={"Retry-After": "1"},
+                )
+            self._pendientes += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, funcion, *args)
+        finally:
+            with self._lock:
+                self._pendientes -= 1
+
+    def estadisticas(self) -> dict:
+        return {"pendientes": self._pendientes, "max_pendientes": self.max_pendientes, "rechazadas": self.rechazadas}
+
+ejecutor_bcrypt = EjecutorAcotado(
+    "bcrypt", BCRYPT_WORKERS, BCRYPT_MAX_PENDING,
+    "Demasiados inicios de sesión simultáneos, reintente en unos segundos"
+)
+
+async def verify_password_async(plain_password: str, hashed_password: str):
+    """(válida, hash nuevo o None). El hash nuevo aparece si cambió BCRYPT_ROUNDS o el esquema."""
+    return await ejecutor_bcrypt.ejecutar(pwd_context.verify_and_update, plain_password, hashed_password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Crea un token JWT de acceso"""
     to_encode = data.copy()
@@ -69,7 +134,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire})
+    # iat permite revocar todos los tokens de un usuario emitidos antes de cierto momento
+    to_encode.update({"exp": expire, "iat": datetime.utcnow()})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -101,15 +167,233 @@ def get_user(username: str):
         user_dict = fake_users_db[username]
         return UserInDB(**user_dict)
 
+def actualizar_hash(username: str, hashed_password: str):
+    """Guarda el hash recalculado con el coste actual (rehash transparente al hacer login)"""
+    if username in fake_users_db:
+        fake_users_db[username]["hashed_password"] = hashed_password
+        logger.info(f"🔐 Hash de {username} actualizado a {BCRYPT_ROUNDS} rondas")
+
 def authenticate_user(username: str, password: str):
     """Autentica usuario verificando credenciales"""
     user = get_user(username)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    valida, nuevo_hash = pwd_context.verify_and_update(password, user.hashed_password)
+    if not valida:
+        return False
+    if nuevo_hash:
+        actualizar_hash(username, nuevo_hash)
+    return user
+
+async def authenticate_user_async(username: str, password: str):
+    """Igual que authenticate_user, con bcrypt en el executor dedicado (para handlers async)
+
+    Hoy ningún endpoint la usa: el login de main.py está desactivado y es contra LDAP.
+    """
+    user = get_user(username)
+    if not user:
+        return False
+    valida, nuevo_hash = await verify_password_async(password, user.hashed_password)
+    if not valida:
         return False
+    if nuevo_hash:
+        actualizar_hash(username, nuevo_hash)
     return user
 
+# ===================================================
+# ⚡ CACHÉ DE TOKENS VERIFICADOS
+# ===================================================
+
+class RevocacionesMemoria:
+    """Lista negra de tokens y revocaciones por usuario en el propio worker"""
+
+    def __init__(self):
+        self._tokens = {}     # digest -> exp
+        self._usuarios = {}   # username -> segundo (int, como iat)
+        self._lock = threading.Lock()
+
+    def revocar_token(self, digest: bytes, exp: float, ahora: float):
+        with self._lock:
+            # Purga de entradas vencidas de la lista negra
+            for vencido in [d for d, e in self._tokens.items() if e <= ahora]:
+                del self._tokens[vencido]
+            self._tokens[digest] = exp
+
+    def revocar_usuario(self, username: str, desde: int):
+        with self._lock:
+            # Pasado un tiempo de vida de token, todo lo emitido antes de `desde` ya expiró
+            limite = desde - ACCESS_TOKEN_EXPIRE_MINUTES * 60
+            for viejo in [u for u, d in self._usuarios.items() if d < limite]:
+                del self._usuarios[viejo]
+            self._usuarios[username] = desde
+
+    def esta_revocado(self, digest: bytes, username: str, iat: Optional[float]) -> bool:
+        with self._lock:
+            if digest in self._tokens:
+                return True
+            desde = self._usuarios.get(username)
+            return desde is not None and (iat is None or iat < desde)
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {"backend": "memoria", "tokens": len(self._tokens), "usuarios": len(self._usuarios)}
+
+class RevocacionesSQLite:
+    """Las mismas listas en el fichero SECURITY_STATE_DB: una revocación vale en todos los workers.
+
+    esta_revocado() es una lectura por clave primaria en WAL (no espera a los escritores),
+    así que se puede consultar en cada request, también con el token ya en caché.
+    """
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._local = threading.local()
+        conexion = self._conexion()
+        conexion.execute(
+            "CREATE TABLE IF NOT EXISTS tokens_revocados (digest BLOB PRIMARY KEY, exp REAL NOT NULL) WITHOUT ROWID"
+        )
+        conexion.execute(
+            "CREATE TABLE IF NOT EXISTS usuarios_revocados (username TEXT PRIMARY KEY, desde INTEGER NOT NULL) WITHOUT ROWID"
+        )
+
+    def _conexion(self):
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is None:
+            conexion = self._local.conexion = abrir_estado_compartido(self.ruta)
+        return conexion
+
+    def revocar_token(self, digest: bytes, exp: float, ahora: float):
+        conexion = self._conexion()
+        conexion.execute("DELETE FROM tokens_revocados WHERE exp <= ?", (ahora,))
+        conexion.execute(
+            "INSERT INTO tokens_revocados (digest, exp) VALUES (?, ?) "
+            "ON CONFLICT (digest) DO UPDATE SET exp = excluded.exp", (digest, exp)
+        )
+
+    def revocar_usuario(self, username: str, desde: int):
+        conexion = self._conexion()
+        conexion.execute("DELETE FROM usuarios_revocados WHERE desde < ?",
+                         (desde - ACCESS_TOKEN_EXPIRE_MINUTES * 60,))
+        conexion.execute(
+            "INSERT INTO usuarios_revocados (username, desde) VALUES (?, ?) "
+            "ON CONFLICT (username) DO UPDATE SET desde = MAX(desde, excluded.desde)", (username, desde)
+        )
+
+    def esta_revocado(self, digest: bytes, username: str, iat: Optional[float]) -> bool:
+        token, desde = self._conexion().execute(
+            "SELECT EXISTS (SELECT 1 FROM tokens_revocados WHERE digest = ?), "
+            "(SELECT desde FROM usuarios_revocados WHERE username = ?)", (digest, username)
+        ).fetchone()
+        return bool(token) or (desde is not None and (iat is None or iat < desde))
+
+    def estadisticas(self) -> dict:
+        tokens, usuarios = self._conexion().execute(
+            "SELECT (SELECT COUNT(*) FROM tokens_revocados), (SELECT COUNT(*) FROM usuarios_revocados)"
+        ).fetchone()
+        return {"backend": "sqlite", "ruta": self.ruta, "tokens": tokens, "usuarios": usuarios}
+
+class CacheTokens:
+    """LRU acotado: sha256(token) -> usuario resuelto, válido hasta el exp del token.
+
+    Revocación: revocar_token() lo mete en una lista negra hasta su exp; revocar_usuario()
+    rechaza los tokens emitidos antes del segundo de la revocación. Las listas viven en
+    `revocaciones` (compartidas entre workers con SECURITY_STATE_DB) y se consultan también
+    en cada acierto de la caché, así un worker no sigue sirviendo un token revocado en otro.
+    """
+
+    def __init__(self, capacidad: int = TOKEN_CACHE_SIZE, revocaciones=None):
+        self.capacidad = capacidad
+        self.revocaciones = revocaciones or RevocacionesMemoria()
+        self._entradas = OrderedDict()   # digest -> (usuario, exp, username, iat)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expulsiones = 0
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def obtener(self, digest: bytes):
+        with self._lock:
+            entrada = self._entradas.get(digest)
+            if entrada is not None and entrada[1] <= time.time():
+                del self._entradas[digest]
+                entrada = None
+            if entrada is None:
+                self.misses += 1
+                return None
+        # Fuera del lock: con SECURITY_STATE_DB es una consulta al fichero compartido
+        if self.revocaciones.esta_revocado(digest, entrada[2], entrada[3]):
+            with self._lock:
+                self._entradas.pop(digest, None)
+                self.misses += 1
+            return None
+        with self._lock:
+            if digest in self._entradas:
+                self._entradas.move_to_end(digest)
+            self.hits += 1
+        return entrada[0]
+
+    def guardar(self, digest: bytes, usuario, exp: float, username: str, iat: Optional[float] = None):
+        with self._lock:
+            self._entradas[digest] = (usuario, exp, username, iat)
+            self._entradas.move_to_end(digest)
+            while len(self._entradas) > self.capacidad:
+                self._entradas.popitem(last=False)
+                self.expulsiones += 1
+
+    def esta_revocado(self, digest: bytes, username: str, iat: Optional[float]) -> bool:
+        return self.revocaciones.esta_revocado(digest, username, iat)
+
+    def revocar_token(self, token: str, exp: Optional[float] = None):
+        """Invalida un token concreto (logout) hasta que expire"""
+        digest = self.digest(token)
+        ahora = time.time()
+        with self._lock:
+            entrada = self._entradas.pop(digest, None)
+        if exp is None:
+            exp = entrada[1] if entrada else ahora + ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        self.revocaciones.revocar_token(digest, exp, ahora)
+
+    def revocar_usuario(self, username: str):
+        """Rechaza todos los tokens del usuario emitidos hasta ahora (cambio de contraseña, baja)
+
+        iat va en segundos enteros: se guarda el segundo actual y se rechaza lo anterior, así
+        el token emitido justo después (p. ej. el nuevo login) no cae con la revocación.
+        """
+        self.revocaciones.revocar_usuario(username, int(time.time()))
+        self.invalidar_usuario(username)
+
+    def invalidar_usuario(self, username: str):
+        """Olvida los usuarios cacheados (p. ej. tras cambiar sus datos) sin revocar tokens"""
+        with self._lock:
+            for digest in [d for d, entrada in self._entradas.items() if entrada[2] == username]:
+                del self._entradas[digest]
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            consultas = self.hits + self.misses
+            datos = {
+                "entradas": len(self._entradas),
+                "capacidad": self.capacidad,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / consultas, 4) if consultas else 0,
+                "expulsiones": self.expulsiones,
+            }
+        datos["revocados"] = self.revocaciones.estadisticas()
+        return datos
+
+# Revocaciones compartidas por los workers del nodo si SECURITY_STATE_DB está definido
+cache_tokens = CacheTokens(
+    revocaciones=RevocacionesSQLite(SECURITY_STATE_DB) if SECURITY_STATE_DB else RevocacionesMemoria()
+)
+
 # ===================================================
 # 🔐 DEPENDENCIAS DE AUTENTICACIÓN
 # ===================================================
@@ -122,6 +406,12 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         headers={"WWW-Authenticate": "Bearer"},
     )
     
+    # Token ya verificado y no vencido: sin criptografía ni construcción del modelo
+    digest = cache_tokens.digest(token)
+    user = cache_tokens.obtener(digest)
+    if user is not None:
+        return user
+    
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
@@ -131,9 +421,14 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     except JWTError:
         raise credentials_exception
     
+    if cache_tokens.esta_revocado(digest, token_data.username, payload.get("iat")):
+        raise credentials_exception
+    
     user = get_user(username=token_data.username)
     if user is None:
         raise credentials_exception
+    if payload.get("exp") is not None:
+        cache_tokens.guardar(digest, user, payload["exp"], token_data.username, payload.get("iat"))
     return user
 
 async def get_current_active_user(current_user: User = Depends(get_current_user)):
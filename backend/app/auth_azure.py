@@ -1,39 +1,133 @@
+import asyncio
+import logging
 import os
+import time
 from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import JSONResponse
-from jose import jwt, JWTError
-import requests
+from jose import jwt, jwk, JWTError
+import httpx
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 AZURE_TENANT_ID = os.getenv("AZURE_AD_TENANT_ID", "<tenant-id>")
 AZURE_CLIENT_ID = os.getenv("AZURE_AD_CLIENT_ID", "<client-id>")
-AZURE_OPENID_CONFIG_URL = f"https://login.microsoftonline.com/{AZURE_TENANT_ID}/v2.0/.well-known/openid-configuration"
+AZURE_OPENID_CONFIG_URL = os.getenv(
+    "AZURE_OPENID_CONFIG_URL",
+    f"https://login.microsoftonline.com/{AZURE_TENANT_ID}/v2.0/.well-known/openid-configuration"
+)
+AZURE_ISSUER = os.getenv("AZURE_ISSUER", f"https://login.microsoftonline.com/{AZURE_TENANT_ID}/v2.0")
 
-# Obtener las claves públicas de Azure AD
-def get_azure_jwks():
-    resp = requests.get(AZURE_OPENID_CONFIG_URL)
-    jwks_uri = resp.json()["jwks_uri"]
-    keys = requests.get(jwks_uri).json()
-    return keys
+# Caché de claves: TTL normal y mínimo entre descargas (kid desconocido no dispara más de una por intervalo)
+AZURE_JWKS_TTL_S = float(os.getenv("AZURE_JWKS_TTL_S", "3600"))
+AZURE_JWKS_MIN_REFRESH_S = float(os.getenv("AZURE_JWKS_MIN_REFRESH_S", "60"))
+AZURE_JWKS_HTTP_TIMEOUT_S = float(os.getenv("AZURE_JWKS_HTTP_TIMEOUT_S", "5"))
+
+# ===================================================
+# 🔑 CACHÉ DE CLAVES PÚBLICAS (JWKS)
+# ===================================================
+
+class CacheJWKS:
+    """Claves públicas de Azure AD por kid, descargadas con httpx async.
+
+    - Se refrescan al vencer el TTL o cuando llega un token con kid desconocido
+      (rotación de claves), como mucho una vez cada `intervalo_minimo` segundos.
+    - Cada JWK se parsea una sola vez: si no cambia entre descargas se reutiliza la clave.
+    - Si una descarga falla se siguen usando las claves anteriores.
+    """
+
+    def __init__(self, openid_config_url: str, ttl: float = AZURE_JWKS_TTL_S,
+                 intervalo_minimo: float = AZURE_JWKS_MIN_REFRESH_S, timeout: float = AZURE_JWKS_HTTP_TIMEOUT_S):
+        self.openid_config_url = openid_config_url
+        self.ttl = ttl
+        self.intervalo_minimo = intervalo_minimo
+        self.timeout = timeout
+        self._jwks_uri = None
+        self._jwks = {}     # kid -> JWK (dict) tal como lo publica Azure
+        self._claves = {}   # kid -> (clave parseada, algoritmo)
+        self._cargado_en = None
+        self._ultimo_intento = None
+        self._lock = asyncio.Lock()
+        self.descargas = 0
+
+    def _caducado(self) -> bool:
+        return self._cargado_en is None or time.monotonic() - self._cargado_en > self.ttl
+
+    async def obtener_clave(self, kid: str):
+        """(clave, algoritmo) para el kid, o None si Azure no la publica"""
+        if self._caducado() or kid not in self._claves:
+            await self.refrescar()
+        return self._claves.get(kid)
+
+    async def refrescar(self):
+        async with self._lock:
+            # Otro request ya refrescó mientras esperábamos, o estamos dentro del intervalo mínimo
+            ahora = time.monotonic()
+            if self._ultimo_intento is not None and ahora - self._ultimo_intento < self.intervalo_minimo:
+                return
+            self._ultimo_intento = ahora
+
+            try:
+                async with httpx.AsyncClient(timeout=self.timeout) as cliente:
+                    if self._jwks_uri is None:
+                        respuesta = await cliente.get(self.openid_config_url)
+                        respuesta.raise_for_status()
+                        self._jwks_uri = respuesta.json()["jwks_uri"]
+                    respuesta = await cliente.get(self._jwks_uri)
+                    respuesta.raise_for_status()
+                    claves_publicadas = respuesta.json()["keys"]
+            except (httpx.HTTPError, ValueError, KeyError) as e:
+                logger.warning(f"⚠️ No se pudo descargar el JWKS de Azure AD: {e}")
+                return
+
+            self.descargas += 1
+            jwks, claves = {}, {}
+            for clave in claves_publicadas:
+                kid = clave.get("kid")
+                if not kid:
+                    continue
+                jwks[kid] = clave
+                if self._jwks.get(kid) == clave:
+                    claves[kid] = self._claves[kid]
+                    continue
+                algoritmo = clave.get("alg", "RS256")  # Azure no siempre publica "alg"
+                try:
+                    claves[kid] = (jwk.construct(clave, algorithm=algoritmo), algoritmo)
+                except JWTError as e:
+                    logger.warning(f"⚠️ Clave JWKS {kid} ignorada: {e}")
+            self._jwks, self._claves = jwks, claves
+            self._cargado_en = time.monotonic()
+
+cache_jwks = CacheJWKS(AZURE_OPENID_CONFIG_URL)
+
+# ===================================================
+# ✅ VALIDACIÓN DE TOKENS
+# ===================================================
+
+def decodificar_token(token: str, clave, algoritmo: str) -> dict:
+    """Verificación pura (CPU): firma, audiencia, emisor y expiración"""
+    return jwt.decode(
+        token,
+        clave,
+        algorithms=[algoritmo],
+        audience=AZURE_CLIENT_ID,
+        issuer=AZURE_ISSUER
+    )
 
 # Validar el token de Azure AD
-def verify_azure_token(token: str):
-    keys = get_azure_jwks()
+async def verify_azure_token(token: str, cache: CacheJWKS = cache_jwks):
     try:
         unverified_header = jwt.get_unverified_header(token)
-        for key in keys["keys"]:
-            if key["kid"] == unverified_header["kid"]:
-                public_key = jwt.algorithms.RSAAlgorithm.from_jwk(key)
-                payload = jwt.decode(
-                    token,
-                    public_key,
-                    algorithms=[key["alg"]],
-                    audience=AZURE_CLIENT_ID,
-                    issuer=f"https://login.microsoftonline.com/{AZURE_TENANT_ID}/v2.0"
-                )
-                return payload
+    except JWTError as e:
+        raise HTTPException(status_code=401, detail=f"Token inválido: {str(e)}")
+
+    encontrada = await cache.obtener_clave(unverified_header.get("kid"))
+    if encontrada is None:
         raise HTTPException(status_code=401, detail="No matching key found")
+
+    clave, algoritmo = encontrada
+    try:
+        return decodificar_token(token, clave, algoritmo)
     except JWTError as e:
         raise HTTPException(status_code=401, detail=f"Token inválido: {str(e)}")
 
@@ -43,5 +137,5 @@ async def auth_azure(request: Request):
     token = data.get("token")
     if not token:
         raise HTTPException(status_code=400, detail="Token requerido")
-    user_info = verify_azure_token(token)
-    return JSONResponse(content={"user": user_info}) 
\ No newline at end of file
+    user_info = await verify_azure_token(token)
+    return JSONResponse(content={"user": user_info})
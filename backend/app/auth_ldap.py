@@ -1,12 +1,26 @@
 """
 🔐 Módulo de Autenticación LDAP/Active Directory
 Valida credenciales corporativas contra el servidor LDAP de la empresa
+
+- Un único Server por proceso: la info/esquema del directorio se lee una vez
+- Bind del usuario solo para validar la contraseña (sin releer info del servidor)
+- Búsqueda de atributos con una cuenta de servicio en un pool de conexiones
+- Atributos cacheados por usuario con TTL
+- authenticate_ldap_user_async ejecuta todo en un pool de hilos acotado (la usa el login de
+  main.py, hoy comentado hasta configurar el Active Directory)
 """
 
 import os
-from ldap3 import Server, Connection, ALL, NTLM
+import queue
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from ldap3 import Server, Connection, ALL, NONE, NTLM, SIMPLE, RESTARTABLE
+from ldap3.utils.conv import escape_filter_chars
 from fastapi import HTTPException, status
 import logging
+from .auth import EjecutorAcotado
 
 # Configuración LDAP desde variables de entorno
 LDAP_SERVER = os.getenv("LDAP_SERVER", "ldap://tu-servidor-ad.empresa.com")
@@ -14,80 +28,219 @@ LDAP_DOMAIN = os.getenv("LDAP_DOMAIN", "EMPRESA")
 LDAP_BASE_DN = os.getenv("LDAP_BASE_DN", "DC=empresa,DC=com")
 LDAP_USER_SEARCH_BASE = os.getenv("LDAP_USER_SEARCH_BASE", "OU=Users,DC=empresa,DC=com")
 
+# NTLM contra AD; SIMPLE para directorios de prueba (usuario = LDAP_BIND_FORMAT)
+LDAP_AUTH = os.getenv("LDAP_AUTH", "NTLM").upper()
+LDAP_BIND_FORMAT = os.getenv("LDAP_BIND_FORMAT", "{domain}\\{username}")
+
+# Cuenta de servicio para la búsqueda de atributos (sin ella se busca con la conexión del usuario)
+LDAP_SERVICE_USER = os.getenv("LDAP_SERVICE_USER", "")
+LDAP_SERVICE_PASSWORD = os.getenv("LDAP_SERVICE_PASSWORD", "")
+LDAP_POOL_SIZE = int(os.getenv("LDAP_POOL_SIZE", "4"))
+
+LDAP_CONNECT_TIMEOUT_S = float(os.getenv("LDAP_CONNECT_TIMEOUT_S", "5"))
+LDAP_CACHE_TTL_S = float(os.getenv("LDAP_CACHE_TTL_S", "900"))
+LDAP_CACHE_SIZE = int(os.getenv("LDAP_CACHE_SIZE", "2048"))
+LDAP_WORKERS = int(os.getenv("LDAP_WORKERS", "8"))
+LDAP_MAX_PENDING = int(os.getenv("LDAP_MAX_PENDING", "64"))
+
+ATRIBUTOS_USUARIO = ['displayName', 'mail', 'department', 'title']
+
 logger = logging.getLogger(__name__)
 
+# ===================================================
+# 🖥️ SERVIDOR Y POOL DE LA CUENTA DE SERVICIO
+# ===================================================
+
+_servidor = None
+_servidor_lock = threading.Lock()
+
+def get_servidor() -> Server:
+    """Server compartido; la info/esquema se descarga en la primera conexión de servicio"""
+    global _servidor
+    with _servidor_lock:
+        if _servidor is None:
+            _servidor = Server(LDAP_SERVER, get_info=ALL if LDAP_SERVICE_USER else NONE,
+                               connect_timeout=LDAP_CONNECT_TIMEOUT_S)
+        return _servidor
+
+def _autenticacion():
+    return NTLM if LDAP_AUTH == "NTLM" else SIMPLE
+
+class PoolLDAP:
+    """Conexiones de la cuenta de servicio ya enlazadas, reutilizadas entre logins.
+
+    RESTARTABLE reabre y re-enlaza sola si el servidor corta la conexión.
+    """
+
+    def __init__(self, tamano: int = LDAP_POOL_SIZE):
+        self.tamano = tamano
+        self._libres = queue.LifoQueue()
+        self._creadas = 0
+        self._lock = threading.Lock()
+
+    def _crear(self) -> Connection:
+        conexion = Connection(
+            get_servidor(),
+            user=LDAP_SERVICE_USER,
+            password=LDAP_SERVICE_PASSWORD,
+            authentication=_autenticacion(),
+            client_strategy=RESTARTABLE,
+            auto_bind=False
+        )
+        # Solo la primera conexión del proceso lee info/esquema del servidor
+        conexion.bind(read_server_info=get_servidor().info is None)
+        return conexion
+
+    @contextmanager
+    def conexion(self):
+        try:
+            conexion = self._libres.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                crear = self._creadas < self.tamano
+                if crear:
+                    self._creadas += 1
+            if crear:
+                try:
+                    conexion = self._crear()
+                except Exception:
+                    with self._lock:
+                        self._creadas -= 1
+                    raise
+            else:
+                conexion = self._libres.get(timeout=LDAP_CONNECT_TIMEOUT_S)
+
+        try:
+            yield conexion
+        except Exception:
+            # Conexión en estado dudoso: se descarta y el hueco queda libre
+            conexion.unbind()
+            with self._lock:
+                self._creadas -= 1
+            raise
+        else:
+            self._libres.put(conexion)
+
+pool_servicio = PoolLDAP()
+
+# ===================================================
+# ⚡ CACHÉ DE ATRIBUTOS POR USUARIO
+# ===================================================
+
+class CacheAtributos:
+    """username -> atributos del directorio, con TTL y tamaño acotado (LRU)"""
+
+    def __init__(self, ttl: float = LDAP_CACHE_TTL_S, capacidad: int = LDAP_CACHE_SIZE):
+        self.ttl = ttl
+        self.capacidad = capacidad
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def obtener(self, username: str):
+        with self._lock:
+            entrada = self._entradas.get(username)
+            if entrada is not None and entrada[0] > time.monotonic():
+                self._entradas.move_to_end(username)
+                self.hits += 1
+                return entrada[1]
+            self._entradas.pop(username, None)
+            self.misses += 1
+            return None
+
+    def guardar(self, username: str, atributos: dict):
+        with self._lock:
+            self._entradas[username] = (time.monotonic() + self.ttl, atributos)
+            self._entradas.move_to_end(username)
+            while len(self._entradas) > self.capacidad:
+                self._entradas.popitem(last=False)
+
+    def invalidar(self, username: str = None):
+        with self._lock:
+            if username is None:
+                self._entradas.clear()
+            else:
+                self._entradas.pop(username, None)
+
+    def estadisticas(self) -> dict:
+        return {"entradas": len(self._entradas), "hits": self.hits, "misses": self.misses}
+
+cache_atributos = CacheAtributos()
+
+ejecutor_ldap = EjecutorAcotado(
+    "ldap", LDAP_WORKERS, LDAP_MAX_PENDING,
+    "Servicio de autenticación corporativa saturado, reintente en unos segundos"
+)
+
+# ===================================================
+# 🔑 AUTENTICACIÓN
+# ===================================================
+
+def _buscar_atributos(conexion: Connection, username: str) -> dict:
+    conexion.search(
+        search_base=LDAP_USER_SEARCH_BASE,
+        search_filter=f"(sAMAccountName={escape_filter_chars(username)})",
+        attributes=ATRIBUTOS_USUARIO
+    )
+    if not conexion.entries:
+        return {}
+    entry = conexion.entries[0]
+    valores = {}
+    for atributo in ATRIBUTOS_USUARIO:
+        valor = entry[atributo].value if atributo in entry else None
+        valores[atributo] = str(valor) if valor else ""
+    return valores
+
+def _atributos_usuario(username: str, conexion_usuario: Connection = None) -> dict:
+    """Atributos desde la caché, o del directorio (pool de servicio o conexión del usuario)"""
+    atributos = cache_atributos.obtener(username)
+    if atributos is not None:
+        return atributos
+
+    if LDAP_SERVICE_USER:
+        with pool_servicio.conexion() as conexion:
+            atributos = _buscar_atributos(conexion, username)
+    elif conexion_usuario is not None:
+        atributos = _buscar_atributos(conexion_usuario, username)
+    else:
+        return {}
+    cache_atributos.guardar(username, atributos)
+    return atributos
+
 def authenticate_ldap_user(email: str, password: str) -> dict:
     """
     Autentica usuario contra Active Directory corporativo
-    
+
     Args:
         email: Email corporativo del usuario
         password: Contraseña corporativa del usuario
-    
+
     Returns:
         dict: Información del usuario si la autenticación es exitosa
-    
+
     Raises:
         HTTPException: Si las credenciales son inválidas
     """
+    # Extraer username del email (parte antes del @)
+    username = email.split('@')[0]
+    if not password:
+        # Un bind sin contraseña es un bind anónimo que "funciona": rechazarlo antes
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Credenciales corporativas inválidas"
+        )
+
     try:
-        # Extraer username del email (parte antes del @)
-        username = email.split('@')[0]
-        
-        # Formato de usuario para LDAP (DOMAIN\username)
-        ldap_user = f"{LDAP_DOMAIN}\\{username}"
-        
-        # Conectar al servidor LDAP
-        server = Server(LDAP_SERVER, get_info=ALL)
-        
-        # Intentar autenticación
+        # Bind del usuario solo para validar la contraseña (sin releer info del servidor)
         connection = Connection(
-            server, 
-            user=ldap_user, 
-            password=password, 
-            authentication=NTLM,
-            auto_bind=True
+            get_servidor(),
+            user=LDAP_BIND_FORMAT.format(domain=LDAP_DOMAIN, username=username),
+            password=password,
+            authentication=_autenticacion(),
+            auto_bind=False
         )
-        
-        if connection.bind():
-            # Buscar información adicional del usuario
-            search_filter = f"(sAMAccountName={username})"
-            connection.search(
-                search_base=LDAP_USER_SEARCH_BASE,
-                search_filter=search_filter,
-                attributes=['displayName', 'mail', 'department', 'title']
-            )
-            
-            user_info = {
-                "username": username,
-                "email": email,
-                "full_name": "Usuario Corporativo",
-                "department": "",
-                "title": "",
-                "disabled": False
-            }
-            
-            # Si se encontró información del usuario, usarla
-            if connection.entries:
-                entry = connection.entries[0]
-                user_info.update({
-                    "full_name": str(entry.displayName) if entry.displayName else username,
-                    "email": str(entry.mail) if entry.mail else email,
-                    "department": str(entry.department) if entry.department else "",
-                    "title": str(entry.title) if entry.title else ""
-                })
-            
-            connection.unbind()
-            logger.info(f"Autenticación LDAP exitosa para usuario: {username}")
-            return user_info
-            
-        else:
-            logger.warning(f"Falló autenticación LDAP para usuario: {username}")
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Credenciales corporativas inválidas"
-            )
-            
+        valido = connection.bind(read_server_info=False)
     except Exception as e:
         logger.error(f"Error en autenticación LDAP: {str(e)}")
         raise HTTPException(
@@ -95,10 +248,52 @@ def authenticate_ldap_user(email: str, password: str) -> dict:
             detail="Error de autenticación corporativa"
         )
 
+    try:
+        if not valido:
+            logger.warning(f"Falló autenticación LDAP para usuario: {username}")
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Credenciales corporativas inválidas"
+            )
+
+        user_info = {
+            "username": username,
+            "email": email,
+            "full_name": "Usuario Corporativo",
+            "department": "",
+            "title": "",
+            "disabled": False
+        }
+
+        try:
+            atributos = _atributos_usuario(username, connection)
+        except Exception as e:
+            # La contraseña ya es válida: sin atributos se sigue con los valores por defecto
+            logger.error(f"No se pudieron leer los atributos LDAP de {username}: {str(e)}")
+            atributos = {}
+
+        # Si se encontró información del usuario, usarla
+        if atributos:
+            user_info.update({
+                "full_name": atributos["displayName"] or username,
+                "email": atributos["mail"] or email,
+                "department": atributos["department"],
+                "title": atributos["title"]
+            })
+
+        logger.info(f"Autenticación LDAP exitosa para usuario: {username}")
+        return user_info
+    finally:
+        connection.unbind()
+
+async def authenticate_ldap_user_async(email: str, password: str) -> dict:
+    """authenticate_ldap_user en el pool de hilos acotado (no bloquea el event loop)"""
+    return await ejecutor_ldap.ejecutar(authenticate_ldap_user, email, password)
+
 def validate_corporate_email(email: str) -> bool:
     """
     Valida que el email sea del dominio corporativo
     """
     allowed_domains = os.getenv("ALLOWED_EMAIL_DOMAINS", "empresa.com").split(",")
     email_domain = email.split('@')[1] if '@' in email else ""
-    return email_domain.lower() in [domain.strip().lower() for domain in allowed_domains] 
\ No newline at end of file
+    return email_domain.lower() in [domain.strip().lower() for domain in allowed_domains]
@@ -0,0 +1,184 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, case, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from typing import Optional
+from ..models.indicador import Indicador, Hito, EstadisticaAgregada
+
+# Orden de los contadores (igual en el escaneo, en la tabla agregada y en _fila_estadisticas)
+CONTADORES = (
+    "totalIndicadores",
+    "totalHitos",
+    "hitosCompletados",
+    "hitosEnProgreso",
+    "hitosPorComenzar",
+    "sumaAvance",
+    "hitosConAvance",
+)
+
+# Estado del hito -> contador que incrementa
+CONTADOR_POR_ESTADO = {
+    "Completado": "hitosCompletados",
+    "En Progreso": "hitosEnProgreso",
+    "Por Comenzar": "hitosPorComenzar",
+}
+
+# Columnas por las que se puede desglosar el dashboard
+GRUPOS_ESTADISTICAS = ("vp", "area", "tipoIndicador")
+
+def _fila_estadisticas(total_indicadores, total_hitos, completados, en_progreso, por_comenzar, suma_avance, n_avance):
+    promedio_avance = (suma_avance or 0) / n_avance if n_avance else 0
+    return {
+        "totalIndicadores": total_indicadores or 0,
+        "totalHitos": total_hitos or 0,
+        "hitosCompletados": completados or 0,
+        "hitosEnProgreso": en_progreso or 0,
+        "hitosPorComenzar": por_comenzar or 0,
+        "promedioAvance": round(promedio_avance, 2)
+    }
+
+def _armar_respuesta(filas, agrupado: bool):
+    """Convierte filas (clave?, *contadores) en la respuesta del dashboard"""
+    if not agrupado:
+        return _fila_estadisticas(*filas[0])
+
+    totales = [sum(fila[i] or 0 for fila in filas) for i in range(1, len(CONTADORES) + 1)]
+    resultado = _fila_estadisticas(*totales)
+    resultado["grupos"] = [
+        {"clave": fila[0] or None, **_fila_estadisticas(*fila[1:])}
+        for fila in filas
+    ]
+    return resultado
+
+# ===================================================
+# 📊 LECTURA (tabla agregada, O(grupos))
+# ===================================================
+
+def get_estadisticas(db: Session, group_by: Optional[str] = None):
+    """Estadísticas del dashboard leídas de ``estadisticas_agregadas``.
+
+    Con ``group_by`` (vp, area o tipoIndicador) se añade el desglose en ``grupos``.
+    """
+    sumas = [func.coalesce(func.sum(getattr(EstadisticaAgregada, c)), 0) for c in CONTADORES]
+    if not group_by:
+        return _armar_respuesta([db.query(*sumas).one()], agrupado=False)
+
+    clave = getattr(EstadisticaAgregada, group_by)
+    filas = (
+        db.query(clave, *sumas)
+        .group_by(clave)
+        .having(func.sum(EstadisticaAgregada.totalIndicadores) > 0)
+        .order_by(clave)
+        .all()
+    )
+    return _armar_respuesta(filas, agrupado=True)
+
+# ===================================================
+# 🔎 ESCANEO COMPLETO (fuente de verdad)
+# ===================================================
+
+def _contar_estado(estado: str):
+    return func.coalesce(func.sum(case((Hito.estadoHito == estado, 1), else_=0)), 0)
+
+def _escanear(db: Session, claves):
+    """Un único recorrido de indicadores ⟕ hitos con agregación condicional"""
+    agregados = [
+        func.count(func.distinct(Indicador.id)),
+        func.count(Hito.id),
+        _contar_estado("Completado"),
+        _contar_estado("En Progreso"),
+        _contar_estado("Por Comenzar"),
+        func.coalesce(func.sum(Hito.avanceHito), 0),
+        func.count(Hito.avanceHito),
+    ]
+    query = db.query(*claves, *agregados)
+    query = query.select_from(Indicador).outerjoin(Hito, Hito.indicador_id == Indicador.id)
+    if claves:
+        query = query.group_by(*claves).order_by(*claves)
+    return query.all()
+
+def calcular_estadisticas(db: Session, group_by: Optional[str] = None):
+    """Mismo resultado que get_estadisticas pero recorriendo las tablas de origen"""
+    if not group_by:
+        return _armar_respuesta(_escanear(db, []), agrupado=False)
+    return _armar_respuesta(_escanear(db, [getattr(Indicador, group_by)]), agrupado=True)
+
+# ===================================================
+# ✏️ MANTENIMIENTO INCREMENTAL
+# ===================================================
+
+def clave_indicador(indicador) -> tuple:
+    return (indicador.vp or "", indicador.area or "", indicador.tipoIndicador or "")
+
+def contribucion(hitos) -> dict:
+    """Lo que aporta un indicador con estos hitos a los contadores"""
+    delta = dict.fromkeys(CONTADORES, 0)
+    delta["totalIndicadores"] = 1
+    delta["totalHitos"] = len(hitos)
+    for hito in hitos:
+        _sumar_hito(delta, hito.estadoHito, hito.avanceHito)
+    return delta
+
+def _sumar_hito(delta: dict, estado, avance, signo: int = 1):
+    contador = CONTADOR_POR_ESTADO.get(estado)
+    if contador:
+        delta[contador] += signo
+    if avance is not None:
+        delta["sumaAvance"] += signo * avance
+        delta["hitosConAvance"] += signo
+
+def delta_cambio_hito(delta: dict, antes: tuple, despues: tuple):
+    """Acumula en `delta` el efecto de pasar un hito de (estado, avance) `antes` a `despues`"""
+    _sumar_hito(delta, *antes, signo=-1)
+    _sumar_hito(delta, *despues)
+
+def insert_upsert(db: Session, tabla):
+    """INSERT con on_conflict_do_update para el dialecto de la sesión (PostgreSQL o SQLite)"""
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(tabla)
+    return sqlite.insert(tabla)
+
+def aplicar_contribucion(db: Session, clave: tuple, delta: dict, signo: int = 1):
+    """Suma (o resta con signo=-1) un delta a la fila de la clave, dentro de la transacción actual.
+
+    Un único INSERT ... ON CONFLICT DO UPDATE: dos escrituras concurrentes sobre una clave
+    nueva no chocan con uq_estadisticas_clave, la segunda suma sobre la fila de la primera.
+    """
+    vp, area, tipo = clave
+    valores = {c: signo * valor for c, valor in delta.items() if valor}
+    if not valores:
+        return
+
+    sentencia = insert_upsert(db, EstadisticaAgregada).values(vp=vp, area=area, tipoIndicador=tipo, **valores)
+    db.execute(sentencia.on_conflict_do_update(
+        index_elements=["vp", "area", "tipoIndicador"],
+        set_={c: getattr(EstadisticaAgregada, c) + getattr(sentencia.excluded, c) for c in valores}
+    ))
+
+def recalcular_estadisticas(db: Session) -> int:
+    """Reconstruye la tabla agregada desde cero (no hace commit). Devuelve el nº de grupos.
+
+    También sube la versión de datos: el ETag del dashboard depende solo de ella, así que
+    sin esto los clientes seguirían recibiendo 304 con los contadores anteriores.
+    """
+    from .version import incrementar_version  # version.py importa este módulo
+
+    db.flush()  # Incluir objetos pendientes de la transacción actual (autoflush desactivado)
+    claves = [func.coalesce(getattr(Indicador, c), "") for c in GRUPOS_ESTADISTICAS]
+    filas = _escanear(db, claves)
+
+    db.query(EstadisticaAgregada).delete(synchronize_session=False)
+    if filas:
+        db.execute(insert(EstadisticaAgregada), [
+            dict(zip(GRUPOS_ESTADISTICAS + CONTADORES, fila))
+            for fila in filas
+        ])
+    incrementar_version(db)
+    return len(filas)
+
+def inicializar_estadisticas(db: Session) -> bool:
+    """Llena la tabla agregada si está vacía y ya hay indicadores (primer arranque tras migrar)"""
+    if db.query(EstadisticaAgregada.id).first() or not db.query(Indicador.id).first():
+        return False
+    recalcular_estadisticas(db)
+    db.commit()
+    return True
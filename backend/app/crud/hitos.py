@@ -0,0 +1,61 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select, update, case
+from datetime import datetime
+from typing import Dict, List, Optional
+from ..models.indicador import Indicador, Hito
+from .estadisticas import CONTADORES, clave_indicador, delta_cambio_hito, aplicar_contribucion
+from .version import incrementar_version
+
+def get_hito(db: Session, hito_id: int):
+    return db.get(Hito, hito_id)
+
+def actualizar_hitos(db: Session, cambios: Dict[int, dict]) -> List[int]:
+    """Aplica {hito_id: {campo: valor}} en un único UPDATE ... CASE y confirma la transacción.
+
+    Los contadores del dashboard se ajustan con el delta neto por (vp, area, tipo) a partir
+    del estado/avance anterior de cada hito. Devuelve los ids que existían.
+    """
+    if not cambios:
+        return []
+
+    # Estado anterior + clave de agrupación de su indicador (una consulta). FOR UPDATE bloquea
+    # los hitos hasta el commit: dos PATCH simultáneos no calculan el delta sobre el mismo
+    # estado anterior (en SQLite no hace falta: BEGIN IMMEDIATE ya serializa las escrituras)
+    filas = db.execute(
+        select(Hito.id, Hito.estadoHito, Hito.avanceHito,
+               Indicador.id.label("id_indicador"), Indicador.vp, Indicador.area, Indicador.tipoIndicador)
+        .join(Indicador, Indicador.id == Hito.indicador_id, isouter=True)
+        .where(Hito.id.in_(list(cambios)))
+        .with_for_update(of=Hito)
+    ).all()
+    if not filas:
+        return []
+
+    deltas = {}
+    for fila in filas:
+        datos = cambios[fila.id]
+        antes = (fila.estadoHito, fila.avanceHito)
+        despues = (datos.get("estadoHito", fila.estadoHito), datos.get("avanceHito", fila.avanceHito))
+        if antes != despues and fila.id_indicador is not None:
+            delta = deltas.setdefault(clave_indicador(fila), dict.fromkeys(CONTADORES, 0))
+            delta_cambio_hito(delta, antes, despues)
+
+    # Un CASE por columna: cada hito toma su valor y el resto conserva el suyo
+    ids = [fila.id for fila in filas]
+    valores = {"updated_at": datetime.utcnow()}
+    for campo in {campo for id_hito in ids for campo in cambios[id_hito]}:
+        por_id = {id_hito: cambios[id_hito][campo] for id_hito in ids if campo in cambios[id_hito]}
+        columna = getattr(Hito, campo)
+        valores[campo] = case(por_id, value=Hito.id, else_=columna)
+    db.execute(update(Hito).where(Hito.id.in_(ids)).values(valores).execution_options(synchronize_session=False))
+
+    for clave, delta in deltas.items():
+        aplicar_contribucion(db, clave, delta)
+    incrementar_version(db)
+    db.commit()
+    return ids
+
+def update_hito(db: Session, hito_id: int, datos: dict) -> Optional[Hito]:
+    if not actualizar_hitos(db, {hito_id: datos}):
+        return None
+    return get_hito(db, hito_id)
@@ -1,16 +1,149 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+import logging
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import select, insert
+from typing import List, Optional
 from ..models.indicador import Indicador, Hito
-from ..schemas.indicador import IndicadorCreate, IndicadorUpdate, HitoCreate
+from ..schemas.indicador import IndicadorCreate, IndicadorUpdate, HitoCreate, FiltrosIndicadores
+from .estadisticas import CONTADORES, get_estadisticas, clave_indicador, contribucion, aplicar_contribucion
+from .version import incrementar_version
+
+logger = logging.getLogger(__name__)
 
 def get_indicador(db: Session, indicador_id: int):
     return db.query(Indicador).filter(Indicador.id == indicador_id).first()
 
-def get_indicadores(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(Indicador).offset(skip).limit(limit).all()
+def get_indicadores(db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None):
+    """Página de indicadores ordenada por id, con hitos cargados en una sola consulta (selectin).
+
+    Con ``after_id`` se usa paginación keyset (``id > after_id``) y se ignora ``skip``.
+    """
+    query = db.query(Indicador).options(selectinload(Indicador.hitos)).order_by(Indicador.id)
+    if after_id is not None:
+        query = query.filter(Indicador.id > after_id)
+    elif skip:
+        query = query.offset(skip)
+    return query.limit(limit).all()
+
+# Columnas del listado (orden = orden de claves en el JSON)
+COLUMNAS_INDICADOR = [
+    Indicador.id, Indicador.vp, Indicador.area, Indicador.nombreIndicador, Indicador.tipoIndicador,
+    Indicador.fechaInicioGeneral, Indicador.fechaFinalizacionGeneral, Indicador.responsableGeneral,
+    Indicador.responsableCargaGeneral, Indicador.created_at, Indicador.updated_at,
+]
+COLUMNAS_HITO = [
+    Hito.id, Hito.indicador_id, Hito.nombreHito, Hito.fechaInicioHito, Hito.fechaFinalizacionHito,
+    Hito.avanceHito, Hito.estadoHito, Hito.responsableHito, Hito.created_at, Hito.updated_at,
+]
+CLAVES_INDICADOR = [c.key for c in COLUMNAS_INDICADOR]
+CLAVES_HITO_RESTO = [c.key for c in COLUMNAS_HITO[2:]]
+CLAVES_HITO = [c.key for c in COLUMNAS_HITO]
+
+def _condiciones_filtro(filtros: FiltrosIndicadores):
+    """Traduce los filtros a condiciones (sobre indicadores, sobre hitos)"""
+    cond_indicador = []
+    if filtros.vp is not None:
+        cond_indicador.append(Indicador.vp == filtros.vp)
+    if filtros.area is not None:
+        cond_indicador.append(Indicador.area == filtros.area)
+    if filtros.tipoIndicador is not None:
+        cond_indicador.append(Indicador.tipoIndicador == filtros.tipoIndicador)
+    if filtros.responsable is not None:
+        cond_indicador.append(Indicador.responsableGeneral == filtros.responsable)
+    if filtros.ids:
+        cond_indicador.append(Indicador.id.in_(filtros.ids))
+
+    cond_hito = []
+    if filtros.estadoHito is not None:
+        cond_hito.append(Hito.estadoHito == filtros.estadoHito)
+    if filtros.venceDesde is not None:
+        cond_hito.append(Hito.fechaFinalizacionHito >= filtros.venceDesde)
+    if filtros.venceHasta is not None:
+        cond_hito.append(Hito.fechaFinalizacionHito <= filtros.venceHasta)
+
+    return cond_indicador, cond_hito
+
+def get_indicadores_filas(db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None,
+                          filtros: Optional[FiltrosIndicadores] = None):
+    """Igual que get_indicadores pero sin ORM: devuelve dicts planos listos para serializar.
+
+    Dos consultas Core (indicadores de la página + sus hitos) y un único recorrido para
+    colgar cada hito de su indicador. Con filtros de hito solo se devuelven los indicadores
+    que tienen algún hito que cumple, y de cada uno solo esos hitos.
+    """
+    cond_indicador, cond_hito = _condiciones_filtro(filtros) if filtros else ([], [])
+
+    query = select(*COLUMNAS_INDICADOR).where(*cond_indicador).order_by(Indicador.id)
+    if cond_hito:
+        query = query.where(select(Hito.id).where(Hito.indicador_id == Indicador.id, *cond_hito).exists())
+    if after_id is not None:
+        query = query.where(Indicador.id > after_id)
+    elif skip:
+        query = query.offset(skip)
+
+    indicadores = [dict(zip(CLAVES_INDICADOR, fila)) for fila in db.execute(query.limit(limit))]
+    if not indicadores:
+        return []
+
+    hitos_por_indicador = {}
+    for indicador in indicadores:
+        indicador["hitos"] = hitos_por_indicador[indicador["id"]] = []
+
+    if filtros:
+        # Con filtros los ids de la página ya no son contiguos
+        en_pagina = Hito.indicador_id.in_(list(hitos_por_indicador))
+    else:
+        # Sin filtros la página es un rango contiguo de ids: basta un BETWEEN
+        en_pagina = Hito.indicador_id.between(indicadores[0]["id"], indicadores[-1]["id"])
+
+    query_hitos = select(*COLUMNAS_HITO).where(en_pagina, *cond_hito).order_by(Hito.indicador_id, Hito.id)
+    for fila in db.execute(query_hitos):
+        hitos_por_indicador[fila[1]].append(_hito_dict(fila))
+
+    return indicadores
+
+def _hito_dict(fila) -> dict:
+    """Fila con las columnas de COLUMNAS_HITO -> dict del JSON de salida"""
+    id_hito, indicador_id, *resto = fila
+    hito = {"id": id_hito, "idHito": id_hito, "indicador_id": indicador_id}  # idHito: compatibilidad con frontend
+    hito.update(zip(CLAVES_HITO_RESTO, resto))
+    return hito
+
+def iterar_filas_exportacion(db: Session, tamano_lote: int = 1000):
+    """Lotes de filas planas indicador + hito (columnas de COLUMNAS_INDICADOR y COLUMNAS_HITO).
+
+    Usa yield_per (cursor del lado del servidor en PostgreSQL): la memoria no depende
+    del tamaño de las tablas. Los indicadores sin hitos traen las columnas de hito a None.
+    """
+    query = (
+        select(*COLUMNAS_INDICADOR, *COLUMNAS_HITO)
+        .select_from(Indicador)
+        .outerjoin(Hito, Hito.indicador_id == Indicador.id)
+        .order_by(Indicador.id, Hito.id)
+    )
+    resultado = db.execute(query, execution_options={"yield_per": tamano_lote})
+    yield from resultado.partitions()
+
+def iterar_indicadores_exportacion(db: Session, tamano_lote: int = 1000):
+    """Lotes de indicadores con sus hitos anidados (mismo formato que el listado), en streaming"""
+    n_columnas = len(COLUMNAS_INDICADOR)
+    actual = None
+    for lote in iterar_filas_exportacion(db, tamano_lote):
+        completos = []
+        for fila in lote:
+            if actual is None or actual["id"] != fila[0]:
+                if actual is not None:
+                    completos.append(actual)
+                actual = dict(zip(CLAVES_INDICADOR, fila[:n_columnas]))
+                actual["hitos"] = []
+            if fila[n_columnas] is not None:
+                actual["hitos"].append(_hito_dict(fila[n_columnas:]))
+        if completos:
+            yield completos
+    if actual is not None:
+        yield [actual]
 
 def get_indicadores_by_area(db: Session, area: str):
-    return db.query(Indicador).filter(Indicador.area == area).all()
+    return db.query(Indicador).options(selectinload(Indicador.hitos)).filter(Indicador.area == area).all()
 
 def create_indicador(db: Session, indicador: IndicadorCreate):
     db_indicador = Indicador(
@@ -38,19 +171,91 @@ def create_indicador(db: Session, indicador: IndicadorCreate):
         )
         db.add(db_hito)
 
+    aplicar_contribucion(db, clave_indicador(db_indicador), contribucion(indicador.hitos))
+    incrementar_version(db)
+
     db.commit()
     db.refresh(db_indicador)
     return db_indicador
 
+def _insertar_lote(db: Session, indicadores: List[IndicadorCreate]) -> List[int]:
+    """INSERT multi-fila de indicadores (ids con RETURNING, en orden) + executemany de hitos"""
+    tabla_indicadores = Indicador.__table__
+    ids = db.execute(
+        insert(tabla_indicadores).returning(tabla_indicadores.c.id, sort_by_parameter_order=True),
+        [indicador.model_dump(exclude={"hitos"}) for indicador in indicadores]
+    ).scalars().all()
+
+    hitos = [
+        {**hito.model_dump(), "indicador_id": indicador_id}
+        for indicador_id, indicador in zip(ids, indicadores)
+        for hito in indicador.hitos
+    ]
+    if hitos:
+        db.execute(insert(Hito.__table__), hitos)
+
+    # Contadores: un delta acumulado por clave de agrupación
+    deltas = {}
+    for indicador in indicadores:
+        delta = deltas.setdefault(clave_indicador(indicador), dict.fromkeys(CONTADORES, 0))
+        for contador, valor in contribucion(indicador.hitos).items():
+            delta[contador] += valor
+    for clave, delta in deltas.items():
+        aplicar_contribucion(db, clave, delta)
+    return ids
+
+def create_indicadores_bulk(db: Session, indicadores: List[IndicadorCreate], atomico: bool = False):
+    """Crea muchos indicadores con sus hitos. Devuelve (ids, errores) alineados con la entrada.
+
+    Intenta todo el lote en una transacción; si falla y no es atómico, reintenta uno a uno
+    con SAVEPOINT para quedarse con los que sí se pueden escribir. En modo atómico el error
+    se propaga tras el rollback.
+    """
+    ids, errores = [None] * len(indicadores), {}
+    if not indicadores:
+        return ids, errores
+
+    try:
+        ids = _insertar_lote(db, indicadores)
+        incrementar_version(db)
+        db.commit()
+        return ids, errores
+    except Exception as e:
+        db.rollback()
+        if atomico:
+            raise
+        logger.warning(f"⚠️ Lote de indicadores fallido ({e.__class__.__name__}), reintentando uno a uno")
+
+    for indice, indicador in enumerate(indicadores):
+        try:
+            with db.begin_nested():
+                ids[indice] = _insertar_lote(db, [indicador])[0]
+        except Exception as e:
+            errores[indice] = str(getattr(e, "orig", e))
+    if any(indicador_id is not None for indicador_id in ids):
+        incrementar_version(db)
+    db.commit()
+    return ids, errores
+
 def update_indicador(db: Session, indicador_id: int, indicador: IndicadorUpdate):
     db_indicador = get_indicador(db, indicador_id)
     if not db_indicador:
         return None
 
+    clave_anterior = clave_indicador(db_indicador)
+
     update_data = indicador.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_indicador, field, value)
 
+    # Los hitos no cambian aquí: solo hay que mover su aporte si cambió la clave de agrupación
+    clave_nueva = clave_indicador(db_indicador)
+    if clave_nueva != clave_anterior:
+        delta = contribucion(db_indicador.hitos)
+        aplicar_contribucion(db, clave_anterior, delta, signo=-1)
+        aplicar_contribucion(db, clave_nueva, delta)
+    incrementar_version(db)
+
     db.commit()
     db.refresh(db_indicador)
     return db_indicador
@@ -60,23 +265,8 @@ def delete_indicador(db: Session, indicador_id: int):
     if not db_indicador:
         return None
 
+    aplicar_contribucion(db, clave_indicador(db_indicador), contribucion(db_indicador.hitos), signo=-1)
     db.delete(db_indicador)
+    incrementar_version(db)
     db.commit()
     return db_indicador
-
-def get_estadisticas(db: Session):
-    total_indicadores = db.query(func.count(Indicador.id)).scalar()
-    total_hitos = db.query(func.count(Hito.id)).scalar()
-    hitos_completados = db.query(func.count(Hito.id)).filter(Hito.estadoHito == "Completado").scalar()
-    hitos_en_progreso = db.query(func.count(Hito.id)).filter(Hito.estadoHito == "En Progreso").scalar()
-    hitos_por_comenzar = db.query(func.count(Hito.id)).filter(Hito.estadoHito == "Por Comenzar").scalar()
-    promedio_avance = db.query(func.avg(Hito.avanceHito)).scalar() or 0
-
-    return {
-        "totalIndicadores": total_indicadores,
-        "totalHitos": total_hitos,
-        "hitosCompletados": hitos_completados,
-        "hitosEnProgreso": hitos_en_progreso,
-        "hitosPorComenzar": hitos_por_comenzar,
-        "promedioAvance": round(promedio_avance, 2)
-    } 
\ No newline at end of file
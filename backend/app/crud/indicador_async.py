@@ -0,0 +1,51 @@
+"""
+Versiones async del CRUD de indicadores (DB_ASYNC=true)
+
+Cada función ejecuta la versión síncrona de crud.indicador con AsyncSession.run_sync:
+la lógica es una sola y la E/S va por el driver async (asyncpg / aiosqlite), así que
+el worker no ocupa un hilo mientras espera a la base de datos.
+"""
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from . import indicador as crud
+from .estadisticas import get_estadisticas as _get_estadisticas
+from .version import get_version as _get_version
+from ..schemas.indicador import Indicador as IndicadorSchema, IndicadorCreate, IndicadorUpdate, FiltrosIndicadores
+
+def _como_schema(funcion):
+    """Envuelve una función que devuelve un ORM Indicador para serializarlo dentro de run_sync.
+
+    Fuera de run_sync no se puede hacer lazy loading (no hay greenlet), así que los hitos
+    se leen aquí y se devuelve el schema pydantic ya construido.
+    """
+    def ejecutar(session, *args, **kwargs):
+        db_indicador = funcion(session, *args, **kwargs)
+        if db_indicador is None:
+            return None
+        return IndicadorSchema.model_validate(db_indicador)
+    return ejecutar
+
+async def get_version(db: AsyncSession) -> int:
+    return await db.run_sync(_get_version)
+
+async def get_indicador(db: AsyncSession, indicador_id: int):
+    return await db.run_sync(_como_schema(crud.get_indicador), indicador_id)
+
+async def get_indicadores_filas(db: AsyncSession, skip: int = 0, limit: int = 100, after_id: Optional[int] = None,
+                                filtros: Optional[FiltrosIndicadores] = None):
+    return await db.run_sync(crud.get_indicadores_filas, skip=skip, limit=limit, after_id=after_id, filtros=filtros)
+
+async def create_indicador(db: AsyncSession, indicador: IndicadorCreate):
+    return await db.run_sync(_como_schema(crud.create_indicador), indicador)
+
+async def update_indicador(db: AsyncSession, indicador_id: int, indicador: IndicadorUpdate):
+    return await db.run_sync(_como_schema(crud.update_indicador), indicador_id, indicador)
+
+async def delete_indicador(db: AsyncSession, indicador_id: int) -> bool:
+    """True si se eliminó (el objeto borrado ya no se puede serializar tras el commit)"""
+    db_indicador = await db.run_sync(crud.delete_indicador, indicador_id)
+    return db_indicador is not None
+
+async def get_estadisticas(db: AsyncSession, group_by: Optional[str] = None):
+    return await db.run_sync(_get_estadisticas, group_by=group_by)
@@ -0,0 +1,105 @@
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, timedelta
+from typing import Optional
+import json
+import os
+import uuid
+from ..models.indicador import TrabajoImportacion
+
+# Valor de `ranura` mientras hay una importación activa (índice único = una a la vez)
+RANURA_IMPORTACION = "importacion"
+
+# Un trabajo activo sin actualizarse en este tiempo se considera abandonado (worker caído)
+IMPORTACION_TIMEOUT_S = int(os.getenv("IMPORTACION_TIMEOUT_S", "3600"))
+
+def get_trabajo(db: Session, trabajo_id: str) -> Optional[TrabajoImportacion]:
+    return db.get(TrabajoImportacion, trabajo_id)
+
+def get_trabajo_activo(db: Session) -> Optional[TrabajoImportacion]:
+    return db.query(TrabajoImportacion).filter(TrabajoImportacion.ranura == RANURA_IMPORTACION).first()
+
+def esta_abandonado(trabajo: TrabajoImportacion) -> bool:
+    """Activo pero sin progreso dentro del timeout (crear_trabajo lo liberará)"""
+    return trabajo.updated_at < datetime.utcnow() - timedelta(seconds=IMPORTACION_TIMEOUT_S)
+
+def liberar_abandonados(db: Session) -> int:
+    """Marca como error los trabajos activos que dejaron de dar señales y libera la ranura"""
+    limite = datetime.utcnow() - timedelta(seconds=IMPORTACION_TIMEOUT_S)
+    ahora = datetime.utcnow()
+    liberados = (
+        db.query(TrabajoImportacion)
+        .filter(TrabajoImportacion.ranura == RANURA_IMPORTACION, TrabajoImportacion.updated_at < limite)
+        .update({
+            TrabajoImportacion.ranura: None,
+            TrabajoImportacion.estado: "error",
+            TrabajoImportacion.error: "Trabajo abandonado (sin progreso dentro del timeout)",
+            TrabajoImportacion.finished_at: ahora,
+        }, synchronize_session=False)
+    )
+    db.commit()
+    return liberados
+
+def crear_trabajo(db: Session, modo: str) -> Optional[str]:
+    """Reserva la ranura de importación y devuelve el id; None si ya hay otra activa (en cualquier worker).
+
+    Devuelve el id y no el objeto para no reabrir una transacción tras el commit (en SQLite
+    retendría la única conexión de escritura hasta el final del request).
+    """
+    liberar_abandonados(db)
+    trabajo_id = uuid.uuid4().hex
+    db.add(TrabajoImportacion(id=trabajo_id, modo=modo, estado="pendiente", fase="en_cola",
+                              ranura=RANURA_IMPORTACION))
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return None
+    return trabajo_id
+
+def iniciar_trabajo(db: Session, trabajo_id: str, worker: str):
+    db.query(TrabajoImportacion).filter(TrabajoImportacion.id == trabajo_id).update({
+        TrabajoImportacion.estado: "en_curso",
+        TrabajoImportacion.worker: worker,
+        TrabajoImportacion.started_at: datetime.utcnow(),
+    }, synchronize_session=False)
+    db.commit()
+
+def actualizar_progreso(db: Session, trabajo_id: str, fase: str, filas_procesadas: int, filas_totales: Optional[int]):
+    db.query(TrabajoImportacion).filter(TrabajoImportacion.id == trabajo_id).update({
+        TrabajoImportacion.fase: fase,
+        TrabajoImportacion.filasProcesadas: filas_procesadas,
+        TrabajoImportacion.filasTotales: filas_totales,
+    }, synchronize_session=False)
+    db.commit()
+
+def finalizar_trabajo(db: Session, trabajo_id: str, progreso: dict, resultado: Optional[dict] = None,
+                      error: Optional[str] = None):
+    """Guarda el estado final y libera la ranura"""
+    db.query(TrabajoImportacion).filter(TrabajoImportacion.id == trabajo_id).update({
+        TrabajoImportacion.estado: "error" if error else "completado",
+        TrabajoImportacion.fase: progreso["fase"],
+        TrabajoImportacion.filasProcesadas: progreso["filasProcesadas"],
+        TrabajoImportacion.filasTotales: progreso["filasTotales"],
+        TrabajoImportacion.resultado: json.dumps(resultado, ensure_ascii=False, default=str) if resultado is not None else None,
+        TrabajoImportacion.error: error,
+        TrabajoImportacion.ranura: None,
+        TrabajoImportacion.finished_at: datetime.utcnow(),
+    }, synchronize_session=False)
+    db.commit()
+
+def trabajo_dict(trabajo: TrabajoImportacion) -> dict:
+    return {
+        "job_id": trabajo.id,
+        "modo": trabajo.modo,
+        "estado": trabajo.estado,
+        "fase": trabajo.fase,
+        "filasProcesadas": trabajo.filasProcesadas,
+        "filasTotales": trabajo.filasTotales,
+        "error": trabajo.error,
+        "resultado": json.loads(trabajo.resultado) if trabajo.resultado else None,
+        "worker": trabajo.worker,
+        "created_at": trabajo.created_at,
+        "started_at": trabajo.started_at,
+        "finished_at": trabajo.finished_at,
+    }
@@ -0,0 +1,23 @@
+from sqlalchemy.orm import Session
+from ..models.indicador import VersionDatos
+from .estadisticas import insert_upsert
+
+# Id de la única fila de version_datos
+VERSION_ID = 1
+
+def get_version(db: Session) -> int:
+    """Versión actual del conjunto de datos (lookup por clave primaria)"""
+    version = db.query(VersionDatos.version).filter(VersionDatos.id == VERSION_ID).scalar()
+    return version or 0
+
+def incrementar_version(db: Session):
+    """Sube la versión dentro de la transacción actual; el commit lo hace quien llama.
+
+    INSERT ... ON CONFLICT DO UPDATE: en una base nueva, dos primeras escrituras
+    concurrentes no chocan al crear la fila.
+    """
+    sentencia = insert_upsert(db, VersionDatos).values(id=VERSION_ID, version=1)
+    db.execute(sentencia.on_conflict_do_update(
+        index_elements=["id"],
+        set_={"version": VersionDatos.version + 1}
+    ))
@@ -1,40 +1,57 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+import logging
 import os
 from dotenv import load_dotenv
+from .logs import configurar_logging
+from .metricas import instrumentar_engine
+from .db_pool import argumentos_pool, configurar_ping_inactividad, DB_POOL_PRE_PING
+from .db_sqlite import crear_engines_sqlite, crear_engines_sqlite_async, SQLITE_TUNING
 
 load_dotenv()
 
+# database es lo primero que importan la app y los scripts: arrancar aquí el logging en cola
+configurar_logging()
+logger = logging.getLogger(__name__)
+
 # Configuración simplificada para Railway
 DATABASE_URL = os.getenv("DATABASE_URL")
 
 if DATABASE_URL:
     # Railway o producción con DATABASE_URL
-    print(f"✅ Usando DATABASE_URL: {DATABASE_URL[:50]}...")
+    logger.info(f"✅ Usando DATABASE_URL: {DATABASE_URL[:50]}...")
     
     # Convertir postgres:// a postgresql:// si es necesario
     if DATABASE_URL.startswith("postgres://"):
         DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
-        print("🔄 Convertido postgres:// a postgresql://")
-    
-    # Configuración para Railway PostgreSQL
-    engine = create_engine(
-        DATABASE_URL,
-        pool_pre_ping=True,
-        pool_recycle=300
-    )
-    
+        logger.info("🔄 Convertido postgres:// a postgresql://")
 else:
     # Desarrollo local - usar SQLite como fallback
-    print("⚠️ DATABASE_URL no encontrada, usando SQLite para desarrollo")
+    logger.warning("⚠️ DATABASE_URL no encontrada, usando SQLite para desarrollo")
     DATABASE_URL = "sqlite:///./indicadores.db"
-    engine = create_engine(
-        DATABASE_URL, 
-        connect_args={"check_same_thread": False}
-    )
+
+if DATABASE_URL.startswith("sqlite"):
+    # SQLite (desarrollo o sitios de un solo nodo): pool de lectura + conexión única de escritura
+    engine, engine_escritura = crear_engines_sqlite(DATABASE_URL)
+    if SQLITE_TUNING:
+        logger.info("🪶 SQLite en modo WAL con escritor único")
+else:
+    # Configuración para Railway PostgreSQL (pool configurable, ver db_pool.py)
+    engine = create_engine(DATABASE_URL, **argumentos_pool())
+    if DB_POOL_PRE_PING == "idle":
+        configurar_ping_inactividad(engine)
+    engine_escritura = engine
+
+# Tiempos de cada consulta para /metrics (ver metricas.py)
+instrumentar_engine(engine)
+if engine_escritura is not engine:
+    instrumentar_engine(engine_escritura)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Sesiones para endpoints que escriben (en PostgreSQL es el mismo engine)
+WriteSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine_escritura)
 Base = declarative_base()
 
 def get_db():
@@ -42,4 +59,56 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+def get_write_db():
+    db = WriteSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+# ⚡ Motor async opcional (DB_ASYNC=true): asyncpg para PostgreSQL, aiosqlite para SQLite
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() == "true"
+
+# Driver async equivalente para cada backend
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def get_async_database_url(url: str) -> str:
+    """Misma base de datos, driver async"""
+    parsed = make_url(url)
+    return parsed.set(drivername=ASYNC_DRIVERS[parsed.get_backend_name()]).render_as_string(hide_password=False)
+
+async_engine = None
+async_engine_escritura = None
+AsyncSessionLocal = None
+AsyncWriteSessionLocal = None
+
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    if DATABASE_URL.startswith("sqlite"):
+        # Igual que en síncrono: pool de lectura + una conexión de escritura con BEGIN IMMEDIATE
+        async_engine, async_engine_escritura = crear_engines_sqlite_async(get_async_database_url(DATABASE_URL))
+    else:
+        async_engine = create_async_engine(get_async_database_url(DATABASE_URL), **argumentos_pool(asincrono=True))
+        if DB_POOL_PRE_PING == "idle":
+            configurar_ping_inactividad(async_engine)
+        async_engine_escritura = async_engine
+    instrumentar_engine(async_engine)
+    if async_engine_escritura is not async_engine:
+        instrumentar_engine(async_engine_escritura)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=True)
+    AsyncWriteSessionLocal = async_sessionmaker(async_engine_escritura, autoflush=False, expire_on_commit=True)
+    logger.info("⚡ Motor de base de datos async habilitado")
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_write_db():
+    async with AsyncWriteSessionLocal() as db:
+        yield db 
\ No newline at end of file
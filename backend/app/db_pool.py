@@ -0,0 +1,149 @@
+"""
+🏊 Pool de conexiones configurable con métricas en vivo
+Clases de pool medidas, estrategia de pre-ping y lectura de estadísticas del pool
+"""
+
+import os
+import threading
+import time
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+# ===================================================
+# 🔧 CONFIGURACIÓN (variables de entorno)
+# ===================================================
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "300"))
+# always: ping en cada checkout | idle: solo si la conexión estuvo inactiva > DB_POOL_PING_IDLE s | never
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "always").lower()
+DB_POOL_PING_IDLE = float(os.getenv("DB_POOL_PING_IDLE", "30"))
+# Timeout por sentencia en PostgreSQL (0 = sin límite)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+# ===================================================
+# 📊 MÉTRICAS
+# ===================================================
+
+class MetricasPool:
+    """Contadores de checkout del pool (tiempo incluye esperar hueco, conectar y pre-ping)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+
+    def registrar(self, espera: float, timeout: bool = False):
+        with self._lock:
+            self.checkouts += 1
+            self.espera_total += espera
+            if espera > self.espera_max:
+                self.espera_max = espera
+            if timeout:
+                self.timeouts += 1
+
+class _PoolMedido:
+    """Mixin que mide cada Pool.connect()"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metricas = MetricasPool()
+
+    def recreate(self):
+        # engine.dispose() crea un pool nuevo: conservar los contadores acumulados
+        nuevo = super().recreate()
+        nuevo.metricas = self.metricas
+        return nuevo
+
+    def connect(self):
+        inicio = time.perf_counter()
+        try:
+            conexion = super().connect()
+        except exc.TimeoutError:
+            self.metricas.registrar(time.perf_counter() - inicio, timeout=True)
+            raise
+        self.metricas.registrar(time.perf_counter() - inicio)
+        return conexion
+
+class QueuePoolMedido(_PoolMedido, QueuePool):
+    pass
+
+class AsyncQueuePoolMedido(_PoolMedido, AsyncAdaptedQueuePool):
+    pass
+
+def estadisticas_pool(engine) -> dict:
+    """Foto del pool: ocupación actual + contadores acumulados"""
+    pool = engine.pool
+    datos = {"clase": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        datos.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "max_overflow": pool._max_overflow,
+            "timeout": pool.timeout(),
+        })
+    metricas = getattr(pool, "metricas", None)
+    if metricas is not None:
+        datos.update({
+            "checkouts_total": metricas.checkouts,
+            "timeouts_total": metricas.timeouts,
+            "espera_total_s": round(metricas.espera_total, 6),
+            "espera_media_ms": round(metricas.espera_total / metricas.checkouts * 1000, 3) if metricas.checkouts else 0,
+            "espera_max_ms": round(metricas.espera_max * 1000, 3),
+        })
+    return datos
+
+# ===================================================
+# 🔌 ARGUMENTOS DE create_engine
+# ===================================================
+
+def argumentos_pool(asincrono: bool = False) -> dict:
+    """kwargs de create_engine/create_async_engine para PostgreSQL según la configuración"""
+    argumentos = {
+        "poolclass": AsyncQueuePoolMedido if asincrono else QueuePoolMedido,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING == "always",
+    }
+    if DB_STATEMENT_TIMEOUT_MS > 0:
+        if asincrono:
+            argumentos["connect_args"] = {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}}
+        else:
+            argumentos["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    return argumentos
+
+def configurar_ping_inactividad(engine, segundos: float = DB_POOL_PING_IDLE):
+    """Pre-ping solo para conexiones que llevan más de `segundos` sin usarse.
+
+    Ahorra el round trip del pre-ping en conexiones calientes; una conexión caída tras
+    inactividad se descarta (DisconnectionError) y el pool reintenta con otra.
+    """
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "connect")
+    def _al_conectar(dbapi_connection, connection_record):
+        connection_record.info["ultimo_uso"] = time.monotonic()
+
+    @event.listens_for(sync_engine, "checkin")
+    def _al_devolver(dbapi_connection, connection_record):
+        connection_record.info["ultimo_uso"] = time.monotonic()
+
+    @event.listens_for(sync_engine, "checkout")
+    def _al_sacar(dbapi_connection, connection_record, connection_proxy):
+        if time.monotonic() - connection_record.info.get("ultimo_uso", 0) <= segundos:
+            return
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("SELECT 1")
+        except Exception:
+            raise exc.DisconnectionError("Conexión inactiva caída")
+        finally:
+            cursor.close()
@@ -0,0 +1,127 @@
+"""
+🪶 Modo SQLite de alto rendimiento (despliegues de un solo nodo)
+WAL + pragmas afinados, un pool de lectura y una única conexión de escritura
+"""
+
+import os
+from sqlalchemy import create_engine, event
+from .db_pool import QueuePoolMedido, AsyncQueuePoolMedido, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT
+
+# ===================================================
+# 🔧 CONFIGURACIÓN (variables de entorno)
+# ===================================================
+
+SQLITE_TUNING = os.getenv("SQLITE_TUNING", "true").lower() == "true"
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", str(64 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+def pragmas() -> list:
+    return [
+        "PRAGMA journal_mode=WAL",                        # Lectores no bloquean al escritor ni viceversa
+        "PRAGMA synchronous=NORMAL",                      # Seguro con WAL; fsync solo en checkpoints
+        f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}",
+        f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}",     # Negativo = KiB
+        f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}",  # Esperar al lock en vez de fallar
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+def aplicar_pragmas(engine):
+    """Ejecuta los pragmas en cada conexión nueva (sync o async)"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "connect")
+    def _pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas():
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+def _configurar_escritor(engine):
+    """Transacciones BEGIN IMMEDIATE: el lock de escritura se toma al empezar.
+
+    Con BEGIN diferido, dos transacciones que leen y luego escriben pueden acabar en
+    SQLITE_BUSY sin que busy_timeout ayude; así esperan su turno ordenadamente.
+    """
+    engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(engine, "connect")
+    def _sin_transaccion_implicita(dbapi_connection, connection_record):
+        # Desactiva el BEGIN automático de pysqlite; lo emite SQLAlchemy en "begin"
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin_immediate(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+def crear_engines_sqlite(database_url: str):
+    """Devuelve (engine_lectura, engine_escritura).
+
+    Lecturas: pool normal. Escrituras: una sola conexión (pool_size=1, sin overflow), de modo
+    que los escritores del proceso hacen cola en el pool y las lecturas siguen en paralelo (WAL).
+    Con SQLITE_TUNING=false se usa un único engine como antes.
+    """
+    connect_args = {"check_same_thread": False}
+
+    if not SQLITE_TUNING:
+        engine = create_engine(database_url, connect_args=connect_args, poolclass=QueuePoolMedido)
+        return engine, engine
+
+    engine_lectura = create_engine(
+        database_url,
+        connect_args=connect_args,
+        poolclass=QueuePoolMedido,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT
+    )
+    aplicar_pragmas(engine_lectura)
+
+    engine_escritura = create_engine(
+        database_url,
+        connect_args=connect_args,
+        poolclass=QueuePoolMedido,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=DB_POOL_TIMEOUT
+    )
+    aplicar_pragmas(engine_escritura)
+    _configurar_escritor(engine_escritura)
+
+    return engine_lectura, engine_escritura
+
+def crear_engines_sqlite_async(database_url: str):
+    """Versión async de crear_engines_sqlite (aiosqlite): (engine_lectura, engine_escritura).
+
+    El engine de escritura es también de una sola conexión con BEGIN IMMEDIATE, así las
+    escrituras async esperan el lock (busy_timeout) igual que las del escritor síncrono
+    en lugar de fallar con "database is locked".
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    if not SQLITE_TUNING:
+        engine = create_async_engine(database_url)
+        return engine, engine
+
+    engine_lectura = create_async_engine(
+        database_url,
+        poolclass=AsyncQueuePoolMedido,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT
+    )
+    aplicar_pragmas(engine_lectura)
+
+    engine_escritura = create_async_engine(
+        database_url,
+        poolclass=AsyncQueuePoolMedido,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=DB_POOL_TIMEOUT
+    )
+    aplicar_pragmas(engine_escritura)
+    _configurar_escritor(engine_escritura)
+
+    return engine_lectura, engine_escritura
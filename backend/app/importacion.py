@@ -0,0 +1,146 @@
+"""
+📥 Importación del Excel en segundo plano
+POST /indicadores/cargar-datos encola el trabajo y responde de inmediato con su id;
+el progreso se consulta en GET /indicadores/cargar-datos/{job_id}
+"""
+
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from .database import WriteSessionLocal, engine_escritura
+from .models.indicador import Indicador
+from .crud import trabajos
+
+# cargar_datos.py vive en backend/ (fuera del paquete app): se añade al path una sola vez
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.append(BACKEND_DIR)
+
+logger = logging.getLogger(__name__)
+
+# Un hilo por worker basta: la ranura en base de datos ya impide dos importaciones a la vez
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="importacion")
+
+# Progreso en memoria de los trabajos que corren en este proceso (más fresco que la tabla)
+_progreso_local = {}
+_lock = threading.Lock()
+
+# Intervalo mínimo entre escrituras de progreso en la tabla
+INTERVALO_PROGRESO_S = 1.0
+
+# SQLite admite un solo escritor a la vez (con SQLITE_TUNING, una sola conexión de escritura):
+# la importación confirma cada lote de hitos para soltarlo entre lotes y el resto de
+# escrituras no espera a que termine toda la carga. En PostgreSQL es una única transacción.
+CONFIRMAR_POR_LOTES = engine_escritura.dialect.name == "sqlite"
+
+def _worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+class _Progreso:
+    """Callback progreso(fase, filas_procesadas, filas_totales) que usa cargar_datos"""
+
+    def __init__(self, trabajo_id: str, session):
+        self.trabajo_id = trabajo_id
+        self.session = session  # La de la importación
+        self.estado = {"fase": "en_cola", "filasProcesadas": 0, "filasTotales": None}
+        self._ultima_escritura = 0.0
+        with _lock:
+            _progreso_local[trabajo_id] = self.estado
+
+    def __call__(self, fase, filas_procesadas=None, filas_totales=None):
+        cambio_fase = fase != self.estado["fase"]
+        self.estado["fase"] = fase
+        if filas_procesadas is not None:
+            self.estado["filasProcesadas"] = filas_procesadas
+        if filas_totales is not None:
+            self.estado["filasTotales"] = filas_totales
+
+        # En SQLite solo se puede escribir si la importación no retiene el escritor (entre lotes);
+        # si no, el progreso se queda en memoria hasta la siguiente ocasión
+        escritor_libre = not CONFIRMAR_POR_LOTES or not self.session.in_transaction()
+        ahora = time.monotonic()
+        if escritor_libre and (cambio_fase or ahora - self._ultima_escritura >= INTERVALO_PROGRESO_S):
+            self._ultima_escritura = ahora
+            with WriteSessionLocal() as db:
+                trabajos.actualizar_progreso(db, self.trabajo_id, fase, self.estado["filasProcesadas"],
+                                             self.estado["filasTotales"])
+
+def _importar(session, modo: str, progreso: _Progreso) -> dict:
+    """Ejecuta la importación con `session` (por lotes si CONFIRMAR_POR_LOTES) y devuelve el resultado"""
+    from cargar_datos import buscar_excel, leer_excel, cargar_con_session, sincronizar_con_session
+    confirmar_lote = _confirmar if CONFIRMAR_POR_LOTES else None
+
+    progreso("leyendo_excel")
+    excel_file = buscar_excel()
+    if not excel_file:
+        raise FileNotFoundError("No se encuentra el archivo 'Base de datos.xlsx'")
+    df = leer_excel(excel_file)
+    progreso("leido", 0, len(df))
+
+    if modo == "sync":
+        reporte = sincronizar_con_session(session, df, progreso=progreso, confirmar_lote=confirmar_lote)
+        return {"data_loaded": reporte["aplicado"], "diff": reporte}
+
+    # modo auto: solo si la base está vacía (comportamiento original del endpoint)
+    if session.query(Indicador.id).first() is not None:
+        return {"data_loaded": False, "message": "Los datos ya estaban cargados en la base de datos"}
+    totales = cargar_con_session(session, df, limpiar_existentes=False, progreso=progreso,
+                                 confirmar_lote=confirmar_lote)
+    return {"data_loaded": True, **totales}
+
+def _confirmar(session):
+    session.commit()  # Devuelve la conexión de escritura al pool hasta el siguiente lote
+
+def _ejecutar(trabajo_id: str, modo: str):
+    session = WriteSessionLocal()
+    progreso = _Progreso(trabajo_id, session)
+    resultado, error = None, None
+
+    try:
+        with WriteSessionLocal() as db:
+            trabajos.iniciar_trabajo(db, trabajo_id, _worker_id())
+        resultado = _importar(session, modo, progreso)
+        session.commit()
+        progreso.estado["fase"] = "completado"
+        logger.info(f"✅ Importación {trabajo_id} completada")
+    except Exception as e:
+        session.rollback()
+        error = f"{type(e).__name__}: {e}"
+        logger.exception(f"❌ Importación {trabajo_id} fallida: {error}")
+    finally:
+        # Libera la conexión de escritura antes de guardar el estado final
+        session.close()
+
+    try:
+        with WriteSessionLocal() as db:
+            trabajos.finalizar_trabajo(db, trabajo_id, progreso.estado, resultado=resultado, error=error)
+    finally:
+        with _lock:
+            _progreso_local.pop(trabajo_id, None)
+
+def lanzar_importacion(trabajo_id: str, modo: str):
+    """Encola el trabajo ya reservado con trabajos.crear_trabajo"""
+    _executor.submit(_ejecutar, trabajo_id, modo)
+
+def estado_trabajo(db, trabajo_id: str):
+    """Estado del trabajo (None si no existe), con el progreso en memoria si corre en este proceso"""
+    trabajo = trabajos.get_trabajo(db, trabajo_id)
+    if trabajo is None:
+        return None
+    datos = trabajos.trabajo_dict(trabajo)
+    with _lock:
+        local = _progreso_local.get(trabajo_id)
+        if local is not None and datos["estado"] == "en_curso":
+            datos.update(local)
+
+    inicio, fin = datos["started_at"], datos["finished_at"]
+    if inicio is not None:
+        segundos = ((fin or datetime.utcnow()) - inicio).total_seconds()
+        datos["segundos"] = round(segundos, 3)
+        datos["filasPorSegundo"] = round(datos["filasProcesadas"] / segundos, 1) if segundos > 0 else None
+    return datos
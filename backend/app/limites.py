@@ -0,0 +1,223 @@
+"""
+🚦 Rate limiting con estado compartido entre workers
+Token bucket global por clave (IP) en un backend compartido; cada worker reserva lotes
+de tokens y los gasta en local, así el camino caliente no toca el backend
+
+- BackendMemoria: bucket en el propio proceso (un solo worker, o como referencia)
+- BackendSQLite: bucket en el fichero SECURITY_STATE_DB, atómico con BEGIN IMMEDIATE
+- LimitadorTokens: reservas locales por clave; los tokens no usados se devuelven al
+  backend tras RATE_LIMIT_SYNC_S segundos, de modo que N workers nunca admiten más de
+  RATE_LIMIT_REQUESTS por ventana en total
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from starlette.concurrency import run_in_threadpool
+from .ventanas import abrir_estado_compartido
+
+# ===================================================
+# 🗄️ BACKENDS (token bucket atómico)
+# ===================================================
+
+def _rellenar(tokens: float, actualizado: float, ahora: float, capacidad: int, tasa: float) -> float:
+    return min(float(capacidad), tokens + max(0.0, ahora - actualizado) * tasa)
+
+class BackendMemoria:
+    """Buckets en un dict del proceso; las claves llenas se pueden olvidar sin perder nada"""
+
+    bloqueante = False  # Solo un lock en memoria: se puede llamar desde el event loop
+
+    def __init__(self, purgar_cada: int = 1000):
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.purgar_cada = purgar_cada
+        self._operaciones = 0
+
+    def tomar(self, clave: str, n: int, capacidad: int, tasa: float, ahora: float) -> int:
+        """Retira hasta n tokens del bucket y devuelve cuántos concedió"""
+        with self._lock:
+            tokens, actualizado = self._buckets.get(clave, (float(capacidad), ahora))
+            tokens = _rellenar(tokens, actualizado, ahora, capacidad, tasa)
+            concedidos = min(n, int(tokens))
+            self._buckets[clave] = (tokens - concedidos, ahora)
+            self._operaciones += 1
+            if self._operaciones % self.purgar_cada == 0:
+                self._purgar(capacidad, tasa, ahora)
+            return concedidos
+
+    def devolver(self, clave: str, n: int, capacidad: int):
+        with self._lock:
+            if clave in self._buckets:
+                tokens, actualizado = self._buckets[clave]
+                self._buckets[clave] = (min(float(capacidad), tokens + n), actualizado)
+
+    def _purgar(self, capacidad: int, tasa: float, ahora: float):
+        llenos = [clave for clave, (tokens, actualizado) in self._buckets.items()
+                  if _rellenar(tokens, actualizado, ahora, capacidad, tasa) >= capacidad]
+        for clave in llenos:
+            del self._buckets[clave]
+
+    def estadisticas(self) -> dict:
+        return {"backend": "memoria", "claves": len(self._buckets)}
+
+class BackendSQLite:
+    """Buckets en la tabla limites del fichero compartido por los workers del nodo"""
+
+    bloqueante = True  # BEGIN IMMEDIATE puede esperar al lock del fichero: fuera del event loop
+
+    def __init__(self, ruta: str, purgar_cada: int = 1000):
+        self.ruta = ruta
+        self.purgar_cada = purgar_cada
+        self._local = threading.local()
+        self._operaciones = 0
+        self._conexion().execute(
+            "CREATE TABLE IF NOT EXISTS limites ("
+            "clave TEXT PRIMARY KEY, tokens REAL NOT NULL, actualizado REAL NOT NULL) WITHOUT ROWID"
+        )
+
+    def _conexion(self):
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is None:
+            conexion = self._local.conexion = abrir_estado_compartido(self.ruta)
+        return conexion
+
+    def tomar(self, clave: str, n: int, capacidad: int, tasa: float, ahora: float) -> int:
+        conexion = self._conexion()
+        # BEGIN IMMEDIATE: leer y reescribir el bucket sin que otro worker se cuele en medio
+        conexion.execute("BEGIN IMMEDIATE")
+        try:
+            fila = conexion.execute("SELECT tokens, actualizado FROM limites WHERE clave = ?", (clave,)).fetchone()
+            tokens = float(capacidad) if fila is None else _rellenar(fila[0], fila[1], ahora, capacidad, tasa)
+            concedidos = min(n, int(tokens))
+            conexion.execute(
+                "INSERT INTO limites (clave, tokens, actualizado) VALUES (?, ?, ?) "
+                "ON CONFLICT (clave) DO UPDATE SET tokens = excluded.tokens, actualizado = excluded.actualizado",
+                (clave, tokens - concedidos, ahora)
+            )
+            self._operaciones += 1
+            if self._operaciones % self.purgar_cada == 0:
+                # Bucket que ya se habría rellenado del todo = equivalente a no tener fila
+                conexion.execute("DELETE FROM limites WHERE tokens + (? - actualizado) * ? >= ?",
+                                 (ahora, tasa, capacidad))
+            conexion.execute("COMMIT")
+        except Exception:
+            conexion.execute("ROLLBACK")
+            raise
+        return concedidos
+
+    def devolver(self, clave: str, n: int, capacidad: int):
+        self._conexion().execute(
+            "UPDATE limites SET tokens = MIN(?, tokens + ?) WHERE clave = ?", (float(capacidad), n, clave)
+        )
+
+    def estadisticas(self) -> dict:
+        fila = self._conexion().execute("SELECT COUNT(*) FROM limites").fetchone()
+        return {"backend": "sqlite", "ruta": self.ruta, "claves": fila[0]}
+
+# ===================================================
+# ⚡ RESERVAS LOCALES (camino caliente sin backend)
+# ===================================================
+
+class LimitadorTokens:
+    """`capacidad` peticiones por `ventana` segundos y clave, repartidas entre workers.
+
+    permitir() gasta un token de la reserva local de la clave; solo cuando se agota (o
+    caduca tras `sincronizar_s`) pide otro lote al backend y devuelve lo que sobró.
+    permitir_async() hace lo mismo desde el event loop y solo manda al threadpool la
+    consulta a un backend bloqueante.
+    """
+
+    def __init__(self, backend, capacidad: int, ventana: float, lote: int = None,
+                 sincronizar_s: float = 1.0, max_claves: int = 10_000):
+        self.backend = backend
+        self.capacidad = capacidad
+        self.ventana = ventana
+        self.tasa = capacidad / ventana
+        self.lote = lote or max(1, capacidad // 20)
+        self.sincronizar_s = sincronizar_s
+        self.max_claves = max_claves
+        self._reservas = OrderedDict()  # clave -> [tokens locales, caduca (monotonic), bucket vacío]
+        self._lock = threading.Lock()
+        self.locales = 0
+        self.lotes = 0
+        self.rechazadas = 0
+
+    def permitir(self, clave: str) -> bool:
+        ahora = time.monotonic()
+        decision, sobrantes = self._decidir_local(clave, ahora)
+        if decision is not None:
+            return decision
+        return self._reconciliar(clave, sobrantes, ahora)
+
+    async def permitir_async(self, clave: str) -> bool:
+        ahora = time.monotonic()
+        decision, sobrantes = self._decidir_local(clave, ahora)
+        if decision is not None:
+            return decision
+        if self.backend.bloqueante:
+            return await run_in_threadpool(self._reconciliar, clave, sobrantes, ahora)
+        return self._reconciliar(clave, sobrantes, ahora)
+
+    def _decidir_local(self, clave: str, ahora: float):
+        """(True/False, 0) si decide la reserva local; (None, tokens sobrantes) si hay que ir al backend"""
+        sobrantes = 0
+        with self._lock:
+            reserva = self._reservas.get(clave)
+            if reserva is not None and reserva[1] > ahora:
+                if reserva[0] > 0:
+                    reserva[0] -= 1
+                    self._reservas.move_to_end(clave)
+                    self.locales += 1
+                    return True, 0
+                if reserva[2]:
+                    # El backend no tenía tokens hace un instante: rechazar sin consultarlo
+                    self.rechazadas += 1
+                    return False, 0
+            if reserva is not None:
+                sobrantes = reserva[0]
+                del self._reservas[clave]
+        return None, sobrantes
+
+    def _reconciliar(self, clave: str, sobrantes: int, ahora: float) -> bool:
+        """Devuelve lo no usado y pide un lote nuevo al backend (fuera del lock)"""
+        if sobrantes:
+            self.backend.devolver(clave, sobrantes, self.capacidad)
+        concedidos = self.backend.tomar(clave, self.lote, self.capacidad, self.tasa, time.time())
+
+        desalojadas = []
+        with self._lock:
+            self.lotes += 1
+            reserva = self._reservas.get(clave)
+            if concedidos == 0:
+                if reserva is None:
+                    self._reservas[clave] = [0, ahora + min(self.sincronizar_s, 1 / self.tasa), True]
+                self.rechazadas += 1
+                return False
+            if reserva is not None and not reserva[2]:
+                # Otro hilo pidió lote a la vez: se suman ambas reservas
+                reserva[0] += concedidos - 1
+            else:
+                self._reservas[clave] = [concedidos - 1, ahora + self.sincronizar_s, False]
+                while len(self._reservas) > self.max_claves:
+                    desalojadas.append(self._reservas.popitem(last=False))
+        for clave_desalojada, (tokens, _, _) in desalojadas:
+            if tokens:
+                self.backend.devolver(clave_desalojada, tokens, self.capacidad)
+        return True
+
+    def reintentar_en(self) -> int:
+        """Segundos hasta que el bucket recupera un token (cabecera Retry-After)"""
+        return max(1, int(1 / self.tasa + 0.999))
+
+    def estadisticas(self) -> dict:
+        return {
+            "capacidad": self.capacidad,
+            "ventana_s": self.ventana,
+            "lote": self.lote,
+            "reservas": len(self._reservas),
+            "locales": self.locales,
+            "lotes": self.lotes,
+            "rechazadas": self.rechazadas,
+            "backend": self.backend.estadisticas(),
+        }
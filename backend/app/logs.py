@@ -0,0 +1,177 @@
+"""
+📝 Logging estructurado sin bloqueo
+Los registros se encolan (QueueHandler) y un hilo en segundo plano los escribe en stdout
+como JSON de una línea; una salida lenta nunca añade latencia a las requests
+
+- Cola acotada (LOG_QUEUE_SIZE): si se llena, el registro se descarta y se cuenta
+- Muestreo por logger (LOG_SAMPLING="uvicorn.access=0.1,security=0.5"): solo afecta a
+  INFO y DEBUG; WARNING o superior se emite siempre
+- Los loggers de uvicorn y el de seguridad pasan por la misma cola
+"""
+
+import atexit
+import copy
+import itertools
+import logging
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+import orjson
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()  # json | texto
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_SAMPLING = os.getenv("LOG_SAMPLING", "")
+
+# Loggers con handlers propios (uvicorn los configura antes de importar la app)
+LOGGERS_REDIRIGIDOS = ("uvicorn", "uvicorn.error", "uvicorn.access")
+
+# Atributos estándar de LogRecord: el resto (extra=...) se añade como campos del JSON
+_CAMPOS_RECORD = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+# ===================================================
+# 🧾 FORMATO JSON
+# ===================================================
+
+class FormatoJSON(logging.Formatter):
+    """Una línea JSON por registro: ts, level, logger, msg, pid y los campos de `extra`"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        datos = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "pid": record.process,
+        }
+        for campo, valor in record.__dict__.items():
+            if campo not in _CAMPOS_RECORD:
+                datos[campo] = valor
+        if record.exc_text:
+            datos["exc"] = record.exc_text
+        return orjson.dumps(datos, default=str).decode()
+
+# ===================================================
+# 📥 COLA Y MUESTREO
+# ===================================================
+
+class ColaHandler(QueueHandler):
+    """QueueHandler que nunca bloquea: con la cola llena descarta y cuenta"""
+
+    def __init__(self, cola: queue.Queue):
+        super().__init__(cola)
+        self.descartados = 0
+        self._lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Solo lo imprescindible en el hilo de la request: resolver el mensaje y la traza
+        # (los args pueden ser objetos mutables); el formato JSON lo hace el hilo de fondo
+        preparado = copy.copy(record)
+        preparado.msg = record.getMessage()
+        preparado.args = None
+        if record.exc_info:
+            preparado.exc_text = record.exc_text or logging.Formatter().formatException(record.exc_info)
+        preparado.exc_info = None
+        return preparado
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.descartados += 1
+
+class FiltroMuestreo(logging.Filter):
+    """Deja pasar 1 de cada round(1 / tasa) registros INFO/DEBUG del logger"""
+
+    def __init__(self, tasa: float):
+        super().__init__()
+        self.tasa = tasa
+        self.cada = max(1, round(1 / tasa)) if tasa > 0 else 0
+        self._contador = itertools.count()
+        self.emitidos = 0
+        self.omitidos = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        if self.cada and next(self._contador) % self.cada == 0:
+            self.emitidos += 1
+            return True
+        self.omitidos += 1
+        return False
+
+class EscritorCola(QueueListener):
+    """Hilo que vacía la cola; al parar espera a que haya hueco para el centinela"""
+
+    def enqueue_sentinel(self):
+        try:
+            self.queue.put(self._sentinel, timeout=5)
+        except queue.Full:
+            pass
+
+def _parsear_muestreo(valor: str) -> dict:
+    """"uvicorn.access=0.1,security=0.5" -> {"uvicorn.access": 0.1, "security": 0.5}"""
+    tasas = {}
+    for parte in valor.split(","):
+        if "=" in parte:
+            nombre, tasa = parte.split("=", 1)
+            tasas[nombre.strip()] = float(tasa)
+    return tasas
+
+# ===================================================
+# 🔧 CONFIGURACIÓN
+# ===================================================
+
+_handler = None
+_listener = None
+_filtros = {}
+_config_lock = threading.Lock()
+
+def configurar_logging():
+    """Conecta el root logger a la cola y arranca el hilo escritor (idempotente)"""
+    global _handler, _listener
+    with _config_lock:
+        if _listener is not None:
+            return
+
+        salida = logging.StreamHandler(sys.stdout)
+        if LOG_FORMAT == "json":
+            salida.setFormatter(FormatoJSON())
+        else:
+            salida.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+
+        _handler = ColaHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+        raiz = logging.getLogger()
+        raiz.handlers = [_handler]
+        raiz.setLevel(LOG_LEVEL)
+
+        for nombre in LOGGERS_REDIRIGIDOS:
+            logger = logging.getLogger(nombre)
+            logger.handlers = []
+            logger.propagate = True
+
+        for nombre, tasa in _parsear_muestreo(LOG_SAMPLING).items():
+            filtro = _filtros[nombre] = FiltroMuestreo(tasa)
+            logging.getLogger(nombre).addFilter(filtro)
+
+        _listener = EscritorCola(_handler.queue, salida)
+        _listener.start()
+        # Vaciar la cola al salir (scripts y parada ordenada de los workers)
+        atexit.register(_listener.stop)
+
+def estadisticas_logging() -> dict:
+    if _handler is None:
+        return {"activo": False}
+    return {
+        "activo": True,
+        "formato": LOG_FORMAT,
+        "en_cola": _handler.queue.qsize(),
+        "capacidad": LOG_QUEUE_SIZE,
+        "descartados": _handler.descartados,
+        "muestreo": {nombre: {"tasa": filtro.tasa, "emitidos": filtro.emitidos, "omitidos": filtro.omitidos}
+                     for nombre, filtro in _filtros.items()},
+    }
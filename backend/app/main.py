@@ -1,20 +1,36 @@
-from fastapi import FastAPI, Response
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from .routers import indicadores
-from .database import engine
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy import text
+from .routers import indicadores, hitos
+from .database import engine, engine_escritura, WriteSessionLocal, DB_ASYNC, async_engine, async_engine_escritura
+from .db_pool import estadisticas_pool
+from .middleware import CabecerasMiddleware
+from .metricas import MetricasMiddleware, registro as registro_metricas
 from .models import indicador
+from .crud.estadisticas import inicializar_estadisticas
+import logging
 import os
 import json
 from . import auth_azure
-from fastapi.security import OAuth2PasswordRequestForm
-from .auth import authenticate_user, create_access_token, Token, ACCESS_TOKEN_EXPIRE_MINUTES
-from datetime import timedelta
-from fastapi import status, HTTPException, Depends
-from .auth_ldap import authenticate_ldap_user, validate_corporate_email
+from .auth import cache_tokens, ejecutor_bcrypt
+from fastapi import Depends
+from .auth_ldap import cache_atributos, ejecutor_ldap
+from .security import limiter, limitar_peticiones, RATE_LIMIT_ENABLED, security_monitor
+from .logs import estadisticas_logging
+
+logger = logging.getLogger(__name__)
 
 # Crear las tablas en la base de datos
-indicador.Base.metadata.create_all(bind=engine)
+indicador.Base.metadata.create_all(bind=engine_escritura)
+
+# create_all no toca tablas existentes: crear los índices nuevos que falten
+for _tabla in indicador.Base.metadata.sorted_tables:
+    for _indice in _tabla.indexes:
+        _indice.create(bind=engine_escritura, checkfirst=True)
+
+# Poblar los contadores del dashboard si la tabla agregada es nueva
+with WriteSessionLocal() as _db:
+    inicializar_estadisticas(_db)
 
 app = FastAPI(
     title="Sistema de Indicadores API",
@@ -22,14 +38,6 @@ app = FastAPI(
     version="1.0.0"
 )
 
-# Middleware personalizado para UTF-8
-@app.middleware("http")
-async def add_utf8_headers(request, call_next):
-    response = await call_next(request)
-    if "application/json" in response.headers.get("content-type", ""):
-        response.headers["content-type"] = "application/json; charset=utf-8"
-    return response
-
 # 🌐 CONFIGURACIÓN CORS FLEXIBLE
 def get_allowed_origins():
     """Obtiene los orígenes permitidos desde variables de entorno o configuración por defecto"""
@@ -39,7 +47,7 @@ def get_allowed_origins():
     if env_origins:
         # Convertir string separado por comas a lista
         origins = [origin.strip() for origin in env_origins.split(",") if origin.strip()]
-        print(f"🔒 CORS desde ALLOWED_ORIGINS: {origins}")
+        logger.info(f"🔒 CORS desde ALLOWED_ORIGINS: {origins}")
         return origins
     
     # 2️⃣ Detectar si es producción Railway
@@ -77,99 +85,44 @@ def get_allowed_origins():
         
         # 🔧 FALLBACK: Si no funciona, permitir todos temporalmente
         if len(all_origins) > 10:  # Si hay muchas URLs, simplificar
-            print("🔧 CORS: Demasiadas URLs, usando patrón permisivo temporal")
+            logger.info("🔧 CORS: Demasiadas URLs, usando patrón permisivo temporal")
             return ["*"]
         
-        print(f"🔒 CORS producción automático: {all_origins}")
+        logger.info(f"🔒 CORS producción automático: {all_origins}")
         return all_origins
     
     # 3️⃣ Desarrollo local - permisivo
     else:
-        print("🔧 CORS desarrollo - permitir todos los orígenes")
+        logger.info("🔧 CORS desarrollo - permitir todos los orígenes")
         return ["*"]
 
 # 🌐 APLICAR CONFIGURACIÓN CORS CON MIDDLEWARE PERSONALIZADO
 allowed_origins = get_allowed_origins()
 
-# Middleware CORS personalizado para Railway
-@app.middleware("http")
-async def custom_cors_middleware(request, call_next):
-    # Obtener el origen de la petición
-    origin = request.headers.get("origin")
-    
-    # Ejecutar la petición
-    response = await call_next(request)
-    
-    # Determinar si permitir CORS
-    allow_cors = False
-    
-    if "*" in allowed_origins:
-        # Desarrollo - permitir todos
-        allow_cors = True
-        response.headers["Access-Control-Allow-Origin"] = "*"
-    elif origin:
-        # Verificar si el origen está en la lista permitida
-        if origin in allowed_origins:
-            allow_cors = True
-            response.headers["Access-Control-Allow-Origin"] = origin
-        # 🚨 SOLUCIÓN RAILWAY: Permitir subdominios de railway.app
-        elif ".railway.app" in origin and origin.startswith("https://"):
-            allow_cors = True
-            response.headers["Access-Control-Allow-Origin"] = origin
-            print(f"🚀 CORS: Permitido subdominio Railway: {origin}")
-    
-    # Aplicar headers CORS si está permitido
-    if allow_cors:
-        response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS"
-        response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization, Accept, X-Requested-With"
-        response.headers["Access-Control-Max-Age"] = "86400"
-    
-    return response
-
-# También aplicar el middleware estándar como backup
+# 🧱 Un solo middleware ASGI: CORS (con preflight), cabeceras de seguridad y UTF-8 en JSON
 app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"] if "*" in allowed_origins else allowed_origins + ["https://*.railway.app"],
-    allow_credentials=False,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    CabecerasMiddleware,
+    allowed_origins=allowed_origins,
+    produccion=os.getenv("ENVIRONMENT") == "production",
+    # 🚀 RAILWAY: Forzar HTTPS en producción
+    forzar_https=os.getenv("ENVIRONMENT") == "production" or bool(os.getenv("RAILWAY_ENVIRONMENT_NAME"))
 )
 
-print(f"🔒 CORS configurado con middleware personalizado para Railway")
+logger.info(f"🔒 CORS configurado con middleware personalizado para Railway")
 
-# ✅ NUEVO: Middleware de seguridad
-@app.middleware("http")
-async def add_security_headers(request, call_next):
-    response = await call_next(request)
-    
-    # 🚀 RAILWAY: Forzar HTTPS en producción
-    if os.getenv("ENVIRONMENT") == "production" or os.getenv("RAILWAY_ENVIRONMENT_NAME"):
-        # Forzar HTTPS en Railway
-        if request.headers.get("x-forwarded-proto") == "http":
-            # Redirigir a HTTPS
-            https_url = str(request.url).replace("http://", "https://", 1)
-            return Response(status_code=307, headers={"Location": https_url})
-    
-    # Headers de seguridad (solo en producción)
-    if os.getenv("ENVIRONMENT") == "production":
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-        response.headers["Content-Security-Policy"] = "default-src 'self'"
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        # 🔒 Railway: Forzar HTTPS siempre
-        response.headers["X-Railway-Force-HTTPS"] = "1"
-    
-    # UTF-8 para JSON
-    if "application/json" in response.headers.get("content-type", ""):
-        response.headers["content-type"] = "application/json; charset=utf-8"
-    
-    return response
+# 📈 Métricas por ruta (capa más externa: también cuenta preflights y redirecciones)
+app.add_middleware(MetricasMiddleware)
 
-# Incluir routers con prefijo /api
-app.include_router(indicadores.router, prefix="/api")
-app.include_router(auth_azure.router)
+# Incluir routers con prefijo /api (con rate limiting por IP si RATE_LIMIT_ENABLED=true)
+limites_api = [Depends(limitar_peticiones)] if RATE_LIMIT_ENABLED else []
+if DB_ASYNC:
+    # Mismos endpoints, async def sobre AsyncSession (DB_ASYNC=true)
+    from .routers import indicadores_async
+    app.include_router(indicadores_async.router, prefix="/api", dependencies=limites_api)
+else:
+    app.include_router(indicadores.router, prefix="/api", dependencies=limites_api)
+app.include_router(hitos.router, prefix="/api", dependencies=limites_api)
+app.include_router(auth_azure.router, dependencies=limites_api)
 
 @app.get("/")
 def read_root():
@@ -183,13 +136,54 @@ def read_root():
 
 @app.get("/health")
 def health_check():
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        database = "connected"
+    except Exception as e:
+        logger.error(f"❌ Health check sin base de datos: {e}")
+        database = "error"
     return {
-        "status": "healthy", 
+        "status": "healthy" if database == "connected" else "degraded",
         "message": "API funcionando correctamente",
-        "database": "connected",
+        "database": database,
         "version": "1.0.0"
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Métricas de este worker en formato de texto de Prometheus"""
+    return PlainTextResponse(registro_metricas.exportar(), media_type="text/plain; version=0.0.4")
+
+@app.get("/health/pool")
+def pool_stats():
+    """Estado del pool de conexiones de este worker (para dimensionar pool vs. workers)"""
+    datos = {"pid": os.getpid(), "sync": estadisticas_pool(engine)}
+    if engine_escritura is not engine:
+        datos["escritura"] = estadisticas_pool(engine_escritura)
+    if async_engine is not None:
+        datos["async"] = estadisticas_pool(async_engine)
+    if async_engine_escritura is not async_engine:
+        datos["async_escritura"] = estadisticas_pool(async_engine_escritura)
+    return datos
+
+@app.get("/health/auth")
+def auth_cache_stats():
+    """Caché de tokens verificados, cola de bcrypt, LDAP y rate limiting de este worker"""
+    return {
+        "pid": os.getpid(),
+        "tokens": cache_tokens.estadisticas(),
+        "bcrypt": ejecutor_bcrypt.estadisticas(),
+        "ldap": {"atributos": cache_atributos.estadisticas(), "binds": ejecutor_ldap.estadisticas()},
+        "rate_limit": {"activo": RATE_LIMIT_ENABLED, **limiter.estadisticas()},
+        "intentos_fallidos": security_monitor.failed_attempts.estadisticas()
+    }
+
+@app.get("/health/logs")
+def logs_stats():
+    """Cola de logging de este worker: pendientes, descartados y muestreo"""
+    return {"pid": os.getpid(), **estadisticas_logging()}
+
 @app.get("/test-cors")
 def test_cors():
     """Endpoint específico para probar CORS"""
@@ -214,8 +208,14 @@ def get_config():
     }
 
 # ✅ ENDPOINT DE LOGIN TRADICIONAL (COMENTADO TEMPORALMENTE)
-# Descomenta cuando tengas configurado el Active Directory
+# Descomenta cuando tengas configurado el Active Directory (imports incluidos)
 """
+from datetime import timedelta
+from fastapi import status, HTTPException
+from fastapi.security import OAuth2PasswordRequestForm
+from .auth import create_access_token, Token, ACCESS_TOKEN_EXPIRE_MINUTES
+from .auth_ldap import authenticate_ldap_user_async, validate_corporate_email
+
 @app.post("/api/auth/login", response_model=Token)
 async def login_tradicional(form_data: OAuth2PasswordRequestForm = Depends()):
     \"\"\"Endpoint para login tradicional con credenciales corporativas\"\"\"
@@ -231,9 +231,9 @@ async def login_tradicional(form_data: OAuth2PasswordRequestForm = Depends()):
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Autenticar contra Active Directory
+    # Autenticar contra Active Directory (bind en el pool acotado: no bloquea el event loop)
     try:
-        user_info = authenticate_ldap_user(email, password)
+        user_info = await authenticate_ldap_user_async(email, password)
     except HTTPException:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
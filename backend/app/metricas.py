@@ -0,0 +1,196 @@
+"""
+📈 Métricas en formato Prometheus (GET /metrics)
+Por ruta: requests, latencia, tamaño de respuesta, consultas y tiempo de base de datos;
+más requests en curso y un histograma global de consultas
+
+- MetricasMiddleware (ASGI puro) mide cada request; corre en el hilo del event loop,
+  así que los contadores por ruta se actualizan sin locks
+- Las consultas se miden con eventos del engine (before/after_cursor_execute) y se
+  acumulan en un contextvar de la request, también desde los hilos del threadpool
+- Cada worker expone sus propias métricas (Prometheus agrega por instancia)
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from sqlalchemy import event
+
+# Límites superiores de las cubetas (le="...")
+CUBETAS_LATENCIA_S = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CUBETAS_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+CUBETAS_CONSULTAS = (0, 1, 2, 5, 10, 25, 50, 100)
+CUBETAS_DB_S = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# Cualquier otro método se etiqueta como OTHER (evita series arbitrarias desde fuera)
+METODOS = frozenset(("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"))
+
+# ===================================================
+# 🧮 HISTOGRAMAS Y REGISTRO
+# ===================================================
+
+class Histograma:
+    """Cubetas no acumuladas (se acumulan al exportar); observar() es un bisect y dos sumas"""
+
+    __slots__ = ("limites", "cubetas", "suma", "cuenta")
+
+    def __init__(self, limites: tuple):
+        self.limites = limites
+        self.cubetas = [0] * (len(limites) + 1)  # La última es +Inf
+        self.suma = 0.0
+        self.cuenta = 0
+
+    def observar(self, valor: float):
+        self.cubetas[bisect_left(self.limites, valor)] += 1
+        self.suma += valor
+        self.cuenta += 1
+
+    def exportar(self, nombre: str, etiquetas: str, lineas: list):
+        acumulado = 0
+        separador = "," if etiquetas else ""
+        for limite, n in zip(self.limites + ("+Inf",), self.cubetas):
+            acumulado += n
+            lineas.append(f'{nombre}_bucket{{{etiquetas}{separador}le="{limite}"}} {acumulado}')
+        sufijo = f"{{{etiquetas}}}" if etiquetas else ""
+        lineas.append(f"{nombre}_sum{sufijo} {self.suma}")
+        lineas.append(f"{nombre}_count{sufijo} {self.cuenta}")
+
+class _MetricasRuta:
+    __slots__ = ("por_status", "latencia", "bytes", "consultas", "tiempo_db")
+
+    def __init__(self):
+        self.por_status = {}
+        self.latencia = Histograma(CUBETAS_LATENCIA_S)
+        self.bytes = Histograma(CUBETAS_BYTES)
+        self.consultas = Histograma(CUBETAS_CONSULTAS)
+        self.tiempo_db = Histograma(CUBETAS_DB_S)
+
+class RegistroMetricas:
+    """Métricas de este worker; las de request solo se tocan desde el event loop"""
+
+    def __init__(self):
+        self.rutas = {}  # (método, plantilla de ruta) -> _MetricasRuta
+        self.en_curso = 0
+        # Consultas de cualquier origen (requests, importaciones en segundo plano...)
+        self._lock_db = threading.Lock()
+        self.consultas_db = Histograma(CUBETAS_DB_S)
+
+    def registrar_request(self, metodo: str, ruta: str, status: int, segundos: float, bytes_: int,
+                          consultas: int, tiempo_db: float):
+        metricas = self.rutas.get((metodo, ruta))
+        if metricas is None:
+            metricas = self.rutas[(metodo, ruta)] = _MetricasRuta()
+        metricas.por_status[status] = metricas.por_status.get(status, 0) + 1
+        metricas.latencia.observar(segundos)
+        metricas.bytes.observar(bytes_)
+        metricas.consultas.observar(consultas)
+        metricas.tiempo_db.observar(tiempo_db)
+
+    def registrar_consulta(self, segundos: float):
+        with self._lock_db:
+            self.consultas_db.observar(segundos)
+
+    def exportar(self) -> str:
+        lineas = [
+            "# HELP http_requests_in_flight Requests en curso en este worker",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.en_curso}",
+            "# HELP http_requests_total Requests terminadas por ruta y status",
+            "# TYPE http_requests_total counter",
+        ]
+        rutas = sorted(self.rutas.items())
+        for (metodo, ruta), metricas in rutas:
+            for status, n in sorted(metricas.por_status.items()):
+                lineas.append(f'http_requests_total{{method="{metodo}",route="{ruta}",status="{status}"}} {n}')
+
+        for nombre, atributo, ayuda in (
+            ("http_request_duration_seconds", "latencia", "Latencia de la request"),
+            ("http_response_size_bytes", "bytes", "Tamaño del cuerpo de la respuesta"),
+            ("http_request_db_queries", "consultas", "Consultas a base de datos por request"),
+            ("http_request_db_seconds", "tiempo_db", "Tiempo en base de datos por request"),
+        ):
+            lineas.append(f"# HELP {nombre} {ayuda}")
+            lineas.append(f"# TYPE {nombre} histogram")
+            for (metodo, ruta), metricas in rutas:
+                getattr(metricas, atributo).exportar(nombre, f'method="{metodo}",route="{ruta}"', lineas)
+
+        lineas.append("# HELP db_query_duration_seconds Duración de cada consulta (todas las conexiones)")
+        lineas.append("# TYPE db_query_duration_seconds histogram")
+        with self._lock_db:
+            self.consultas_db.exportar("db_query_duration_seconds", "", lineas)
+        return "\n".join(lineas) + "\n"
+
+registro = RegistroMetricas()
+
+# ===================================================
+# 🗄️ TIEMPOS DE BASE DE DATOS (eventos del engine)
+# ===================================================
+
+# [consultas, segundos] de la request en curso (None fuera de una request)
+_db_request: ContextVar = ContextVar("metricas_db_request", default=None)
+
+def instrumentar_engine(engine):
+    """Mide cada consulta del engine (sync o async) y la suma a la request en curso"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _inicio(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metricas_inicio", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _fin(conn, cursor, statement, parameters, context, executemany):
+        segundos = time.perf_counter() - conn.info["metricas_inicio"].pop()
+        registro.registrar_consulta(segundos)
+        acumulado = _db_request.get()
+        if acumulado is not None:
+            acumulado[0] += 1
+            acumulado[1] += segundos
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(contexto):
+        # Una consulta fallida no llega a after_cursor_execute: descartar su inicio
+        inicios = contexto.connection.info.get("metricas_inicio") if contexto.connection is not None else None
+        if inicios:
+            inicios.pop()
+
+# ===================================================
+# ⏱️ MIDDLEWARE
+# ===================================================
+
+class MetricasMiddleware:
+    """Mide cada request HTTP; la ruta se etiqueta con su plantilla (/api/hitos/{hito_id})"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        status = 500
+        bytes_ = 0
+        acumulado = [0, 0.0]
+        token = _db_request.set(acumulado)
+
+        async def send_medido(message):
+            nonlocal status, bytes_
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                bytes_ += len(message.get("body", b""))
+            await send(message)
+
+        registro.en_curso += 1
+        try:
+            await self.app(scope, receive, send_medido)
+        finally:
+            registro.en_curso -= 1
+            _db_request.reset(token)
+            ruta = scope.get("route")
+            metodo = scope["method"]
+            registro.registrar_request(
+                metodo if metodo in METODOS else "OTHER", ruta.path if ruta is not None else "sin_ruta", status,
+                time.perf_counter() - inicio, bytes_, acumulado[0], acumulado[1]
+            )
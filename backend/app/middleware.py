@@ -0,0 +1,135 @@
+"""
+🧱 Middleware HTTP único (ASGI puro)
+Sustituye a add_utf8_headers, custom_cors_middleware, CORSMiddleware y add_security_headers
+
+- Cabeceras CORS y de seguridad precalculadas como tuplas de bytes al arrancar
+- Orígenes permitidos: conjunto exacto + regex compilada para subdominios de Railway
+- Preflight OPTIONS respondido aquí mismo, sin pasar por el enrutado de FastAPI
+- Redirección a HTTPS antes de ejecutar el endpoint (no después)
+"""
+
+import re
+
+# Subdominios https de railway.app (antes: ".railway.app" en cualquier parte del origen)
+PATRON_RAILWAY = r"https://([a-z0-9-]+\.)+railway\.app(:\d+)?"
+
+METODOS_CORS = b"GET, POST, PUT, PATCH, DELETE, OPTIONS"
+CABECERAS_CORS = b"Content-Type, Authorization, Accept, X-Requested-With"
+CABECERAS_EXPUESTAS = b"X-Next-Cursor, ETag"
+MAX_AGE_CORS = b"86400"
+
+CABECERAS_SEGURIDAD = [
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"x-xss-protection", b"1; mode=block"),
+    (b"strict-transport-security", b"max-age=31536000; includeSubDomains"),
+    (b"content-security-policy", b"default-src 'self'"),
+    (b"referrer-policy", b"strict-origin-when-cross-origin"),
+    # 🔒 Railway: Forzar HTTPS siempre
+    (b"x-railway-force-https", b"1"),
+]
+
+JSON_UTF8 = b"application/json; charset=utf-8"
+
+class CabecerasMiddleware:
+    """CORS + cabeceras de seguridad + charset UTF-8 en JSON, en una sola capa ASGI"""
+
+    def __init__(self, app, allowed_origins: list, produccion: bool = False, forzar_https: bool = False):
+        self.app = app
+        self.todos = "*" in allowed_origins
+        self.origenes = frozenset(origen.encode("latin-1") for origen in allowed_origins)
+        self.patron_origen = re.compile(PATRON_RAILWAY.encode())
+        self.forzar_https = forzar_https
+
+        comunes = [
+            (b"access-control-allow-methods", METODOS_CORS),
+            (b"access-control-max-age", MAX_AGE_CORS),
+        ]
+        # Respuestas normales: mismas cabeceras que ponía custom_cors_middleware
+        self.cors_respuesta = comunes + [
+            (b"access-control-allow-headers", CABECERAS_CORS),
+            (b"access-control-expose-headers", CABECERAS_EXPUESTAS),
+        ]
+        self.cors_preflight = comunes
+        self.cors_todos = [(b"access-control-allow-origin", b"*")]
+        self.seguridad = CABECERAS_SEGURIDAD if produccion else []
+
+    def origen_permitido(self, origen: bytes) -> bool:
+        return origen in self.origenes or self.patron_origen.fullmatch(origen) is not None
+
+    def _allow_origin(self, origen):
+        """Cabeceras allow-origin para la petición, o None si el origen no está permitido"""
+        if self.todos:
+            return self.cors_todos
+        if origen is not None and self.origen_permitido(origen):
+            return [(b"access-control-allow-origin", origen), (b"vary", b"Origin")]
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        origen = proto = host = metodo_preflight = cabeceras_preflight = None
+        for nombre, valor in scope["headers"]:
+            if nombre == b"origin":
+                origen = valor
+            elif nombre == b"x-forwarded-proto":
+                proto = valor
+            elif nombre == b"host":
+                host = valor
+            elif nombre == b"access-control-request-method":
+                metodo_preflight = valor
+            elif nombre == b"access-control-request-headers":
+                cabeceras_preflight = valor
+
+        if self.forzar_https and proto == b"http":
+            await self._redirigir_https(scope, host, send)
+            return
+
+        allow_origin = self._allow_origin(origen)
+
+        if scope["method"] == "OPTIONS" and origen is not None and metodo_preflight is not None:
+            await self._preflight(allow_origin, cabeceras_preflight, send)
+            return
+
+        extra = self.seguridad if allow_origin is None else allow_origin + self.cors_respuesta + self.seguridad
+
+        async def send_cabeceras(message):
+            if message["type"] == "http.response.start":
+                cabeceras = []
+                for nombre, valor in message.get("headers", ()):
+                    if nombre == b"content-type" and b"application/json" in valor:
+                        valor = JSON_UTF8
+                    cabeceras.append((nombre, valor))
+                cabeceras.extend(extra)
+                message["headers"] = cabeceras
+            await send(message)
+
+        await self.app(scope, receive, send_cabeceras)
+
+    async def _preflight(self, allow_origin, cabeceras_preflight, send):
+        if allow_origin is None:
+            cuerpo, estado, cabeceras = b"Disallowed CORS origin", 400, []
+        else:
+            # Se aceptan las cabeceras que pida el navegador (como CORSMiddleware con allow_headers=["*"])
+            cabeceras = allow_origin + self.cors_preflight + [
+                (b"access-control-allow-headers", cabeceras_preflight or CABECERAS_CORS)
+            ]
+            cuerpo, estado = b"OK", 200
+        cabeceras = cabeceras + self.seguridad + [
+            (b"content-type", b"text/plain; charset=utf-8"),
+            (b"content-length", str(len(cuerpo)).encode()),
+        ]
+        await send({"type": "http.response.start", "status": estado, "headers": cabeceras})
+        await send({"type": "http.response.body", "body": cuerpo})
+
+    async def _redirigir_https(self, scope, host, send):
+        # Algunos servidores (y el TestClient) dejan la query dentro de raw_path
+        ruta = (scope.get("raw_path") or scope["path"].encode()).split(b"?", 1)[0]
+        destino = b"https://" + (host or b"") + ruta
+        if scope.get("query_string"):
+            destino += b"?" + scope["query_string"]
+        await send({"type": "http.response.start", "status": 307,
+                    "headers": [(b"location", destino), (b"content-length", b"0")]})
+        await send({"type": "http.response.body", "body": b""})
@@ -1,10 +1,15 @@
-from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Text, ForeignKey, Enum, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from ..database import Base
 
 class Indicador(Base):
     __tablename__ = "indicadores"
+    __table_args__ = (
+        # Filtros de /indicadores/buscar (el id final permite paginar por keyset dentro del filtro)
+        Index("ix_indicadores_vp_area_tipo_id", "vp", "area", "tipoIndicador", "id"),
+        Index("ix_indicadores_responsable_id", "responsableGeneral", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     vp = Column(String, index=True)
@@ -22,9 +27,13 @@ class Indicador(Base):
 
 class Hito(Base):
     __tablename__ = "hitos"
+    __table_args__ = (
+        Index("ix_hitos_indicador_estado_fin", "indicador_id", "estadoHito", "fechaFinalizacionHito"),
+        Index("ix_hitos_estado_fin", "estadoHito", "fechaFinalizacionHito"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    indicador_id = Column(Integer, ForeignKey("indicadores.id"))
+    indicador_id = Column(Integer, ForeignKey("indicadores.id"), index=True)
     nombreHito = Column(String)
     fechaInicioHito = Column(Date)
     fechaFinalizacionHito = Column(Date)
@@ -34,4 +43,51 @@ class Hito(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    indicador = relationship("Indicador", back_populates="hitos") 
\ No newline at end of file
+    indicador = relationship("Indicador", back_populates="hitos") 
+
+class EstadisticaAgregada(Base):
+    """Contadores del dashboard por (vp, area, tipoIndicador), mantenidos en cada escritura"""
+    __tablename__ = "estadisticas_agregadas"
+    __table_args__ = (UniqueConstraint("vp", "area", "tipoIndicador", name="uq_estadisticas_clave"),)
+
+    id = Column(Integer, primary_key=True)
+    vp = Column(String, nullable=False, default="")
+    area = Column(String, nullable=False, default="")
+    tipoIndicador = Column(String, nullable=False, default="")
+    totalIndicadores = Column(Integer, nullable=False, default=0)
+    totalHitos = Column(Integer, nullable=False, default=0)
+    hitosCompletados = Column(Integer, nullable=False, default=0)
+    hitosEnProgreso = Column(Integer, nullable=False, default=0)
+    hitosPorComenzar = Column(Integer, nullable=False, default=0)
+    sumaAvance = Column(Float, nullable=False, default=0)
+    hitosConAvance = Column(Integer, nullable=False, default=0)
+
+class VersionDatos(Base):
+    """Fila única con un contador que sube en cada escritura (base de los ETag)"""
+    __tablename__ = "version_datos"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+class TrabajoImportacion(Base):
+    """Importación del Excel en segundo plano (POST /indicadores/cargar-datos)
+
+    `ranura` vale "importacion" mientras el trabajo está activo y NULL al terminar: el índice
+    único impide dos importaciones a la vez entre workers (NULL no cuenta para UNIQUE).
+    """
+    __tablename__ = "trabajos_importacion"
+
+    id = Column(String(32), primary_key=True)
+    modo = Column(String, nullable=False)
+    estado = Column(String, nullable=False, default="pendiente")  # pendiente | en_curso | completado | error
+    fase = Column(String, nullable=False, default="en_cola")
+    filasProcesadas = Column(Integer, nullable=False, default=0)
+    filasTotales = Column(Integer)
+    error = Column(Text)
+    resultado = Column(Text)  # JSON
+    ranura = Column(String, unique=True)
+    worker = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = Column(DateTime)
@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app.database import get_write_db
+from app.crud.hitos import update_hito, actualizar_hitos
+from app.schemas.indicador import Hito, HitoUpdate, LoteProgresoHitos
+
+router = APIRouter(
+    prefix="/hitos",
+    tags=["hitos"]
+)
+
+@router.patch("/progreso")
+def actualizar_progreso_endpoint(lote: LoteProgresoHitos, db: Session = Depends(get_write_db)):
+    """Avance/estado de muchos hitos en una transacción y un solo UPDATE (reporte semanal)"""
+    cambios = {}
+    for cambio in lote.cambios:
+        # Si un id se repite gana el último cambio
+        cambios.setdefault(cambio.id, {}).update(cambio.model_dump(exclude={"id"}, exclude_none=True))
+    actualizados = actualizar_hitos(db, cambios)
+    encontrados = set(actualizados)
+    return {
+        "actualizados": len(actualizados),
+        "no_encontrados": [hito_id for hito_id in cambios if hito_id not in encontrados]
+    }
+
+@router.patch("/{hito_id}", response_model=Hito)
+def update_hito_endpoint(hito_id: int, hito: HitoUpdate, db: Session = Depends(get_write_db)):
+    db_hito = update_hito(db, hito_id, hito.model_dump(exclude_unset=True))
+    if db_hito is None:
+        raise HTTPException(status_code=404, detail="Hito not found")
+    return db_hito
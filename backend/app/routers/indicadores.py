@@ -1,66 +1,217 @@
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
-from typing import List
-from app.database import get_db
-from app.crud.indicador import get_indicadores, get_indicador, create_indicador, update_indicador, delete_indicador, get_indicadores_by_area, get_estadisticas
-from app.schemas.indicador import Indicador, IndicadorCreate, IndicadorUpdate
+from typing import Any, Dict, List, Optional
+from app.database import get_db, get_write_db, SessionLocal, WriteSessionLocal
+from app.crud.indicador import CLAVES_INDICADOR, CLAVES_HITO, iterar_filas_exportacion, iterar_indicadores_exportacion
+from app.crud.indicador import get_indicadores, get_indicadores_filas, get_indicador, create_indicador, create_indicadores_bulk, update_indicador, delete_indicador, get_indicadores_by_area, get_estadisticas
+from app.crud.version import get_version
+from app.crud.trabajos import crear_trabajo, esta_abandonado, get_trabajo_activo
+from app.importacion import lanzar_importacion, estado_trabajo
+from app.schemas.indicador import Indicador, IndicadorCreate, IndicadorUpdate, FiltrosIndicadores
+from datetime import date
+import base64
+import csv
+import hashlib
+import io
 import json
+import orjson
 
 router = APIRouter(
     prefix="/indicadores",
     tags=["indicadores"]
 )
 
+def encode_cursor(last_id: int) -> str:
+    """Cursor opaco para la siguiente página (keyset sobre id)"""
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(padded))["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+def comprobar_etag(request: Request, version: int) -> str:
+    """ETag fuerte = versión de los datos + huella de la URL; responde 304 si el cliente ya la tiene"""
+    huella = hashlib.sha1(f"{request.url.path}?{request.url.query}".encode()).hexdigest()[:16]
+    etag = f'"{version}-{huella}"'
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        candidatos = {valor.strip().removeprefix("W/") for valor in if_none_match.split(",")}
+        if etag in candidatos or "*" in candidatos:
+            # FastAPI responde 304 sin cuerpo; no se consulta ni serializa nada más
+            raise HTTPException(status_code=304, headers=cabeceras_cache(etag))
+    return etag
+
+def etag_datos(request: Request, db: Session = Depends(get_db)) -> str:
+    """Dependencia de ETag para los GET.
+
+    La versión se lee antes que los datos: si una escritura se cuela en medio, el
+    ETag queda viejo y el siguiente request simplemente vuelve a descargar.
+    """
+    return comprobar_etag(request, get_version(db))
+
+def cabeceras_cache(etag: str) -> dict:
+    # no-cache: el navegador guarda la respuesta pero revalida siempre con If-None-Match
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+def pagina_response(data: list, limit: int, etag: str) -> ORJSONResponse:
+    """Respuesta de listado a partir de limit + 1 filas (la sobrante indica que hay más)"""
+    has_more = len(data) > limit
+    data = data[:limit]
+
+    # orjson serializa date/datetime directamente (ISO 8601), sin pasar por el ORM ni por pydantic
+    headers = {"Content-Type": "application/json; charset=utf-8", **cabeceras_cache(etag)}
+    if has_more and data:
+        # El cuerpo sigue siendo una lista; el cursor viaja en cabecera
+        headers["X-Next-Cursor"] = encode_cursor(data[-1]["id"])
+    return ORJSONResponse(content=data, headers=headers)
+
 @router.post("/", response_model=Indicador)
-def create_indicador_endpoint(indicador: IndicadorCreate, db: Session = Depends(get_db)):
+def create_indicador_endpoint(indicador: IndicadorCreate, db: Session = Depends(get_write_db)):
     return create_indicador(db, indicador)
 
-@router.get("/", response_model=List[Indicador])
-def read_indicadores_endpoint(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    indicadores = get_indicadores(db, skip=skip, limit=limit)
-    
-    # Convertir a dict para serialización manual
-    data = []
-    for indicador in indicadores:
-        indicador_dict = {
-            "id": indicador.id,
-            "vp": indicador.vp,
-            "area": indicador.area,
-            "nombreIndicador": indicador.nombreIndicador,
-            "tipoIndicador": indicador.tipoIndicador,
-            "fechaInicioGeneral": indicador.fechaInicioGeneral.isoformat() if indicador.fechaInicioGeneral else None,
-            "fechaFinalizacionGeneral": indicador.fechaFinalizacionGeneral.isoformat() if indicador.fechaFinalizacionGeneral else None,
-            "responsableGeneral": indicador.responsableGeneral,
-            "responsableCargaGeneral": indicador.responsableCargaGeneral,
-            "created_at": indicador.created_at.isoformat() if indicador.created_at else None,
-            "updated_at": indicador.updated_at.isoformat() if indicador.updated_at else None,
-            "hitos": []
-        }
-        
-        # Agregar hitos
-        for hito in indicador.hitos:
-            hito_dict = {
-                "id": hito.id,
-                "idHito": hito.id,  # Compatibilidad con frontend
-                "indicador_id": hito.indicador_id,
-                "nombreHito": hito.nombreHito,
-                "fechaInicioHito": hito.fechaInicioHito.isoformat() if hito.fechaInicioHito else None,
-                "fechaFinalizacionHito": hito.fechaFinalizacionHito.isoformat() if hito.fechaFinalizacionHito else None,
-                "avanceHito": hito.avanceHito,
-                "estadoHito": hito.estadoHito,
-                "responsableHito": hito.responsableHito,
-                "created_at": hito.created_at.isoformat() if hito.created_at else None,
-                "updated_at": hito.updated_at.isoformat() if hito.updated_at else None,
-            }
-            indicador_dict["hitos"].append(hito_dict)
-        
-        data.append(indicador_dict)
-    
-    # Devolver respuesta JSON con UTF-8 explícito
-    return JSONResponse(
-        content=data,
-        headers={"Content-Type": "application/json; charset=utf-8"}
+# Tope de elementos por llamada a /bulk
+MAX_BULK = 5000
+
+def validar_lote(items: list) -> tuple:
+    """Valida cada elemento una vez: (válidos [(índice, IndicadorCreate)], errores {índice: detalle})"""
+    validos, errores = [], {}
+    for indice, item in enumerate(items):
+        try:
+            validos.append((indice, IndicadorCreate.model_validate(item)))
+        except ValidationError as e:
+            errores[indice] = e.errors(include_url=False, include_context=False)
+    return validos, errores
+
+@router.post("/bulk")
+def create_indicadores_bulk_endpoint(
+    items: List[Dict[str, Any]] = Body(..., max_length=MAX_BULK),
+    atomic: bool = False,
+    db: Session = Depends(get_write_db)
+):
+    """Alta masiva de indicadores con hitos.
+
+    Sin atomic los elementos inválidos se informan en `errores` y el resto se crea;
+    con atomic=true cualquier error cancela el lote completo (422).
+    """
+    validos, errores = validar_lote(items)
+    if atomic and errores:
+        raise HTTPException(status_code=422, detail=[{"indice": i, "errores": e} for i, e in sorted(errores.items())])
+
+    try:
+        ids_creados, errores_db = create_indicadores_bulk(db, [indicador for _, indicador in validos], atomico=atomic)
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=422, detail=f"Lote cancelado: {getattr(e, 'orig', e)}")
+
+    ids = [None] * len(items)
+    for (indice, _), indicador_id in zip(validos, ids_creados):
+        ids[indice] = indicador_id
+    for posicion, error in errores_db.items():
+        errores[validos[posicion][0]] = [{"type": "database", "msg": error}]
+
+    return ORJSONResponse(content={
+        "creados": sum(1 for indicador_id in ids if indicador_id is not None),
+        "ids": ids,
+        "errores": [{"indice": i, "errores": e} for i, e in sorted(errores.items())]
+    })
+
+@router.get("/", response_model=List[Indicador], response_class=ORJSONResponse)
+def read_indicadores_endpoint(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    etag: str = Depends(etag_datos),
+    db: Session = Depends(get_db)
+):
+    after_id = decode_cursor(cursor) if cursor else None
+
+    # Pedimos una fila extra para saber si existe una página siguiente
+    data = get_indicadores_filas(db, skip=skip, limit=limit + 1, after_id=after_id)
+    return pagina_response(data, limit, etag)
+
+def filtros_busqueda(
+    vp: Optional[str] = None,
+    area: Optional[str] = None,
+    tipoIndicador: Optional[str] = None,
+    responsable: Optional[str] = None,
+    estadoHito: Optional[str] = None,
+    vence_desde: Optional[date] = None,
+    vence_hasta: Optional[date] = None,
+    ids: Optional[List[int]] = Query(None)
+) -> FiltrosIndicadores:
+    """Filtros de indicador: vp, area, tipoIndicador, responsable (general), ids.
+    Filtros de hito: estadoHito y rango de vencimiento (fechaFinalizacionHito)."""
+    return FiltrosIndicadores(
+        vp=vp,
+        area=area,
+        tipoIndicador=tipoIndicador,
+        responsable=responsable,
+        estadoHito=estadoHito,
+        venceDesde=vence_desde,
+        venceHasta=vence_hasta,
+        ids=ids
+    )
+
+@router.get("/buscar", response_model=List[Indicador], response_class=ORJSONResponse)
+def buscar_indicadores_endpoint(
+    filtros: FiltrosIndicadores = Depends(filtros_busqueda),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    etag: str = Depends(etag_datos),
+    db: Session = Depends(get_db)
+):
+    """Búsqueda en servidor; con filtros de hito solo se devuelven los hitos que cumplen"""
+    after_id = decode_cursor(cursor) if cursor else None
+    data = get_indicadores_filas(db, limit=limit + 1, after_id=after_id, filtros=filtros)
+    return pagina_response(data, limit, etag)
+
+def _exportar_ndjson():
+    """Un indicador (con sus hitos) por línea; sesión propia para vivir lo que dure el stream"""
+    db = SessionLocal()
+    try:
+        for lote in iterar_indicadores_exportacion(db):
+            yield b"".join(orjson.dumps(indicador) + b"\n" for indicador in lote)
+    finally:
+        db.close()
+
+def _exportar_csv():
+    """Una fila por hito (los indicadores sin hitos salen con las columnas de hito vacías)"""
+    cabecera = CLAVES_INDICADOR + [f"hito_{clave}" if clave in CLAVES_INDICADOR else clave for clave in CLAVES_HITO]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    # La cabecera sale antes de consultar nada: el primer byte llega de inmediato
+    writer.writerow(cabecera)
+    yield buffer.getvalue()
+
+    db = SessionLocal()
+    try:
+        for lote in iterar_filas_exportacion(db):
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(lote)
+            yield buffer.getvalue()
+    finally:
+        db.close()
+
+@router.get("/exportar")
+def exportar_indicadores_endpoint(formato: str = Query("ndjson", pattern="^(ndjson|csv)$")):
+    """Exportación completa indicadores + hitos en streaming (NDJSON o CSV) para BI"""
+    if formato == "csv":
+        contenido, media_type = _exportar_csv(), "text/csv"
+    else:
+        contenido, media_type = _exportar_ndjson(), "application/x-ndjson"
+    return StreamingResponse(
+        contenido,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="indicadores.{formato}"'}
     )
 
 @router.get("/area/{area}", response_model=List[Indicador])
@@ -68,65 +219,84 @@ def read_indicadores_by_area(area: str, db: Session = Depends(get_db)):
     return get_indicadores_by_area(db, area=area)
 
 @router.get("/{indicador_id}", response_model=Indicador)
-def read_indicador_endpoint(indicador_id: int, db: Session = Depends(get_db)):
+def read_indicador_endpoint(
+    indicador_id: int,
+    response: Response,
+    etag: str = Depends(etag_datos),
+    db: Session = Depends(get_db)
+):
     db_indicador = get_indicador(db, indicador_id=indicador_id)
     if db_indicador is None:
         raise HTTPException(status_code=404, detail="Indicador not found")
+    response.headers.update(cabeceras_cache(etag))
     return db_indicador
 
 @router.put("/{indicador_id}", response_model=Indicador)
-def update_indicador_endpoint(indicador_id: int, indicador: IndicadorUpdate, db: Session = Depends(get_db)):
+def update_indicador_endpoint(indicador_id: int, indicador: IndicadorUpdate, db: Session = Depends(get_write_db)):
     db_indicador = update_indicador(db, indicador_id=indicador_id, indicador=indicador)
     if db_indicador is None:
         raise HTTPException(status_code=404, detail="Indicador not found")
     return db_indicador
 
 @router.delete("/{indicador_id}")
-def delete_indicador_endpoint(indicador_id: int, db: Session = Depends(get_db)):
+def delete_indicador_endpoint(indicador_id: int, db: Session = Depends(get_write_db)):
     db_indicador = delete_indicador(db, indicador_id=indicador_id)
     if db_indicador is None:
         raise HTTPException(status_code=404, detail="Indicador not found")
     return {"ok": True}
 
 @router.get("/estadisticas/dashboard")
-def get_estadisticas_endpoint(db: Session = Depends(get_db)):
-    return get_estadisticas(db)
+def get_estadisticas_endpoint(
+    response: Response,
+    group_by: Optional[str] = Query(None, pattern="^(vp|area|tipoIndicador)$"),
+    etag: str = Depends(etag_datos),
+    db: Session = Depends(get_db)
+):
+    response.headers.update(cabeceras_cache(etag))
+    return get_estadisticas(db, group_by=group_by)
 
-@router.post("/cargar-datos")
-def cargar_datos_endpoint(db: Session = Depends(get_db)):
-    """Endpoint para cargar DATOS REALES de la organización (del Excel original)"""
-    try:
-        # Importar y ejecutar la función de carga de datos reales
-        import sys
-        import os
-        
-        # Agregar directorio padre al path
-        parent_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        sys.path.append(parent_dir)
-        
-        from cargar_datos import verificar_y_cargar_datos_automatico
-        
-        # Ejecutar carga automática
-        result = verificar_y_cargar_datos_automatico()
-        
-        if result:
-            return {
-                "success": True,
-                "message": "Datos reales de la organización cargados correctamente",
-                "data_loaded": True
-            }
-        else:
-            return {
-                "success": True,
-                "message": "Los datos ya estaban cargados en la base de datos",
-                "data_loaded": False
-            }
-        
-    except Exception as e:
-        return {
-            "success": False,
-            "message": f"Error cargando datos reales: {str(e)}"
-        }
+@router.post("/cargar-datos", status_code=202)
+def cargar_datos_endpoint(
+    request: Request,
+    modo: str = Query("auto", pattern="^(auto|sync)$"),
+    db: Session = Depends(get_db)
+):
+    """Encola la importación de DATOS REALES de la organización (del Excel original)
+
+    modo=auto: carga solo si la base está vacía. modo=sync: upsert incremental con diff.
+    Responde al instante con el id del trabajo; solo una importación a la vez (409 si hay otra).
+    """
+    # La ranura se mira primero con el engine de lectura: con otra importación en curso
+    # se responde 409 sin esperar la conexión de escritura (en SQLite hay una sola)
+    activo = get_trabajo_activo(db)
+    trabajo_id = None
+    if activo is None or esta_abandonado(activo):
+        with WriteSessionLocal() as db_escritura:
+            trabajo_id = crear_trabajo(db_escritura, modo)
+        if trabajo_id is None:
+            # Otra petición ganó la ranura entre la lectura y el INSERT
+            db.rollback()
+            activo = get_trabajo_activo(db)
+    if trabajo_id is None:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Ya hay una importación en curso", "job_id": activo.id if activo else None}
+        )
+
+    lanzar_importacion(trabajo_id, modo)
+    return {
+        "job_id": trabajo_id,
+        "estado": "pendiente",
+        "status_url": f"{request.url.path.rstrip('/')}/{trabajo_id}"
+    }
+
+@router.get("/cargar-datos/{job_id}")
+def estado_carga_datos_endpoint(job_id: str, db: Session = Depends(get_db)):
+    """Fase, filas procesadas, filas/s y error (si lo hubo) de una importación"""
+    estado = estado_trabajo(db, job_id)
+    if estado is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return estado
 
 @router.get("/test-utf8")
 def test_utf8_endpoint():
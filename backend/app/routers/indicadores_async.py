@@ -0,0 +1,96 @@
+"""
+Router async de indicadores (se usa en lugar de routers.indicadores con DB_ASYNC=true)
+
+Los endpoints de lectura/escritura frecuentes son async def sobre AsyncSession; el resto
+(exportación, carga de Excel, utilidades) se reutiliza tal cual del router síncrono.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.database import get_async_db, get_async_write_db
+from app.crud import indicador_async as crud
+from app.schemas.indicador import Indicador, IndicadorCreate, IndicadorUpdate, FiltrosIndicadores
+from app.routers import indicadores as sync
+from app.routers.indicadores import decode_cursor, comprobar_etag, cabeceras_cache, pagina_response, filtros_busqueda
+
+router = APIRouter(
+    prefix="/indicadores",
+    tags=["indicadores"]
+)
+
+async def etag_datos(request: Request, db: AsyncSession = Depends(get_async_db)) -> str:
+    return comprobar_etag(request, await crud.get_version(db))
+
+@router.post("/", response_model=Indicador)
+async def create_indicador_endpoint(indicador: IndicadorCreate, db: AsyncSession = Depends(get_async_write_db)):
+    return await crud.create_indicador(db, indicador)
+
+@router.get("/", response_model=List[Indicador], response_class=ORJSONResponse)
+async def read_indicadores_endpoint(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    etag: str = Depends(etag_datos),
+    db: AsyncSession = Depends(get_async_db)
+):
+    after_id = decode_cursor(cursor) if cursor else None
+    data = await crud.get_indicadores_filas(db, skip=skip, limit=limit + 1, after_id=after_id)
+    return pagina_response(data, limit, etag)
+
+@router.get("/buscar", response_model=List[Indicador], response_class=ORJSONResponse)
+async def buscar_indicadores_endpoint(
+    filtros: FiltrosIndicadores = Depends(filtros_busqueda),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    etag: str = Depends(etag_datos),
+    db: AsyncSession = Depends(get_async_db)
+):
+    after_id = decode_cursor(cursor) if cursor else None
+    data = await crud.get_indicadores_filas(db, limit=limit + 1, after_id=after_id, filtros=filtros)
+    return pagina_response(data, limit, etag)
+
+@router.get("/estadisticas/dashboard")
+async def get_estadisticas_endpoint(
+    response: Response,
+    group_by: Optional[str] = Query(None, pattern="^(vp|area|tipoIndicador)$"),
+    etag: str = Depends(etag_datos),
+    db: AsyncSession = Depends(get_async_db)
+):
+    response.headers.update(cabeceras_cache(etag))
+    return await crud.get_estadisticas(db, group_by=group_by)
+
+# Rutas estáticas del router síncrono sin versión async: van antes de /{indicador_id}
+_rutas_async = {(ruta.path, metodo) for ruta in router.routes for metodo in ruta.methods}
+router.routes.extend(
+    ruta for ruta in sync.router.routes
+    if not any((ruta.path, metodo) in _rutas_async for metodo in ruta.methods)
+    and "{indicador_id}" not in ruta.path
+)
+
+@router.get("/{indicador_id}", response_model=Indicador)
+async def read_indicador_endpoint(
+    indicador_id: int,
+    response: Response,
+    etag: str = Depends(etag_datos),
+    db: AsyncSession = Depends(get_async_db)
+):
+    db_indicador = await crud.get_indicador(db, indicador_id=indicador_id)
+    if db_indicador is None:
+        raise HTTPException(status_code=404, detail="Indicador not found")
+    response.headers.update(cabeceras_cache(etag))
+    return db_indicador
+
+@router.put("/{indicador_id}", response_model=Indicador)
+async def update_indicador_endpoint(indicador_id: int, indicador: IndicadorUpdate, db: AsyncSession = Depends(get_async_write_db)):
+    db_indicador = await crud.update_indicador(db, indicador_id=indicador_id, indicador=indicador)
+    if db_indicador is None:
+        raise HTTPException(status_code=404, detail="Indicador not found")
+    return db_indicador
+
+@router.delete("/{indicador_id}")
+async def delete_indicador_endpoint(indicador_id: int, db: AsyncSession = Depends(get_async_write_db)):
+    if not await crud.delete_indicador(db, indicador_id=indicador_id):
+        raise HTTPException(status_code=404, detail="Indicador not found")
+    return {"ok": True}
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator
 from datetime import datetime, date
 from typing import Optional, List
 
@@ -22,6 +22,33 @@ class Hito(HitoBase):
     class Config:
         from_attributes = True
 
+class _CambioParcial(BaseModel):
+    """Campos opcionales para omitirlos, pero sin null explícito (no se guarda NULL en la base)"""
+
+    @field_validator("*")
+    @classmethod
+    def rechazar_nulos(cls, valor):
+        if valor is None:
+            raise ValueError("no admite null; omite el campo para no cambiarlo")
+        return valor
+
+class HitoUpdate(_CambioParcial):
+    nombreHito: Optional[str] = None
+    fechaInicioHito: Optional[date] = None
+    fechaFinalizacionHito: Optional[date] = None
+    avanceHito: Optional[float] = None
+    estadoHito: Optional[str] = None
+    responsableHito: Optional[str] = None
+
+class HitoProgreso(_CambioParcial):
+    """Un cambio del lote de PATCH /hitos/progreso"""
+    id: int
+    avanceHito: Optional[float] = None
+    estadoHito: Optional[str] = None
+
+class LoteProgresoHitos(BaseModel):
+    cambios: List[HitoProgreso] = Field(..., max_length=1000)
+
 class IndicadorBase(BaseModel):
     vp: str
     area: str
@@ -52,4 +79,15 @@ class IndicadorUpdate(BaseModel):
     fechaInicioGeneral: Optional[date] = None
     fechaFinalizacionGeneral: Optional[date] = None
     responsableGeneral: Optional[str] = None
-    responsableCargaGeneral: Optional[str] = None 
\ No newline at end of file
+    responsableCargaGeneral: Optional[str] = None 
+
+class FiltrosIndicadores(BaseModel):
+    """Filtros de /indicadores/buscar (None = sin filtrar)"""
+    vp: Optional[str] = None
+    area: Optional[str] = None
+    tipoIndicador: Optional[str] = None
+    responsable: Optional[str] = None
+    estadoHito: Optional[str] = None
+    venceDesde: Optional[date] = None
+    venceHasta: Optional[date] = None
+    ids: Optional[List[int]] = None
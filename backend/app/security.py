@@ -3,14 +3,14 @@
 Implementa rate limiting, validaciones y protecciones adicionales
 """
 
+import codecs
 import os
-import time
-from typing import Dict, Optional
+from typing import Iterable, Optional, Union
 from fastapi import Request, HTTPException, status
-from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
 import logging
+from .ventanas import crear_contador, SECURITY_STATE_DB
+from .limites import LimitadorTokens, BackendMemoria, BackendSQLite
 
 # ===================================================
 # 🚦 CONFIGURACIÓN RATE LIMITING
@@ -19,36 +19,106 @@ import logging
 # Configuración desde variables de entorno
 RATE_LIMIT_REQUESTS = int(os.getenv("RATE_LIMIT_REQUESTS", "100"))
 RATE_LIMIT_WINDOW = int(os.getenv("RATE_LIMIT_WINDOW", "60"))
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "false").lower() == "true"
+# Tokens que cada worker reserva de golpe y segundos antes de devolver los no usados
+RATE_LIMIT_BATCH = int(os.getenv("RATE_LIMIT_BATCH", str(max(1, RATE_LIMIT_REQUESTS // 20))))
+RATE_LIMIT_SYNC_S = float(os.getenv("RATE_LIMIT_SYNC_S", "1"))
 
-# Inicializar rate limiter
-limiter = Limiter(key_func=get_remote_address)
+# Proxies de confianza delante de la app (Railway: 1). Cada uno añade a X-Forwarded-For la IP
+# que vio: la del cliente es la N-ésima desde la derecha; las de la izquierda las puede
+# escribir el propio cliente. Con 0 se usa la IP de la conexión
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "1" if os.getenv("RAILWAY_ENVIRONMENT_NAME") else "0"))
+
+# Intentos fallidos: más de SECURITY_FAILED_MAX en la ventana bloquean la IP
+SECURITY_FAILED_WINDOW_S = int(os.getenv("SECURITY_FAILED_WINDOW_S", "3600"))
+SECURITY_FAILED_MAX = int(os.getenv("SECURITY_FAILED_MAX", "10"))
+SECURITY_TRACKED_IPS = int(os.getenv("SECURITY_TRACKED_IPS", "10000"))
+
+# Inicializar rate limiter: bucket compartido entre workers si SECURITY_STATE_DB está definido
+limiter = LimitadorTokens(
+    BackendSQLite(SECURITY_STATE_DB) if SECURITY_STATE_DB else BackendMemoria(),
+    RATE_LIMIT_REQUESTS,
+    RATE_LIMIT_WINDOW,
+    lote=RATE_LIMIT_BATCH,
+    sincronizar_s=RATE_LIMIT_SYNC_S
+)
+
+async def limitar_peticiones(request: Request):
+    """Dependencia FastAPI: 429 cuando la IP supera RATE_LIMIT_REQUESTS por RATE_LIMIT_WINDOW
+
+    La reserva local y BackendMemoria se resuelven en el event loop; solo la consulta a
+    SECURITY_STATE_DB (BEGIN IMMEDIATE en SQLite) pasa por el threadpool.
+    """
+    if not await limiter.permitir_async(get_client_ip(request)):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded",
+            headers={"Retry-After": str(limiter.reintentar_en())}
+        )
 
 # ===================================================
 # 📊 LOGGING DE SEGURIDAD
 # ===================================================
 
-# Configurar logging de seguridad
+# Logger de seguridad: sin handler propio, sale por la cola del root (ver logs.py)
 security_logger = logging.getLogger("security")
 security_logger.setLevel(logging.INFO)
 
-# Handler para logs de seguridad
-if not security_logger.handlers:
-    handler = logging.StreamHandler()
-    formatter = logging.Formatter(
-        '%(asctime)s - SECURITY - %(levelname)s - %(message)s'
-    )
-    handler.setFormatter(formatter)
-    security_logger.addHandler(handler)
-
 # ===================================================
 # 🔍 DETECCIÓN DE ATAQUES
 # ===================================================
 
+class DetectorPatrones:
+    """Busca cualquiera de los patrones en un texto (ya en minúsculas).
+
+    Los patrones que contienen a otro se descartan ("<script" y "javascript:" ya los cubre
+    "script"). La búsqueda usa `in` de CPython por patrón: medido en
+    benchmarks/bench_patrones_seguridad.py, una regex combinada (trie) recorre el texto una
+    sola vez pero es más lenta que los escaneos en C salvo en textos de pocas decenas de bytes.
+    """
+
+    def __init__(self, patrones: Iterable[str]):
+        patrones = [p.lower() for p in patrones]
+        self.patrones = tuple(dict.fromkeys(p for p in patrones if not any(q != p and q in p for q in patrones)))
+        self.max_len = max((len(p) for p in self.patrones), default=0)
+
+    def buscar(self, texto_lower: str) -> Optional[str]:
+        """Primer patrón presente o None"""
+        for patron in self.patrones:
+            if patron in texto_lower:
+                return patron
+        return None
+
+    def escaner(self) -> "EscanerPatrones":
+        return EscanerPatrones(self)
+
+class EscanerPatrones:
+    """Variante en streaming: revisa fragmento a fragmento sin acumular el cuerpo.
+
+    Solo guarda los últimos max_len - 1 caracteres para detectar patrones partidos
+    entre dos fragmentos; los bytes se decodifican de forma incremental (UTF-8).
+    """
+
+    def __init__(self, detector: DetectorPatrones):
+        self.detector = detector
+        self._cola = ""
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    def alimentar(self, fragmento: Union[str, bytes], final: bool = False) -> Optional[str]:
+        if isinstance(fragmento, bytes):
+            fragmento = self._decoder.decode(fragmento, final=final)
+        texto = self._cola + fragmento.lower()
+        self._cola = texto[-(self.detector.max_len - 1):] if self.detector.max_len > 1 else ""
+        return self.detector.buscar(texto)
+
 class SecurityMonitor:
     """Monitor de seguridad para detectar patrones de ataque"""
     
     def __init__(self):
-        self.failed_attempts: Dict[str, list] = {}
+        # IP -> intentos en la última hora (anillo de cubetas de 1 min, IPs acotadas por LRU)
+        self.failed_attempts = crear_contador(
+            SECURITY_FAILED_WINDOW_S, capacidad=SECURITY_TRACKED_IPS, tabla="intentos_fallidos"
+        )
         self.suspicious_patterns = [
             "script",
             "javascript:",
@@ -71,32 +141,18 @@ class SecurityMonitor:
             "wget",
             "curl",
         ]
+        self.detector = DetectorPatrones(self.suspicious_patterns)
     
     def log_failed_attempt(self, ip_address: str, endpoint: str, reason: str):
         """Registra intento fallido de acceso"""
-        current_time = time.time()
-        
-        if ip_address not in self.failed_attempts:
-            self.failed_attempts[ip_address] = []
-        
-        self.failed_attempts[ip_address].append({
-            "timestamp": current_time,
-            "endpoint": endpoint,
-            "reason": reason
-        })
-        
-        # Limpiar intentos antiguos (más de 1 hora)
-        self.failed_attempts[ip_address] = [
-            attempt for attempt in self.failed_attempts[ip_address]
-            if current_time - attempt["timestamp"] < 3600
-        ]
+        intentos = self.failed_attempts.registrar(ip_address)
         
         security_logger.warning(
             f"Failed attempt from {ip_address} on {endpoint}: {reason}"
         )
         
         # Bloquear IP si hay muchos intentos fallidos
-        if len(self.failed_attempts[ip_address]) > 10:
+        if intentos > SECURITY_FAILED_MAX:
             security_logger.error(
                 f"IP {ip_address} blocked due to excessive failed attempts"
             )
@@ -107,16 +163,49 @@ class SecurityMonitor:
     
     def check_malicious_input(self, input_data: str) -> bool:
         """Verifica si el input contiene patrones maliciosos"""
-        input_lower = input_data.lower()
+        pattern = self.detector.buscar(input_data.lower())
+        if pattern is not None:
+            security_logger.warning(
+                f"Malicious pattern detected: {pattern} in input: {input_data[:100]}"
+            )
+            return True
         
-        for pattern in self.suspicious_patterns:
-            if pattern in input_lower:
-                security_logger.warning(
-                    f"Malicious pattern detected: {pattern} in input: {input_data[:100]}"
-                )
+        return False
+    
+    def check_malicious_stream(self, chunks: Iterable[Union[str, bytes]]) -> bool:
+        """Igual que check_malicious_input pero sobre fragmentos (no concatena el cuerpo)"""
+        escaner = self.detector.escaner()
+        for chunk in chunks:
+            pattern = escaner.alimentar(chunk)
+            if pattern is not None:
+                security_logger.warning(f"Malicious pattern detected in stream: {pattern}")
                 return True
+        return escaner.alimentar(b"", final=True) is not None
+    
+    def inspect_receive(self, receive, client_ip: str, endpoint: str):
+        """Envuelve el `receive` ASGI: cada fragmento del cuerpo se revisa al pasar hacia la app.
+
+        Si aparece un patrón, la lectura del cuerpo falla con 400 (la app no llega a procesarlo).
+        """
+        escaner = self.detector.escaner()
         
-        return False
+        async def receive_inspeccionado():
+            message = await receive()
+            if message["type"] == "http.request":
+                pattern = escaner.alimentar(message.get("body", b""), final=not message.get("more_body", False))
+                if pattern is not None:
+                    security_logger.warning(f"Malicious pattern detected in body from {client_ip} on {endpoint}: {pattern}")
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail="Malicious input detected"
+                    )
+            return message
+        
+        return receive_inspeccionado
+    
+    def is_blocked(self, ip_address: str) -> bool:
+        """True si la IP ya superó el máximo de intentos fallidos en la ventana"""
+        return self.failed_attempts.contar(ip_address) > SECURITY_FAILED_MAX
     
     def validate_request_size(self, request: Request, max_size_mb: int = 10):
         """Valida el tamaño de la request"""
@@ -141,7 +230,7 @@ async def security_middleware(request: Request, call_next):
     """Middleware de seguridad para todas las requests"""
     
     # Obtener IP del cliente
-    client_ip = get_remote_address(request)
+    client_ip = get_client_ip(request)
     
     # Validar tamaño de request
     try:
@@ -209,15 +298,13 @@ def validate_input_security(func):
 # ===================================================
 
 def get_client_ip(request: Request) -> str:
-    """Obtiene la IP real del cliente considerando proxies"""
-    forwarded_for = request.headers.get("x-forwarded-for")
-    if forwarded_for:
-        return forwarded_for.split(",")[0].strip()
-    
-    real_ip = request.headers.get("x-real-ip")
-    if real_ip:
-        return real_ip
-    
+    """Obtiene la IP real del cliente: la que anotó el proxy de confianza más externo (TRUSTED_PROXY_HOPS)"""
+    if TRUSTED_PROXY_HOPS > 0:
+        saltos = [ip.strip() for cabecera in request.headers.getlist("x-forwarded-for")
+                  for ip in cabecera.split(",") if ip.strip()]
+        if len(saltos) >= TRUSTED_PROXY_HOPS:
+            return saltos[-TRUSTED_PROXY_HOPS]
+    # Sin proxies de confianza (o cabecera incompleta): la conexión directa
     return get_remote_address(request)
 
 def is_internal_ip(ip: str) -> bool:
@@ -0,0 +1,214 @@
+"""
+⏱️ Contadores por ventana deslizante con memoria acotada
+Usados por SecurityMonitor para los intentos fallidos por IP
+
+- Cada clave es un anillo de N cubetas (ventana / N segundos cada una) con su total:
+  registrar y contar son O(1) amortizado, sin listas que crecen con cada intento
+- Claves en LRU con capacidad máxima; las que no reciben eventos en una ventana caducan
+  (en SQLite la capacidad se aplica al purgar, borrando las claves con actividad más antigua)
+- ContadorVentanasSQLite comparte los contadores entre los workers de un mismo nodo
+  a través de un fichero SQLite (SECURITY_STATE_DB)
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from .db_sqlite import SQLITE_BUSY_TIMEOUT_MS
+
+# Fichero SQLite compartido por los workers del nodo ("" = contadores en memoria de cada worker)
+SECURITY_STATE_DB = os.getenv("SECURITY_STATE_DB", "")
+
+# ===================================================
+# 🧮 CONTADOR EN MEMORIA (por worker)
+# ===================================================
+
+class _Anillo:
+    """Cubetas de una clave; `ultima` es el índice absoluto (tiempo // ancho) de la más reciente"""
+
+    __slots__ = ("cubetas", "ultima", "total")
+
+    def __init__(self, n_cubetas: int, actual: int):
+        self.cubetas = [0] * n_cubetas
+        self.ultima = actual
+        self.total = 0
+
+    def avanzar(self, actual: int):
+        """Vacía las cubetas que han salido de la ventana (como mucho N por llamada)"""
+        n = len(self.cubetas)
+        pasos = actual - self.ultima
+        if pasos <= 0:
+            return
+        if pasos >= n:
+            self.cubetas = [0] * n
+            self.total = 0
+        else:
+            for indice in range(self.ultima + 1, actual + 1):
+                posicion = indice % n
+                self.total -= self.cubetas[posicion]
+                self.cubetas[posicion] = 0
+        self.ultima = actual
+
+class ContadorVentanas:
+    """Eventos por clave en los últimos `ventana` segundos (resolución ventana / n_cubetas).
+
+    Memoria: como mucho `capacidad` claves × `n_cubetas` enteros. Al llenarse se descarta
+    la clave usada hace más tiempo.
+    """
+
+    def __init__(self, ventana: float, n_cubetas: int = 60, capacidad: int = 10_000):
+        self.ventana = ventana
+        self.n_cubetas = n_cubetas
+        self.ancho = ventana / n_cubetas
+        self.capacidad = capacidad
+        self._claves = OrderedDict()
+        self._lock = threading.Lock()
+        self.descartadas = 0
+
+    def _cubeta(self, ahora: float = None) -> int:
+        return int((time.time() if ahora is None else ahora) // self.ancho)
+
+    def _caducar(self, actual: int):
+        # La cabeza del LRU es la clave menos reciente: si no ha caducado, ninguna lo ha hecho
+        while self._claves:
+            clave, anillo = next(iter(self._claves.items()))
+            if actual - anillo.ultima < self.n_cubetas:
+                break
+            del self._claves[clave]
+
+    def registrar(self, clave: str, ahora: float = None) -> int:
+        """Suma un evento y devuelve el total de la clave en la ventana"""
+        actual = self._cubeta(ahora)
+        with self._lock:
+            anillo = self._claves.get(clave)
+            if anillo is None:
+                self._caducar(actual)
+                if len(self._claves) >= self.capacidad:
+                    self._claves.popitem(last=False)
+                    self.descartadas += 1
+                anillo = self._claves[clave] = _Anillo(self.n_cubetas, actual)
+            else:
+                self._claves.move_to_end(clave)
+                anillo.avanzar(actual)
+            anillo.cubetas[actual % self.n_cubetas] += 1
+            anillo.total += 1
+            return anillo.total
+
+    def contar(self, clave: str, ahora: float = None) -> int:
+        actual = self._cubeta(ahora)
+        with self._lock:
+            anillo = self._claves.get(clave)
+            if anillo is None:
+                return 0
+            anillo.avanzar(actual)
+            return anillo.total
+
+    def olvidar(self, clave: str):
+        with self._lock:
+            self._claves.pop(clave, None)
+
+    def estadisticas(self) -> dict:
+        return {"backend": "memoria", "claves": len(self._claves), "capacidad": self.capacidad,
+                "descartadas": self.descartadas}
+
+# ===================================================
+# 🤝 CONTADOR COMPARTIDO ENTRE WORKERS (SQLite)
+# ===================================================
+
+def abrir_estado_compartido(ruta: str) -> sqlite3.Connection:
+    """Conexión en autocommit y WAL al fichero de estado compartido (una por hilo)"""
+    conexion = sqlite3.connect(ruta, isolation_level=None, check_same_thread=False,
+                               timeout=SQLITE_BUSY_TIMEOUT_MS / 1000)
+    conexion.execute("PRAGMA journal_mode=WAL")
+    conexion.execute("PRAGMA synchronous=OFF")  # Estado efímero: no merece un fsync
+    return conexion
+
+class ContadorVentanasSQLite:
+    """Misma interfaz que ContadorVentanas, con las cubetas en una tabla (clave, cubeta) -> n.
+
+    Cada operación toca como mucho n_cubetas filas por clave primaria. Cada `purgar_cada`
+    registros se borran las cubetas fuera de la ventana y, si quedan más de `capacidad`
+    claves, las de actividad más antigua: la tabla queda acotada por TTL y por número de
+    claves (como mucho capacidad + purgar_cada entre dos purgas).
+    """
+
+    def __init__(self, ruta: str, ventana: float, n_cubetas: int = 60, purgar_cada: int = 1000,
+                 tabla: str = "ventanas", capacidad: int = 10_000):
+        self.ruta = ruta
+        self.ventana = ventana
+        self.n_cubetas = n_cubetas
+        self.ancho = ventana / n_cubetas
+        self.purgar_cada = purgar_cada
+        self.tabla = tabla
+        self.capacidad = capacidad
+        self._local = threading.local()
+        self._registros = 0
+        self.descartadas = 0
+        self._conexion().execute(
+            f"CREATE TABLE IF NOT EXISTS {tabla} ("
+            "clave TEXT NOT NULL, cubeta INTEGER NOT NULL, n INTEGER NOT NULL, "
+            "PRIMARY KEY (clave, cubeta)) WITHOUT ROWID"
+        )
+
+    def _conexion(self) -> sqlite3.Connection:
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is None:
+            conexion = self._local.conexion = abrir_estado_compartido(self.ruta)
+        return conexion
+
+    def _cubeta(self, ahora: float = None) -> int:
+        return int((time.time() if ahora is None else ahora) // self.ancho)
+
+    def registrar(self, clave: str, ahora: float = None) -> int:
+        actual = self._cubeta(ahora)
+        conexion = self._conexion()
+        conexion.execute(
+            f"INSERT INTO {self.tabla} (clave, cubeta, n) VALUES (?, ?, 1) "
+            "ON CONFLICT (clave, cubeta) DO UPDATE SET n = n + 1",
+            (clave, actual)
+        )
+        self._registros += 1
+        if self._registros % self.purgar_cada == 0:
+            self._purgar(conexion, actual)
+        return self.contar(clave, ahora)
+
+    def _purgar(self, conexion: sqlite3.Connection, actual: int):
+        # BEGIN IMMEDIATE: otro worker no purga ni registra entre la selección y el borrado
+        conexion.execute("BEGIN IMMEDIATE")
+        try:
+            conexion.execute(f"DELETE FROM {self.tabla} WHERE cubeta <= ?", (actual - self.n_cubetas,))
+            # Más claves que `capacidad`: fuera las de cubeta más reciente más antigua (LRU aproximado)
+            sobrantes = conexion.execute(
+                f"SELECT clave FROM {self.tabla} GROUP BY clave ORDER BY MAX(cubeta) DESC LIMIT -1 OFFSET ?",
+                (self.capacidad,)
+            ).fetchall()
+            if sobrantes:
+                conexion.executemany(f"DELETE FROM {self.tabla} WHERE clave = ?", sobrantes)
+            conexion.execute("COMMIT")
+        except Exception:
+            conexion.execute("ROLLBACK")
+            raise
+        self.descartadas += len(sobrantes)
+
+    def contar(self, clave: str, ahora: float = None) -> int:
+        actual = self._cubeta(ahora)
+        fila = self._conexion().execute(
+            f"SELECT COALESCE(SUM(n), 0) FROM {self.tabla} WHERE clave = ? AND cubeta > ?",
+            (clave, actual - self.n_cubetas)
+        ).fetchone()
+        return fila[0]
+
+    def olvidar(self, clave: str):
+        self._conexion().execute(f"DELETE FROM {self.tabla} WHERE clave = ?", (clave,))
+
+    def estadisticas(self) -> dict:
+        fila = self._conexion().execute(f"SELECT COUNT(DISTINCT clave), COUNT(*) FROM {self.tabla}").fetchone()
+        return {"backend": "sqlite", "ruta": self.ruta, "claves": fila[0], "cubetas": fila[1],
+                "capacidad": self.capacidad, "descartadas": self.descartadas}
+
+def crear_contador(ventana: float, n_cubetas: int = 60, capacidad: int = 10_000, tabla: str = "ventanas"):
+    """Contador compartido si SECURITY_STATE_DB está definido, en memoria si no"""
+    if SECURITY_STATE_DB:
+        return ContadorVentanasSQLite(SECURITY_STATE_DB, ventana, n_cubetas, tabla=tabla, capacidad=capacidad)
+    return ContadorVentanas(ventana, n_cubetas, capacidad)
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark del listado GET /api/indicadores
+Compara la ruta ORM original (lazy + dicts a mano + json) con la ruta Core + orjson
+
+Uso: python benchmarks/bench_listado_indicadores.py [n_hitos ...]
+"""
+
+import json
+import os
+import sys
+import time
+from datetime import date, datetime
+
+# Agregar el directorio backend al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import orjson
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models.indicador import Indicador, Hito
+from app.crud.indicador import get_indicadores_filas
+
+HITOS_POR_INDICADOR = 10
+ESTADOS = ["Completado", "En Progreso", "Por Comenzar"]
+
+def crear_datos(n_hitos: int):
+    """Base SQLite en memoria con n_hitos repartidos en indicadores de 10 hitos"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+
+    n_indicadores = max(1, n_hitos // HITOS_POR_INDICADOR)
+    ahora = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(Indicador), [
+            {
+                "id": i + 1,
+                "vp": f"VP{i % 5}",
+                "area": f"Área {i % 20}",
+                "nombreIndicador": f"Indicador {i}",
+                "tipoIndicador": "Gestion",
+                "fechaInicioGeneral": date(2025, 1, 1),
+                "fechaFinalizacionGeneral": date(2025, 12, 31),
+                "responsableGeneral": "Responsable",
+                "responsableCargaGeneral": "Carga",
+                "created_at": ahora,
+                "updated_at": ahora,
+            }
+            for i in range(n_indicadores)
+        ])
+        conn.execute(insert(Hito), [
+            {
+                "indicador_id": h % n_indicadores + 1,
+                "nombreHito": f"Hito {h}",
+                "fechaInicioHito": date(2025, 1, 1),
+                "fechaFinalizacionHito": date(2025, 6, 30),
+                "avanceHito": float(h % 101),
+                "estadoHito": ESTADOS[h % 3],
+                "responsableHito": "Responsable",
+                "created_at": ahora,
+                "updated_at": ahora,
+            }
+            for h in range(n_hitos)
+        ])
+    return engine, n_indicadores
+
+def _iso(valor):
+    return valor.isoformat() if valor else None
+
+def ruta_orm(db, limit):
+    """Ruta original: ORM con hitos lazy, dicts a mano e isoformat, json de la stdlib"""
+    data = []
+    for indicador in db.query(Indicador).offset(0).limit(limit).all():
+        data.append({
+            "id": indicador.id,
+            "vp": indicador.vp,
+            "area": indicador.area,
+            "nombreIndicador": indicador.nombreIndicador,
+            "tipoIndicador": indicador.tipoIndicador,
+            "fechaInicioGeneral": _iso(indicador.fechaInicioGeneral),
+            "fechaFinalizacionGeneral": _iso(indicador.fechaFinalizacionGeneral),
+            "responsableGeneral": indicador.responsableGeneral,
+            "responsableCargaGeneral": indicador.responsableCargaGeneral,
+            "created_at": _iso(indicador.created_at),
+            "updated_at": _iso(indicador.updated_at),
+            "hitos": [
+                {
+                    "id": hito.id,
+                    "idHito": hito.id,
+                    "indicador_id": hito.indicador_id,
+                    "nombreHito": hito.nombreHito,
+                    "fechaInicioHito": _iso(hito.fechaInicioHito),
+                    "fechaFinalizacionHito": _iso(hito.fechaFinalizacionHito),
+                    "avanceHito": hito.avanceHito,
+                    "estadoHito": hito.estadoHito,
+                    "responsableHito": hito.responsableHito,
+                    "created_at": _iso(hito.created_at),
+                    "updated_at": _iso(hito.updated_at),
+                }
+                for hito in indicador.hitos
+            ]
+        })
+    return json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+def ruta_core(db, limit):
+    """Ruta nueva: filas Core agrupadas en una pasada y orjson"""
+    return orjson.dumps(get_indicadores_filas(db, limit=limit))
+
+def medir(funcion, SessionLocal, limit, repeticiones):
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        db = SessionLocal()
+        try:
+            inicio = time.perf_counter()
+            cuerpo = funcion(db, limit)
+            mejor = min(mejor, time.perf_counter() - inicio)
+        finally:
+            db.close()
+    return mejor, len(cuerpo)
+
+def main():
+    tamanos = [int(n) for n in sys.argv[1:]] or [1_000, 10_000, 100_000]
+
+    print(f"{'hitos':>8} {'ORM (ms)':>10} {'Core (ms)':>10} {'speedup':>8} {'bytes':>10}")
+    for n_hitos in tamanos:
+        engine, n_indicadores = crear_datos(n_hitos)
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        repeticiones = 5 if n_hitos <= 10_000 else 2
+
+        t_orm, bytes_orm = medir(ruta_orm, SessionLocal, n_indicadores, repeticiones)
+        t_core, bytes_core = medir(ruta_core, SessionLocal, n_indicadores, repeticiones)
+
+        print(f"{n_hitos:>8} {t_orm * 1000:>10.1f} {t_core * 1000:>10.1f} {t_orm / t_core:>7.1f}x {bytes_core:>10}")
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
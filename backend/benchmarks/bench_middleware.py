@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la pila de middleware HTTP
+Compara la pila anterior (3 × @app.middleware("http") + CORSMiddleware) con CabecerasMiddleware,
+restando una app sin middleware para obtener el sobrecoste por request
+
+Uso: python benchmarks/bench_middleware.py [n_requests]
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+# Agregar el directorio backend al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI, Response
+from fastapi.middleware.cors import CORSMiddleware
+
+from app.middleware import CabecerasMiddleware
+
+ORIGENES = ["https://sistema-indicadores-production.up.railway.app", "http://localhost:5173"]
+ORIGEN = b"https://sistema-indicadores-production.up.railway.app"
+
+def app_base() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/ping")
+    async def ping():
+        return {"ok": True, "mensaje": "pong"}
+
+    return app
+
+def app_anterior() -> FastAPI:
+    """Reproduce la pila de main.py previa a CabecerasMiddleware (sin los print)"""
+    app = app_base()
+
+    @app.middleware("http")
+    async def add_utf8_headers(request, call_next):
+        response = await call_next(request)
+        if "application/json" in response.headers.get("content-type", ""):
+            response.headers["content-type"] = "application/json; charset=utf-8"
+        return response
+
+    @app.middleware("http")
+    async def custom_cors_middleware(request, call_next):
+        origin = request.headers.get("origin")
+        response = await call_next(request)
+        allow_cors = False
+        if "*" in ORIGENES:
+            allow_cors = True
+            response.headers["Access-Control-Allow-Origin"] = "*"
+        elif origin:
+            if origin in ORIGENES:
+                allow_cors = True
+                response.headers["Access-Control-Allow-Origin"] = origin
+            elif ".railway.app" in origin and origin.startswith("https://"):
+                allow_cors = True
+                response.headers["Access-Control-Allow-Origin"] = origin
+        if allow_cors:
+            response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS"
+            response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization, Accept, X-Requested-With"
+            response.headers["Access-Control-Max-Age"] = "86400"
+            response.headers["Access-Control-Expose-Headers"] = "X-Next-Cursor, ETag"
+        return response
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=ORIGENES + ["https://*.railway.app"],
+        allow_credentials=False,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "ETag"],
+    )
+
+    @app.middleware("http")
+    async def add_security_headers(request, call_next):
+        response = await call_next(request)
+        if os.getenv("ENVIRONMENT") == "production" or os.getenv("RAILWAY_ENVIRONMENT_NAME"):
+            if request.headers.get("x-forwarded-proto") == "http":
+                https_url = str(request.url).replace("http://", "https://", 1)
+                return Response(status_code=307, headers={"Location": https_url})
+        if os.getenv("ENVIRONMENT") == "production":
+            response.headers["X-Content-Type-Options"] = "nosniff"
+            response.headers["X-Frame-Options"] = "DENY"
+            response.headers["X-XSS-Protection"] = "1; mode=block"
+            response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
+            response.headers["Content-Security-Policy"] = "default-src 'self'"
+            response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
+            response.headers["X-Railway-Force-HTTPS"] = "1"
+        if "application/json" in response.headers.get("content-type", ""):
+            response.headers["content-type"] = "application/json; charset=utf-8"
+        return response
+
+    return app
+
+def app_nueva() -> FastAPI:
+    app = app_base()
+    app.add_middleware(CabecerasMiddleware, allowed_origins=ORIGENES, produccion=True, forzar_https=True)
+    return app
+
+def scope(metodo: str, cabeceras: list) -> dict:
+    return {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": metodo,
+        "scheme": "https", "path": "/api/ping", "raw_path": b"/api/ping", "root_path": "",
+        "query_string": b"", "server": ("testserver", 443), "client": ("10.0.0.1", 5000),
+        "headers": [(b"host", b"testserver"), (b"x-forwarded-proto", b"https")] + cabeceras,
+    }
+
+GET = [(b"origin", ORIGEN), (b"accept", b"application/json")]
+PREFLIGHT = [(b"origin", ORIGEN), (b"access-control-request-method", b"PATCH"),
+             (b"access-control-request-headers", b"content-type, authorization")]
+
+async def una_request(app, s) -> int:
+    estado = None
+    mensajes = [{"type": "http.disconnect"}, {"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        # Cuerpo vacío y después desconexión (BaseHTTPMiddleware la espera al terminar)
+        return mensajes.pop() if len(mensajes) > 1 else mensajes[0]
+
+    async def send(message):
+        nonlocal estado
+        if message["type"] == "http.response.start":
+            estado = message["status"]
+
+    await app(dict(s), receive, send)
+    return estado
+
+async def medir(app, s, n: int):
+    estado = await una_request(app, s)  # Calentamiento (construye la pila de middleware)
+    mejor = float("inf")
+    for _ in range(3):
+        inicio = time.perf_counter()
+        for _ in range(n):
+            await una_request(app, s)
+        mejor = min(mejor, (time.perf_counter() - inicio) / n)
+    return mejor, estado
+
+async def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    os.environ["ENVIRONMENT"] = "production"
+    base, anterior, nueva = app_base(), app_anterior(), app_nueva()
+
+    t_base, _ = await medir(base, scope("GET", GET), n)
+    print(f"{'caso':<26} {'µs/req':>8} {'sobrecoste (µs)':>16} {'status':>7}")
+    print(f"{'GET sin middleware':<26} {t_base * 1e6:>8.1f} {'-':>16} {200:>7}")
+    for nombre, app in (("anterior", anterior), ("CabecerasMiddleware", nueva)):
+        t, estado = await medir(app, scope("GET", GET), n)
+        print(f"{'GET ' + nombre:<26} {t * 1e6:>8.1f} {(t - t_base) * 1e6:>16.1f} {estado:>7}")
+    for nombre, app in (("anterior", anterior), ("CabecerasMiddleware", nueva)):
+        t, estado = await medir(app, scope("OPTIONS", PREFLIGHT), n)
+        print(f"{'OPTIONS ' + nombre:<26} {t * 1e6:>8.1f} {'-':>16} {estado:>7}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
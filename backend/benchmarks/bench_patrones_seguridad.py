@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la detección de patrones maliciosos (SecurityMonitor.check_malicious_input)
+Compara el bucle original (20 patrones), una regex combinada en forma de trie (una sola
+pasada), DetectorPatrones y el escáner en streaming por fragmentos de 64 KiB
+
+Uso: python benchmarks/bench_patrones_seguridad.py [tamano_bytes ...]
+"""
+
+import os
+import random
+import re
+import string
+import sys
+import time
+
+# Agregar el directorio backend al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.security import SecurityMonitor, DetectorPatrones
+
+PATRONES = SecurityMonitor().suspicious_patterns
+FRAGMENTO = 64 * 1024
+ALFABETO = string.ascii_letters + string.digits + " áéíóúñ,.:{}\"'"
+
+def regex_trie(palabras) -> str:
+    """Alternativa factorizada por prefijos: una sola regex que recorre el texto una vez"""
+    trie = {}
+    for palabra in palabras:
+        nodo = trie
+        for caracter in palabra:
+            nodo = nodo.setdefault(caracter, {})
+        nodo[""] = True
+
+    def construir(nodo):
+        if "" in nodo and len(nodo) == 1:
+            return ""
+        alternativas = [re.escape(c) + construir(hijo) for c, hijo in sorted(nodo.items()) if c != ""]
+        opcional = "" in nodo
+        if len(alternativas) == 1 and not opcional:
+            return alternativas[0]
+        patron = "(?:" + "|".join(alternativas) + ")"
+        return patron + "?" if opcional else patron
+
+    return construir(trie)
+
+REGEX = re.compile(regex_trie(PATRONES))
+DETECTOR = DetectorPatrones(PATRONES)
+
+def bucle_original(texto: str) -> bool:
+    texto_lower = texto.lower()
+    for patron in PATRONES:
+        if patron in texto_lower:
+            return True
+    return False
+
+def regex_combinada(texto: str) -> bool:
+    return REGEX.search(texto.lower()) is not None
+
+def detector(texto: str) -> bool:
+    return DETECTOR.buscar(texto.lower()) is not None
+
+def streaming(cuerpo: bytes) -> bool:
+    escaner = DETECTOR.escaner()
+    for inicio in range(0, len(cuerpo), FRAGMENTO):
+        if escaner.alimentar(cuerpo[inicio:inicio + FRAGMENTO]) is not None:
+            return True
+    return escaner.alimentar(b"", final=True) is not None
+
+def comprobar_equivalencia(n: int = 2_000):
+    """Mismo resultado que el bucle original en textos limpios, con ataque y partidos entre fragmentos"""
+    aleatorio = random.Random(7)
+    for i in range(n):
+        texto = "".join(aleatorio.choice(ALFABETO) for _ in range(aleatorio.randint(0, 300)))
+        if i % 2:
+            posicion = aleatorio.randint(0, len(texto))
+            patron = aleatorio.choice(PATRONES)
+            patron = "".join(c.upper() if aleatorio.random() < 0.5 else c for c in patron)
+            texto = texto[:posicion] + patron + texto[posicion:]
+        esperado = bucle_original(texto)
+        assert regex_combinada(texto) == esperado and detector(texto) == esperado, texto
+        cuerpo = texto.encode("utf-8")
+        corte = aleatorio.randint(0, len(cuerpo))
+        assert _en_dos_fragmentos(cuerpo, corte) == esperado, texto
+
+def _en_dos_fragmentos(cuerpo: bytes, corte: int) -> bool:
+    escaner = DETECTOR.escaner()
+    primero = escaner.alimentar(cuerpo[:corte]) is not None
+    return escaner.alimentar(cuerpo[corte:], final=True) is not None or primero
+
+def medir(funcion, entrada, repeticiones):
+    mejor = float("inf")
+    for _ in range(5):
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            funcion(entrada)
+        mejor = min(mejor, (time.perf_counter() - inicio) / repeticiones)
+    return mejor
+
+def main():
+    tamanos = [int(n) for n in sys.argv[1:]] or [32, 300, 5_000, 100_000, 1_000_000]
+    comprobar_equivalencia()
+    print(f"Patrones: {len(PATRONES)} originales, {len(DETECTOR.patrones)} tras descartar los contenidos en otros")
+
+    aleatorio = random.Random(1)
+    print(f"{'bytes':>9} {'bucle (µs)':>11} {'regex (µs)':>11} {'detector (µs)':>14} {'stream (µs)':>12}")
+    for tamano in tamanos:
+        # Texto limpio: el peor caso (hay que recorrerlo entero)
+        texto = "".join(aleatorio.choice(ALFABETO) for _ in range(tamano))
+        cuerpo = texto.encode("utf-8")
+        repeticiones = max(1, 200_000 // tamano)
+
+        t_bucle = medir(bucle_original, texto, repeticiones)
+        t_regex = medir(regex_combinada, texto, repeticiones)
+        t_detector = medir(detector, texto, repeticiones)
+        t_stream = medir(streaming, cuerpo, repeticiones)
+        print(f"{tamano:>9} {t_bucle * 1e6:>11.2f} {t_regex * 1e6:>11.2f} {t_detector * 1e6:>14.2f} {t_stream * 1e6:>12.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Calibra el coste de bcrypt (BCRYPT_ROUNDS) para el hardware del despliegue
+Mide cada coste y elige el mayor cuya verificación queda dentro de la latencia objetivo
+
+Uso: python calibrar_bcrypt.py [objetivo_ms=250] [muestras=5]
+"""
+
+import statistics
+import sys
+import time
+from passlib.hash import bcrypt
+
+def medir(rondas: int, muestras: int) -> float:
+    """Mediana en ms de verificar un hash con `rondas`"""
+    hash_prueba = bcrypt.using(rounds=rondas).hash("calibracion")
+    tiempos = []
+    for _ in range(muestras):
+        inicio = time.perf_counter()
+        bcrypt.verify("calibracion", hash_prueba)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+def main():
+    objetivo_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 250.0
+    muestras = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    print(f"⏱️ Objetivo: {objetivo_ms:.0f} ms por verificación ({muestras} muestras por coste)")
+
+    elegido = None
+    for rondas in range(10, 17):
+        mediana = medir(rondas, muestras)
+        dentro = mediana <= objetivo_ms
+        print(f"   rondas={rondas:2d}  {mediana:8.1f} ms  {'✅' if dentro else '❌'}")
+        if not dentro:
+            break  # Cada ronda duplica el coste: las siguientes tampoco entran
+        elegido = rondas
+
+    if elegido is None:
+        print("⚠️ Ni el coste mínimo (10) entra en el objetivo; se recomienda BCRYPT_ROUNDS=10")
+        elegido = 10
+    print(f"\n👉 BCRYPT_ROUNDS={elegido}")
+    print("   Los hashes existentes se recalculan solos en el siguiente login de cada usuario")
+
+if __name__ == "__main__":
+    main()
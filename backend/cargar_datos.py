@@ -4,6 +4,8 @@ Script corregido para cargar datos reales con fechas específicas por hito
 Lee fechas individuales del Excel para cada hito
 """
 
+import hashlib
+import io
 import sys
 import os
 import pandas as pd
@@ -12,50 +14,366 @@ from datetime import datetime, date
 # Agregar el directorio padre al path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import insert, update, delete, select, bindparam
 from app.models.indicador import Indicador, Hito
-from app.database import Base
-
-def get_database_url():
-    """Obtener URL de base de datos de variable de entorno o usar SQLite local"""
-    database_url = os.getenv("DATABASE_URL")
-    
-    if database_url:
-        print(f"✅ Conectado a PostgreSQL Railway")
-        return database_url
-    else:
-        print(f"✅ Conectado a PostgreSQL local")
-        return "sqlite:///./indicadores.db"
+from app.database import Base, engine_escritura, WriteSessionLocal
+from app.crud.estadisticas import recalcular_estadisticas
 
 def crear_session():
-    """Crear sesión de base de datos"""
-    database_url = get_database_url()
-    print(f"🔗 Conectando a base de datos...")
-    
-    engine = create_engine(database_url)
+    """Crear sesión de escritura sobre el engine de la aplicación (pool, WAL en SQLite)"""
+    print(f"🔗 Conectando a base de datos: {engine_escritura.url.get_backend_name()}")
     
     # Crear tablas si no existen
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=engine_escritura)
     
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    return SessionLocal(), engine
+    return WriteSessionLocal(), engine_escritura
+
+# Columnas del Excel que se toman de la primera fila de cada indicador
+COLUMNAS_INDICADOR_EXCEL = {
+    'VP': 'vp',
+    'Area': 'area',
+    'Tipo Indicador': 'tipoIndicador',
+    'Responsable': 'responsableGeneral',
+    'Responsable de Carga': 'responsableCargaGeneral',
+}
+
+# Hitos por lote al informar progreso (trabajos en segundo plano)
+LOTE_HITOS = 5000
+
+def _sin_progreso(fase, filas_procesadas=None, filas_totales=None):
+    pass
+
+def _insertar_hitos_por_lotes(session, df_hitos, progreso, confirmar_lote=None):
+    """Inserta de LOTE_HITOS en LOTE_HITOS; con `confirmar_lote(session)` confirma cada lote"""
+    for inicio in range(0, len(df_hitos), LOTE_HITOS):
+        insertar_hitos(session, df_hitos.iloc[inicio:inicio + LOTE_HITOS])
+        if confirmar_lote:
+            confirmar_lote(session)
+        progreso("insertando_hitos", min(inicio + LOTE_HITOS, len(df_hitos)), len(df_hitos))
+
+def _cerrar_carga_parcial(session, ids_indicadores_eliminar=()):
+    """Tras un fallo con lotes ya confirmados: quita lo indicado y deja contadores y versión al día"""
+    session.rollback()
+    if ids_indicadores_eliminar:
+        session.execute(delete(Hito).where(Hito.indicador_id.in_(ids_indicadores_eliminar)))
+        session.execute(delete(Indicador).where(Indicador.id.in_(ids_indicadores_eliminar)))
+    recalcular_estadisticas(session)
+    session.commit()
+
+def _a_registros(df):
+    """DataFrame -> lista de dicts con None en lugar de NaN/NaT (para executemany)"""
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+def preparar_dataframes(df):
+    """Normaliza el Excel con operaciones de columna y devuelve (indicadores, hitos).
+
+    - Fechas con pd.to_datetime (valores inválidos -> NaT)
+    - Fechas generales = min/max de las fechas de sus hitos
+    - Hitos sin fecha heredan la del indicador
+    """
+    # Filas sin indicador se descartan (groupby también las ignoraba)
+    df = df[df['Indicador'].notna()].copy()
+    inicio = pd.to_datetime(df['Fecha de Inicio'], errors='coerce')
+    fin = pd.to_datetime(df['Fecha Finalizacion'], errors='coerce')
+
+    # Datos del indicador: primera fila de cada grupo (orden por nombre, como groupby)
+    indicadores = (
+        df.drop_duplicates('Indicador', keep='first')
+        .set_index('Indicador')[list(COLUMNAS_INDICADOR_EXCEL)]
+        .rename(columns=COLUMNAS_INDICADOR_EXCEL)
+        .sort_index()
+    )
+    indicadores['fechaInicioGeneral'] = inicio.groupby(df['Indicador']).min()
+    indicadores['fechaFinalizacionGeneral'] = fin.groupby(df['Indicador']).max()
+
+    hitos = pd.DataFrame({
+        'Indicador': df['Indicador'],
+        'nombreHito': df['Hito'],
+        'fechaInicioHito': inicio.fillna(df['Indicador'].map(indicadores['fechaInicioGeneral'])),
+        'fechaFinalizacionHito': fin.fillna(df['Indicador'].map(indicadores['fechaFinalizacionGeneral'])),
+        'avanceHito': pd.to_numeric(df['Avance (%)'], errors='coerce').fillna(0) if 'Avance (%)' in df else 0.0,
+        'estadoHito': df['Estado'],
+        'responsableHito': df['Responsable'],
+    })
+
+    # Timestamp -> date para las columnas Date
+    for columna in ('fechaInicioGeneral', 'fechaFinalizacionGeneral'):
+        indicadores[columna] = indicadores[columna].dt.date
+    for columna in ('fechaInicioHito', 'fechaFinalizacionHito'):
+        hitos[columna] = hitos[columna].dt.date
+
+    return indicadores.rename_axis('nombreIndicador').reset_index(), hitos
+
+def insertar_indicadores(session, df_indicadores):
+    """INSERT multi-fila con RETURNING; devuelve {nombreIndicador: id}"""
+    if df_indicadores.empty:
+        return {}
+    tabla = Indicador.__table__
+    resultado = session.execute(
+        insert(tabla).returning(tabla.c.id, sort_by_parameter_order=True),
+        _a_registros(df_indicadores)
+    )
+    return dict(zip(df_indicadores['nombreIndicador'], resultado.scalars().all()))
+
+def insertar_hitos(session, df_hitos):
+    """COPY en PostgreSQL; executemany en el resto"""
+    if df_hitos.empty:
+        return
+    ahora = datetime.utcnow()
+    df_hitos = df_hitos.assign(created_at=ahora, updated_at=ahora)
+
+    if session.bind.dialect.name == 'postgresql':
+        columnas = list(df_hitos.columns)
+        buffer = io.StringIO()
+        df_hitos.to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        # Las columnas camelCase están entre comillas en PostgreSQL
+        lista_columnas = ', '.join(f'"{columna}"' for columna in columnas)
+        cursor = session.connection().connection.cursor()
+        try:
+            cursor.copy_expert(f'COPY {Hito.__tablename__} ({lista_columnas}) FROM STDIN WITH (FORMAT csv)', buffer)
+        finally:
+            cursor.close()
+    else:
+        session.execute(insert(Hito.__table__), _a_registros(df_hitos))
+
+# ===================================================
+# 🔄 SINCRONIZACIÓN INCREMENTAL (upsert por clave natural)
+# ===================================================
+
+# Campos comparados; la clave natural es nombreIndicador / (nombreIndicador, nombreHito)
+CAMPOS_INDICADOR_SYNC = ['vp', 'area', 'tipoIndicador', 'fechaInicioGeneral', 'fechaFinalizacionGeneral',
+                         'responsableGeneral', 'responsableCargaGeneral']
+CAMPOS_HITO_SYNC = ['fechaInicioHito', 'fechaFinalizacionHito', 'avanceHito', 'estadoHito', 'responsableHito']
+
+def _normalizar(valor):
+    # Excel trae enteros/numpy y la base floats: se comparan como float; fechas en ISO
+    if isinstance(valor, bool) or valor is None or isinstance(valor, str):
+        return valor
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    if isinstance(valor, date):
+        return valor.isoformat()
+    return str(valor)
+
+def huella_fila(registro: dict, campos: list) -> str:
+    """Hash de los campos comparables de una fila (igual para Excel y base de datos)"""
+    return hashlib.sha1(repr([_normalizar(registro.get(campo)) for campo in campos]).encode()).hexdigest()
+
+def _existentes(session):
+    """Filas actuales indexadas por clave natural; los duplicados de clave sobran y se eliminan"""
+    indicadores, sobrantes_indicadores = {}, []
+    columnas = [getattr(Indicador, campo) for campo in CAMPOS_INDICADOR_SYNC]
+    for fila in session.execute(select(Indicador.id, Indicador.nombreIndicador, *columnas).order_by(Indicador.id)).mappings():
+        if fila['nombreIndicador'] in indicadores:
+            sobrantes_indicadores.append(fila['id'])
+        else:
+            indicadores[fila['nombreIndicador']] = dict(fila)
+
+    nombre_por_id = {fila['id']: nombre for nombre, fila in indicadores.items()}
+    hitos, sobrantes_hitos = {}, []
+    columnas = [getattr(Hito, campo) for campo in CAMPOS_HITO_SYNC]
+    for fila in session.execute(select(Hito.id, Hito.indicador_id, Hito.nombreHito, *columnas).order_by(Hito.id)).mappings():
+        clave = (nombre_por_id.get(fila['indicador_id']), fila['nombreHito'])
+        if clave[0] is None or clave in hitos:
+            sobrantes_hitos.append(fila['id'])
+        else:
+            hitos[clave] = dict(fila)
+    return indicadores, sobrantes_indicadores, hitos, sobrantes_hitos
+
+def _diff(nuevos: dict, existentes: dict, campos: list, eliminar_ausentes: bool):
+    """(insertar, actualizar, eliminar, sin_cambios) comparando huellas por clave"""
+    insertar, actualizar, sin_cambios = [], [], 0
+    for clave, registro in nuevos.items():
+        actual = existentes.get(clave)
+        if actual is None:
+            insertar.append(clave)
+        elif huella_fila(registro, campos) != huella_fila(actual, campos):
+            actualizar.append(clave)
+        else:
+            sin_cambios += 1
+    eliminar = [clave for clave in existentes if clave not in nuevos] if eliminar_ausentes else []
+    return insertar, actualizar, eliminar, sin_cambios
+
+def _actualizar_por_id(session, tabla, campos: list, filas: list):
+    """UPDATE ... WHERE id = :b_id en un solo executemany"""
+    if not filas:
+        return
+    ahora = datetime.utcnow()
+    session.execute(
+        update(tabla).where(tabla.c.id == bindparam('b_id')).values(
+            {campo: bindparam(campo) for campo in campos + ['updated_at']}
+        ),
+        [{'b_id': id_fila, 'updated_at': ahora, **{campo: registro[campo] for campo in campos}} for id_fila, registro in filas]
+    )
+
+def _etiqueta(clave) -> str:
+    return clave if isinstance(clave, str) else " / ".join(map(str, clave))
+
+def _resumen(insertar, actualizar, eliminar, sin_cambios) -> dict:
+    return {
+        "insertados": len(insertar),
+        "actualizados": len(actualizar),
+        "eliminados": len(eliminar),
+        "sin_cambios": sin_cambios,
+        "detalle": {
+            "insertados": [_etiqueta(clave) for clave in insertar],
+            "actualizados": [_etiqueta(clave) for clave in actualizar],
+            "eliminados": [_etiqueta(clave) for clave in eliminar],
+        }
+    }
+
+def sincronizar_con_session(session, df, aplicar=True, eliminar_ausentes=True, progreso=None,
+                            confirmar_lote=None) -> dict:
+    """Aplica solo los INSERT/UPDATE/DELETE necesarios para que la base refleje el Excel.
+
+    Los ids de las filas que siguen existiendo no cambian. Con aplicar=False solo se
+    calcula el diff. La transacción la confirma quien llama.
+
+    Con `confirmar_lote(session)` los cambios se confirman por partes (borrados y
+    actualizaciones, y después cada lote de hitos nuevos). Si algo falla a medias, lo
+    confirmado se queda, los contadores se recalculan, y repetir la sincronización lo completa.
+    """
+    progreso = progreso or _sin_progreso
+    progreso("preparando")
+    df_indicadores, df_hitos = preparar_dataframes(df)
+    nuevos_indicadores = {registro['nombreIndicador']: registro for registro in _a_registros(df_indicadores)}
+    # Con hitos repetidos en el Excel gana la última fila
+    nuevos_hitos = {(registro['Indicador'], registro['nombreHito']): registro for registro in _a_registros(df_hitos)}
+
+    progreso("comparando", 0, len(df_hitos))
+    indicadores, sobrantes_indicadores, hitos, sobrantes_hitos = _existentes(session)
+    diff_indicadores = _diff(nuevos_indicadores, indicadores, CAMPOS_INDICADOR_SYNC, eliminar_ausentes)
+    diff_hitos = _diff(nuevos_hitos, hitos, CAMPOS_HITO_SYNC, eliminar_ausentes)
+    reporte = {
+        "indicadores": _resumen(*diff_indicadores),
+        "hitos": _resumen(*diff_hitos),
+        "duplicados_eliminados": len(sobrantes_indicadores) + len(sobrantes_hitos) if eliminar_ausentes else 0,
+        "aplicado": False,
+    }
+
+    hay_cambios = any(reporte[tabla][accion] for tabla in ("indicadores", "hitos")
+                      for accion in ("insertados", "actualizados", "eliminados")) or reporte["duplicados_eliminados"]
+    progreso("aplicando_cambios", len(df_hitos), len(df_hitos))
+    if not aplicar or not hay_cambios:
+        return reporte
+
+    try:
+        insertar, actualizar, eliminar, _ = diff_indicadores
+        insertar_h, actualizar_h, eliminar_h, _ = diff_hitos
+
+        # Hitos primero: los de indicadores eliminados también caen (la FK no tiene ON DELETE)
+        ids_indicadores_eliminar = [indicadores[clave]['id'] for clave in eliminar]
+        if eliminar_ausentes:
+            ids_indicadores_eliminar += sobrantes_indicadores
+        ids_hitos_eliminar = [hitos[clave]['id'] for clave in eliminar_h]
+        if eliminar_ausentes:
+            ids_hitos_eliminar += sobrantes_hitos
+        if ids_hitos_eliminar:
+            session.execute(delete(Hito).where(Hito.id.in_(ids_hitos_eliminar)))
+        if ids_indicadores_eliminar:
+            session.execute(delete(Hito).where(Hito.indicador_id.in_(ids_indicadores_eliminar)))
+            session.execute(delete(Indicador).where(Indicador.id.in_(ids_indicadores_eliminar)))
 
-def convertir_fecha(fecha_valor):
-    """Convertir fecha de Excel a datetime"""
-    if pd.isna(fecha_valor):
+        _actualizar_por_id(session, Indicador.__table__, CAMPOS_INDICADOR_SYNC,
+                           [(indicadores[clave]['id'], nuevos_indicadores[clave]) for clave in actualizar])
+        _actualizar_por_id(session, Hito.__table__, CAMPOS_HITO_SYNC,
+                           [(hitos[clave]['id'], nuevos_hitos[clave]) for clave in actualizar_h])
+
+        ids_por_nombre = {nombre: fila['id'] for nombre, fila in indicadores.items()}
+        ids_por_nombre.update(insertar_indicadores(session, df_indicadores[df_indicadores['nombreIndicador'].isin(insertar)]))
+        claves_nuevas = pd.MultiIndex.from_tuples(insertar_h, names=['Indicador', 'nombreHito']) if insertar_h else None
+        if claves_nuevas is not None:
+            df_nuevos = df_hitos[pd.MultiIndex.from_frame(df_hitos[['Indicador', 'nombreHito']]).isin(claves_nuevas)]
+            df_nuevos = df_nuevos.drop_duplicates(['Indicador', 'nombreHito'], keep='last')
+            df_nuevos = df_nuevos.assign(indicador_id=df_nuevos.pop('Indicador').map(ids_por_nombre))
+            if confirmar_lote:
+                confirmar_lote(session)
+            _insertar_hitos_por_lotes(session, df_nuevos.sort_values('indicador_id', kind='stable'), progreso,
+                                      confirmar_lote)
+
+        # Contadores del dashboard y versión (ETag) en la misma transacción
+        progreso("estadisticas")
+        recalcular_estadisticas(session)
+    except Exception:
+        if confirmar_lote:
+            _cerrar_carga_parcial(session)
+        raise
+    reporte["aplicado"] = True
+    return reporte
+
+def imprimir_reporte(reporte: dict):
+    for tabla in ("indicadores", "hitos"):
+        datos = reporte[tabla]
+        print(f"📋 {tabla}: +{datos['insertados']} ~{datos['actualizados']} -{datos['eliminados']} "
+              f"(sin cambios: {datos['sin_cambios']})")
+        for accion, simbolo in (("insertados", "+"), ("actualizados", "~"), ("eliminados", "-")):
+            for clave in datos["detalle"][accion]:
+                print(f"   {simbolo} {clave}")
+    if reporte["duplicados_eliminados"]:
+        print(f"🧹 Duplicados de clave eliminados: {reporte['duplicados_eliminados']}")
+
+def sincronizar_desde_excel(excel_file='Base de datos.xlsx', session=None, aplicar=True, eliminar_ausentes=True):
+    """Sincroniza la base con el Excel sin borrar todo; devuelve el reporte del diff (None si falla)"""
+    session_propia = session is None
+    
+    try:
+        if session_propia:
+            session, engine = crear_session()
+        
+        df = leer_excel(excel_file)
+        reporte = sincronizar_con_session(session, df, aplicar=aplicar, eliminar_ausentes=eliminar_ausentes)
+        if reporte["aplicado"]:
+            session.commit()
+        else:
+            session.rollback()
+        
+        imprimir_reporte(reporte)
+        print("✅ Sincronización aplicada" if reporte["aplicado"] else "ℹ️  Sin cambios aplicados")
+        return reporte
+        
+    except Exception as e:
+        print(f"❌ Error sincronizando: {e}")
+        if 'session' in locals() and session is not None:
+            session.rollback()
         return None
+    finally:
+        if session_propia and 'session' in locals() and session is not None:
+            session.close()
+
+def buscar_excel():
+    """Ruta del 'Base de datos.xlsx' (varias ubicaciones posibles) o None"""
+    excel_files_to_try = [
+        'Base de datos.xlsx',
+        './Base de datos.xlsx', 
+        'backend/Base de datos.xlsx',
+        os.path.join(os.path.dirname(__file__), 'Base de datos.xlsx'),
+        '/app/backend/Base de datos.xlsx'  # Railway path
+    ]
     
-    if isinstance(fecha_valor, str):
-        try:
-            return datetime.strptime(fecha_valor, '%Y-%m-%d').date()
-        except:
-            return None
+    for file_path in excel_files_to_try:
+        if os.path.exists(file_path):
+            print(f"✅ Archivo encontrado en: {file_path}")
+            return file_path
     
-    if hasattr(fecha_valor, 'date'):
-        return fecha_valor.date()
+    print(f"❌ No se encuentra el archivo 'Base de datos.xlsx' en ninguna ubicación:")
+    for path in excel_files_to_try:
+        print(f"   - {path}")
+    return None
+
+def leer_excel(excel_file):
+    """Lee el Excel y corrige la fecha problemática conocida"""
+    print(f"📊 Leyendo archivo Excel: {excel_file}")
+    df = pd.read_excel(excel_file)
+    print(f"📋 Datos leídos: {len(df)} filas")
     
-    return fecha_valor
+    # Corrección específica para fecha problemática
+    fecha_problema = df['Fecha Finalizacion'].astype(str).str.contains('1900', na=False)
+    if fecha_problema.any():
+        print("🔧 Detectada fecha problemática 1900-01-10, corrigiendo a 2025-12-31...")
+        df.loc[fecha_problema, 'Fecha Finalizacion'] = '2025-12-31'
+        print("✅ Fecha corregida automáticamente")
+    return df
 
 def verificar_y_cargar_datos_automatico():
     """Verificar si hay datos y cargar automáticamente si está vacío"""
@@ -72,26 +390,8 @@ def verificar_y_cargar_datos_automatico():
         
         print("🔄 Base de datos vacía. Cargando datos automáticamente...")
         
-        # Buscar archivo Excel en múltiples ubicaciones
-        excel_files_to_try = [
-            'Base de datos.xlsx',
-            './Base de datos.xlsx', 
-            'backend/Base de datos.xlsx',
-            os.path.join(os.path.dirname(__file__), 'Base de datos.xlsx'),
-            '/app/backend/Base de datos.xlsx'  # Railway path
-        ]
-        
-        excel_file = None
-        for file_path in excel_files_to_try:
-            if os.path.exists(file_path):
-                excel_file = file_path
-                print(f"✅ Archivo encontrado en: {file_path}")
-                break
-        
+        excel_file = buscar_excel()
         if not excel_file:
-            print(f"❌ No se encuentra el archivo 'Base de datos.xlsx' en ninguna ubicación:")
-            for path in excel_files_to_try:
-                print(f"   - {path}")
             return False
         
         # Cargar datos usando la función principal
@@ -104,6 +404,44 @@ def verificar_y_cargar_datos_automatico():
         if 'session' in locals():
             session.close()
 
+def cargar_con_session(session, df, limpiar_existentes=True, progreso=None, confirmar_lote=None) -> dict:
+    """Carga completa del DataFrame en la transacción de `session` (sin commit).
+
+    `progreso(fase, filas_procesadas, filas_totales)` se llama al cambiar de fase y tras
+    cada lote de hitos. Devuelve {"indicadores": n, "hitos": n}.
+
+    Con `confirmar_lote(session)` cada lote de hitos se confirma por separado (en SQLite
+    la conexión de escritura queda libre entre lotes); si algo falla después del primer
+    lote, se borran los indicadores insertados por esta carga.
+    """
+    progreso = progreso or _sin_progreso
+    if limpiar_existentes:
+        progreso("limpiando")
+        print("🗑️  Limpiando datos existentes...")
+        session.query(Hito).delete()
+        session.query(Indicador).delete()
+        print("✅ Datos limpiados")
+    
+    # Pipeline vectorizado: un INSERT multi-fila de indicadores y un executemany/COPY de hitos
+    progreso("preparando")
+    df_indicadores, df_hitos = preparar_dataframes(df)
+    progreso("insertando_indicadores", 0, len(df_hitos))
+    ids_por_nombre = insertar_indicadores(session, df_indicadores)
+    df_hitos['indicador_id'] = df_hitos.pop('Indicador').map(ids_por_nombre)
+    df_hitos = df_hitos.sort_values('indicador_id', kind='stable')  # Hitos agrupados por indicador, orden del Excel
+    
+    try:
+        _insertar_hitos_por_lotes(session, df_hitos, progreso, confirmar_lote)
+
+        # Contadores del dashboard en la misma transacción que la carga (o el último lote)
+        progreso("estadisticas")
+        recalcular_estadisticas(session)
+    except Exception:
+        if confirmar_lote:
+            _cerrar_carga_parcial(session, list(ids_por_nombre.values()))
+        raise
+    return {"indicadores": len(df_indicadores), "hitos": len(df_hitos)}
+
 def cargar_datos_desde_excel(excel_file='Base de datos.xlsx', session=None, limpiar_existentes=True):
     """Función unificada para cargar datos desde Excel"""
     session_propia = session is None
@@ -113,85 +451,12 @@ def cargar_datos_desde_excel(excel_file='Base de datos.xlsx', session=None, limp
             session, engine = crear_session()
             print("✅ Conectado a Railway!")
         
-        # Leer Excel
-        print(f"📊 Leyendo archivo Excel: {excel_file}")
-        df = pd.read_excel(excel_file)
-        print(f"📋 Datos leídos: {len(df)} filas")
-        
-        # Corrección específica para fecha problemática
-        fecha_problema = df['Fecha Finalizacion'].astype(str).str.contains('1900', na=False)
-        if fecha_problema.any():
-            print("🔧 Detectada fecha problemática 1900-01-10, corrigiendo a 2025-12-31...")
-            df.loc[fecha_problema, 'Fecha Finalizacion'] = '2025-12-31'
-            print("✅ Fecha corregida automáticamente")
-        
-        if limpiar_existentes:
-            print("🗑️  Limpiando datos existentes...")
-            session.query(Hito).delete()
-            session.query(Indicador).delete()
-            session.commit()
-            print("✅ Datos limpiados")
-        
-        # Agrupar por indicador
-        indicadores_grupos = df.groupby('Indicador')
-        
-        total_indicadores = 0
-        total_hitos = 0
-        
-        for nombre_indicador, grupo_indicador in indicadores_grupos:
-            print(f"\n✅ Procesando indicador: {nombre_indicador}")
-            
-            # Tomar datos del primer registro para el indicador
-            primera_fila = grupo_indicador.iloc[0]
-            
-            # Calcular fechas del indicador basadas en todos sus hitos
-            fechas_inicio_hitos = grupo_indicador['Fecha de Inicio'].dropna()
-            fechas_fin_hitos = grupo_indicador['Fecha Finalizacion'].dropna()
-            
-            fecha_inicio_general = fechas_inicio_hitos.min() if not fechas_inicio_hitos.empty else convertir_fecha(primera_fila['Fecha de Inicio'])
-            fecha_fin_general = fechas_fin_hitos.max() if not fechas_fin_hitos.empty else convertir_fecha(primera_fila['Fecha Finalizacion'])
-            
-            # Crear indicador
-            indicador = Indicador(
-                vp=primera_fila['VP'],
-                area=primera_fila['Area'],
-                nombreIndicador=nombre_indicador,
-                tipoIndicador=primera_fila['Tipo Indicador'],
-                fechaInicioGeneral=fecha_inicio_general,
-                fechaFinalizacionGeneral=fecha_fin_general,
-                responsableGeneral=primera_fila['Responsable'],
-                responsableCargaGeneral=primera_fila['Responsable de Carga']
-            )
-            
-            session.add(indicador)
-            session.flush()  # Para obtener el ID
-            
-            # Crear hitos con fechas específicas
-            for _, fila_hito in grupo_indicador.iterrows():
-                # Usar fechas específicas del hito o las del indicador como fallback
-                fecha_inicio_hito = convertir_fecha(fila_hito['Fecha de Inicio']) or fecha_inicio_general
-                fecha_fin_hito = convertir_fecha(fila_hito['Fecha Finalizacion']) or fecha_fin_general
-                
-                hito = Hito(
-                    indicador_id=indicador.id,
-                    nombreHito=fila_hito['Hito'],
-                    fechaInicioHito=fecha_inicio_hito,
-                    fechaFinalizacionHito=fecha_fin_hito,
-                    avanceHito=fila_hito.get('Avance (%)', 0),
-                    estadoHito=fila_hito['Estado'],
-                    responsableHito=fila_hito['Responsable']
-                )
-                
-                session.add(hito)
-                total_hitos += 1
-                
-                print(f"  📌 Hito: {hito.nombreHito}")
-                print(f"     📅 {fecha_inicio_hito} → {fecha_fin_hito}")
-                print(f"     📊 {hito.avanceHito}% - {hito.estadoHito}")
-            
-            total_indicadores += 1
+        df = leer_excel(excel_file)
         
+        totales = cargar_con_session(session, df, limpiar_existentes=limpiar_existentes)
         session.commit()
+        total_indicadores = totales["indicadores"]
+        total_hitos = totales["hitos"]
         
         print(f"\n🎉 ¡DATOS CARGADOS EN RAILWAY!")
         print(f"📊 Total indicadores: {total_indicadores}")
@@ -219,8 +484,20 @@ def cargar_datos_desde_excel(excel_file='Base de datos.xlsx', session=None, limp
             session.close()
 
 def main():
-    """Función principal para carga manual de datos"""
+    """Función principal para carga manual de datos
+
+    python cargar_datos.py                 # borra todo y recarga
+    python cargar_datos.py --sync          # upsert incremental (ids estables)
+    python cargar_datos.py --sync --dry-run  # solo muestra el diff
+    """
     print("=" * 50)
+    
+    if '--sync' in sys.argv:
+        print("🔄 Sincronizando datos con el Excel...")
+        resultado = sincronizar_desde_excel(aplicar='--dry-run' not in sys.argv)
+        print("=" * 50 if resultado is not None else "❌ Error en la sincronización")
+        return
+    
     print("📖 Cargando datos reales a Railway...")
     
     resultado = cargar_datos_desde_excel(limpiar_existentes=True)
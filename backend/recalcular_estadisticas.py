@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Reconstruye la tabla estadisticas_agregadas desde indicadores/hitos
+Úsalo si los contadores del dashboard se desvían de los datos reales
+"""
+
+import os
+import sys
+
+# Agregar el directorio padre al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import Base, SessionLocal, engine
+from app.models.indicador import EstadisticaAgregada
+from app.crud.estadisticas import get_estadisticas, calcular_estadisticas, recalcular_estadisticas
+
+def main():
+    """Recalcula los contadores y muestra la deriva corregida"""
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+
+    try:
+        antes = get_estadisticas(session)
+        reales = calcular_estadisticas(session)
+
+        diferencias = {k: (antes[k], reales[k]) for k in reales if antes[k] != reales[k]}
+        if diferencias:
+            print("⚠️ Deriva detectada (contador → real):")
+            for campo, (contador, real) in diferencias.items():
+                print(f"   - {campo}: {contador} → {real}")
+        else:
+            print("✅ Los contadores coinciden con los datos")
+
+        grupos = recalcular_estadisticas(session)
+        session.commit()
+        print(f"🔄 Tabla {EstadisticaAgregada.__tablename__} reconstruida: {grupos} grupos")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error recalculando estadísticas: {e}")
+        session.rollback()
+        return False
+    finally:
+        session.close()
+
+if __name__ == "__main__":
+    if not main():
+        sys.exit(1)
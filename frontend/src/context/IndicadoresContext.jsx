@@ -12,10 +12,48 @@ export const useIndicadores = () => {
   return context;
 };
 
+// 🔎 Indicadores filtrados en el servidor (/api/indicadores/buscar)
+// Se vuelve a pedir al cambiar los filtros o tras cualquier cambio hecho desde el contexto.
+export const useBusquedaIndicadores = (filtros) => {
+  const { version } = useIndicadores();
+  const [indicadores, setIndicadores] = useState([]);
+  const [loading, setLoading] = useState(false);
+  const [error, setError] = useState(null);
+  const claveFiltros = JSON.stringify(filtros);
+
+  useEffect(() => {
+    // Si los filtros cambian antes de que llegue la respuesta, se descarta la anterior
+    let vigente = true;
+    setLoading(true);
+    indicadoresApi.buscarIndicadores(JSON.parse(claveFiltros))
+      .then(data => {
+        if (!vigente) return;
+        setIndicadores(Array.isArray(data) ? data : []);
+        setError(null);
+      })
+      .catch(err => {
+        if (!vigente) return;
+        console.error('Error al buscar indicadores:', err);
+        setError('Error al cargar los indicadores: ' + err.message);
+        setIndicadores([]);
+      })
+      .finally(() => {
+        if (vigente) setLoading(false);
+      });
+    return () => {
+      vigente = false;
+    };
+  }, [claveFiltros, version]);
+
+  return { indicadores, loading, error };
+};
+
 export const IndicadoresProvider = ({ children }) => {
   const [indicadores, setIndicadores] = useState([]);
-  const [loading, setLoading] = useState(true);
+  const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
+  // Se incrementa con cada alta/edición/baja: las búsquedas de las páginas se repiten
+  const [version, setVersion] = useState(0);
   const { toast } = useToast();
 
   // VPs basados en los datos reales
@@ -53,13 +91,14 @@ export const IndicadoresProvider = ({ children }) => {
     'Gestion'
   ];
 
-  const cargarIndicadores = async () => {
+  // Ya no se descarga todo al montar: cada página pide solo lo que filtra (useBusquedaIndicadores)
+  const cargarIndicadores = async (filtros = {}) => {
     try {
       setLoading(true);
       
       let dataToUse = [];
       
-      const response = await indicadoresApi.getIndicadores();
+      const response = await indicadoresApi.buscarIndicadores(filtros);
       
       if (Array.isArray(response)) {
         dataToUse = response;
@@ -78,14 +117,11 @@ export const IndicadoresProvider = ({ children }) => {
     }
   };
 
-  useEffect(() => {
-    cargarIndicadores();
-  }, []);
-
   const agregarIndicador = async (nuevoIndicador) => {
     try {
       const response = await indicadoresApi.createIndicador(nuevoIndicador);
       setIndicadores(prev => [...prev, response.data]);
+      setVersion(v => v + 1);
       toast({
         title: "Indicador agregado",
         description: "El indicador y sus hitos han sido agregados exitosamente.",
@@ -124,6 +160,7 @@ export const IndicadoresProvider = ({ children }) => {
     try {
       const response = await indicadoresApi.updateIndicador(id, datosActualizados);
       setIndicadores(prev => prev.map(ind => ind.id === id ? response.data : ind));
+      setVersion(v => v + 1);
       toast({
         title: "Hito actualizado",
         description: "El hito ha sido actualizado exitosamente.",
@@ -137,10 +174,32 @@ export const IndicadoresProvider = ({ children }) => {
     }
   };
   
+  const actualizarHito = async (indicadorId, hitoId, datos) => {
+    try {
+      const hito = await indicadoresApi.updateHito(hitoId, datos);
+      setIndicadores(prev => prev.map(ind => ind.id === indicadorId
+        ? { ...ind, hitos: ind.hitos.map(h => h.idHito === hitoId ? { ...h, ...hito, idHito: hitoId } : h) }
+        : ind
+      ));
+      setVersion(v => v + 1);
+      toast({
+        title: "Hito actualizado",
+        description: "El hito ha sido actualizado exitosamente.",
+        duration: 3000,
+      });
+      return hito;
+    } catch (err) {
+      setError('Error al actualizar el hito');
+      console.error('Error:', err);
+      throw err;
+    }
+  };
+  
   const eliminarIndicador = async (id) => {
     try {
       await indicadoresApi.deleteIndicador(id);
       setIndicadores(prev => prev.filter(ind => ind.id !== id));
+      setVersion(v => v + 1);
       toast({
         title: "Indicador eliminado",
         description: "El indicador ha sido eliminado exitosamente.",
@@ -173,12 +232,7 @@ export const IndicadoresProvider = ({ children }) => {
 
   const filtrarPorArea = async (area) => {
     try {
-      if (area === 'Todas') {
-        const response = await indicadoresApi.getIndicadores();
-        return response.data;
-      }
-      const response = await indicadoresApi.getIndicadoresByArea(area);
-      return response.data;
+      return await indicadoresApi.buscarIndicadores(area === 'Todas' ? {} : { area });
     } catch (err) {
       setError('Error al filtrar los indicadores');
       console.error('Error:', err);
@@ -186,8 +240,9 @@ export const IndicadoresProvider = ({ children }) => {
     }
   };
 
-  const exportarXLSX = () => {
-    if (!indicadores || indicadores.length === 0) {
+  // datos: indicadores ya filtrados por la página (por defecto, los cargados en el contexto)
+  const exportarXLSX = (datos = indicadores) => {
+    if (!datos || datos.length === 0) {
       toast({
         title: "Error al exportar",
         description: "No hay datos para exportar.",
@@ -200,7 +255,7 @@ export const IndicadoresProvider = ({ children }) => {
     // Preparar datos para Excel
     const excelData = [];
     
-    (indicadores || []).forEach(indicador => {
+    (datos || []).forEach(indicador => {
       if (indicador && Array.isArray(indicador.hitos)) {
         indicador.hitos.forEach(hito => {
           if (hito) {
@@ -262,6 +317,7 @@ export const IndicadoresProvider = ({ children }) => {
     indicadores,
     loading,
     error,
+    version,
     vps,
     areas,
     areasPorVP,
@@ -270,6 +326,7 @@ export const IndicadoresProvider = ({ children }) => {
     tiposIndicador,
     agregarIndicador,
     actualizarIndicador,
+    actualizarHito,
     eliminarIndicador,
     cargarIndicadores,
     obtenerEstadisticas,
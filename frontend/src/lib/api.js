@@ -111,6 +111,33 @@ export const indicadoresApi = {
     return result.data;
   },
 
+  // 🔎 GET /api/indicadores/buscar - Filtrado en servidor
+  // filtros: { vp, area, tipoIndicador, responsable, estadoHito, vence_desde, vence_hasta, ids: [], limit }
+  // Con limit se devuelve solo esa primera página; sin limit se recorren todas (X-Next-Cursor)
+  buscarIndicadores: async (filtros = {}) => {
+    const params = new URLSearchParams();
+    Object.entries(filtros).forEach(([clave, valor]) => {
+      if (valor === undefined || valor === null || valor === '') return;
+      if (Array.isArray(valor)) {
+        valor.forEach(v => params.append(clave, v));
+      } else {
+        params.append(clave, valor);
+      }
+    });
+    const unaPagina = params.has('limit');
+    if (!unaPagina) params.set('limit', '1000');
+
+    const indicadores = [];
+    let cursor = null;
+    do {
+      if (cursor) params.set('cursor', cursor);
+      const result = await secureApiCall(`/api/indicadores/buscar?${params.toString()}`);
+      indicadores.push(...result.data);
+      cursor = unaPagina ? null : result.response.headers.get('X-Next-Cursor');
+    } while (cursor);
+    return indicadores;
+  },
+
   // 🏢 GET /api/indicadores/area/:area - Indicadores por área
   getIndicadoresByArea: async (area) => {
     const encodedArea = encodeURIComponent(area);
@@ -142,6 +169,24 @@ export const indicadoresApi = {
     return result.data;
   },
 
+  // ✏️ PATCH /api/hitos/:id - Actualizar solo un hito (avance, estado, fechas...)
+  updateHito: async (id, data) => {
+    const result = await secureApiCall(`/api/hitos/${id}`, {
+      method: 'PATCH',
+      body: JSON.stringify(data)
+    });
+    return result.data;
+  },
+
+  // 📦 PATCH /api/hitos/progreso - Lote de {id, avanceHito, estadoHito} en una sola llamada
+  updateProgresoHitos: async (cambios) => {
+    const result = await secureApiCall('/api/hitos/progreso', {
+      method: 'PATCH',
+      body: JSON.stringify({ cambios })
+    });
+    return result.data;
+  },
+
   // 🗑️ DELETE /api/indicadores/:id - Eliminar indicador
   deleteIndicador: async (id) => {
     const result = await secureApiCall(`/api/indicadores/${id}`, {
@@ -151,8 +196,10 @@ export const indicadoresApi = {
   },
 
   // 📈 GET /api/indicadores/estadisticas/dashboard - Estadísticas
-  getEstadisticas: async () => {
-    const result = await secureApiCall('/api/indicadores/estadisticas/dashboard');
+  // groupBy opcional: 'vp' | 'area' | 'tipoIndicador' (desglose calculado en el servidor)
+  getEstadisticas: async (groupBy) => {
+    const query = groupBy ? `?group_by=${encodeURIComponent(groupBy)}` : '';
+    const result = await secureApiCall(`/api/indicadores/estadisticas/dashboard${query}`);
     return result.data;
   },
 
@@ -1,7 +1,7 @@
 import React, { useState, useEffect, useMemo } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { motion } from 'framer-motion';
-import { useIndicadores } from '@/context/IndicadoresContext';
+import { useIndicadores, useBusquedaIndicadores } from '@/context/IndicadoresContext';
 import { Card, CardContent, CardHeader, CardTitle, CardDescription } from '@/components/ui/card';
 import { Button } from '@/components/ui/button';
 import { Input } from '@/components/ui/input';
@@ -11,7 +11,7 @@ import { Edit3, Filter, RefreshCw, CheckCircle, Clock, Circle, Target } from 'lu
 
 const ActualizarIndicador = () => {
   const navigate = useNavigate();
-  const { indicadores, actualizarIndicador, estados, vps, areas } = useIndicadores();
+  const { actualizarHito, estados, vps, obtenerAreasPorVP } = useIndicadores();
   
   // Estados para filtros siguiendo jerarquía: VP → Área → Indicador → Hito → Responsable
   const [vpFiltro, setVpFiltro] = useState('');
@@ -33,7 +33,13 @@ const ActualizarIndicador = () => {
     nombreHito: '' // Agregando el campo para el nombre del hito
   });
 
-  // Crear lista de todos los hitos con información del indicador padre
+  // VP y Área se filtran en el servidor; sin VP llegan todos (p. ej. para filtrar solo por responsable)
+  const { indicadores } = useBusquedaIndicadores({
+    vp: vpFiltro || undefined,
+    area: areaFiltro || undefined
+  });
+
+  // Crear lista de los hitos cargados con información del indicador padre
   const todosLosHitos = useMemo(() => {
     if (!Array.isArray(indicadores)) return [];
     
@@ -55,21 +61,14 @@ const ActualizarIndicador = () => {
 
   // Obtener áreas disponibles según VP seleccionado
   const areasDisponibles = useMemo(() => {
-    if (!vpFiltro || !Array.isArray(indicadores)) return [];
-    
-    return [...new Set(
-      indicadores
-        .filter(ind => ind && ind.vp === vpFiltro)
-        .map(ind => ind.area)
-        .filter(Boolean) // Filtrar valores null/undefined
-    )];
-  }, [vpFiltro, indicadores]);
+    if (!vpFiltro) return [];
+    return obtenerAreasPorVP(vpFiltro);
+  }, [vpFiltro]);
 
   // Obtener indicadores disponibles según VP y Área seleccionados
   const indicadoresDisponibles = useMemo(() => {
     if (!vpFiltro || !areaFiltro || !Array.isArray(indicadores)) return [];
-    
-    return indicadores.filter(ind => ind && ind.vp === vpFiltro && ind.area === areaFiltro);
+    return indicadores.filter(ind => ind);
   }, [vpFiltro, areaFiltro, indicadores]);
 
   // Obtener hitos disponibles según indicador seleccionado
@@ -188,18 +187,10 @@ const ActualizarIndicador = () => {
     if (!hitoSeleccionado) return;
     
     try {
-      const indicadorActual = indicadores.find(ind => ind.id === hitoSeleccionado.indicadorId);
-      
-      const indicadorActualizado = {
-        ...indicadorActual,
-        hitos: indicadorActual.hitos.map(hito => 
-          hito.idHito === hitoSeleccionado.idHito 
-            ? { ...hito, ...formData }
-            : hito
-        )
-      };
-      
-      await actualizarIndicador(hitoSeleccionado.indicadorId, indicadorActualizado);
+      // Solo se envía el hito modificado (PATCH /api/hitos/:id); campos vacíos no se tocan
+      const { comentarioHito, ...campos } = formData;
+      const cambios = Object.fromEntries(Object.entries(campos).filter(([, valor]) => valor !== ''));
+      await actualizarHito(hitoSeleccionado.indicadorId, hitoSeleccionado.idHito, cambios);
       cerrarModal();
     } catch (error) {
       console.error('Error al actualizar el hito:', error);
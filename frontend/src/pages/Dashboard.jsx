@@ -12,75 +12,57 @@ import {
   PlusCircle,
   RefreshCw
 } from 'lucide-react';
-import { useIndicadores } from '@/context/IndicadoresContext';
+import { useIndicadores, useBusquedaIndicadores } from '@/context/IndicadoresContext';
+import { indicadoresApi } from '@/lib/api';
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card';
 import { Button } from '@/components/ui/button';
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@/components/ui/select';
 
-const Dashboard = () => {
-  const { indicadores, areas } = useIndicadores();
-  const [areaSeleccionada, setAreaSeleccionada] = useState('Todas');
-  const [indicadoresFiltrados, setIndicadoresFiltrados] = useState([]);
+const ESTADISTICAS_VACIAS = {
+  totalIndicadores: 0,
+  totalHitos: 0,
+  hitosCompletados: 0,
+  hitosEnProgreso: 0,
+  hitosPorComenzar: 0,
+  promedioAvance: 0
+};
 
+const HITOS_RECIENTES = 5;
 
+const Dashboard = () => {
+  const { areas, version } = useIndicadores();
+  const [areaSeleccionada, setAreaSeleccionada] = useState('Todas');
+  const [estadisticas, setEstadisticas] = useState(null);
 
-  // Filtrar indicadores cuando cambia el área seleccionada
+  // Contadores calculados en el servidor con desglose por área (no se descargan los indicadores)
   useEffect(() => {
-    if (!Array.isArray(indicadores)) {
-      setIndicadoresFiltrados([]);
-      return;
-    }
-    
-    if (areaSeleccionada === 'Todas') {
-      setIndicadoresFiltrados(indicadores);
-    } else {
-      const filtrados = indicadores.filter(ind => ind && ind.area === areaSeleccionada);
-      setIndicadoresFiltrados(filtrados);
-    }
-  }, [indicadores, areaSeleccionada]);
+    let vigente = true;
+    indicadoresApi.getEstadisticas('area')
+      .then(data => {
+        if (vigente) setEstadisticas(data);
+      })
+      .catch(err => {
+        console.error('Error al obtener estadísticas:', err);
+        if (vigente) setEstadisticas(null);
+      });
+    return () => {
+      vigente = false;
+    };
+  }, [version]);
 
-  // Calcular estadísticas basadas en los indicadores filtrados
   const estadisticasFiltradas = React.useMemo(() => {
-    if (!Array.isArray(indicadoresFiltrados)) {
-      return {
-        totalIndicadores: 0,
-        totalHitos: 0,
-        hitosCompletados: 0,
-        hitosEnProgreso: 0,
-        hitosPorComenzar: 0,
-        promedioAvance: 0
-      };
-    }
-    
-    const todosLosHitos = indicadoresFiltrados.flatMap(ind => {
-      if (!ind || !Array.isArray(ind.hitos)) {
-        return [];
-      }
-      return ind.hitos.filter(hito => hito);
-    });
-    
-    const hitosCompletados = todosLosHitos.filter(hito => hito && hito.estadoHito === 'Completado').length;
-    const hitosEnProgreso = todosLosHitos.filter(hito => hito && hito.estadoHito === 'En Progreso').length;
-    const hitosPorComenzar = todosLosHitos.filter(hito => hito && hito.estadoHito === 'Por Comenzar').length;
-    
-    // Calcular promedio de avance con validaciones
-    const avanceTotal = todosLosHitos.reduce((sum, hito) => {
-      const avance = hito && typeof hito.avanceHito === 'number' ? hito.avanceHito : 0;
-      return sum + avance;
-    }, 0);
-    
-    const promedioAvance = todosLosHitos.length > 0 ? 
-      Math.round(avanceTotal / todosLosHitos.length * 100) / 100 : 0;
+    if (!estadisticas) return ESTADISTICAS_VACIAS;
+    if (areaSeleccionada === 'Todas') return estadisticas;
 
-    return {
-      totalIndicadores: indicadoresFiltrados.length,
-      totalHitos: todosLosHitos.length,
-      hitosCompletados,
-      hitosEnProgreso,
-      hitosPorComenzar,
-      promedioAvance
-    };
-  }, [indicadoresFiltrados]);
+    const grupo = (estadisticas.grupos || []).find(g => g.clave === areaSeleccionada);
+    return grupo || ESTADISTICAS_VACIAS;
+  }, [estadisticas, areaSeleccionada]);
+
+  // Solo la primera página del área: lo justo para los hitos recientes
+  const { indicadores: indicadoresRecientes } = useBusquedaIndicadores({
+    area: areaSeleccionada === 'Todas' ? undefined : areaSeleccionada,
+    limit: HITOS_RECIENTES
+  });
 
   const containerVariants = {
     hidden: { opacity: 0 },
@@ -105,9 +87,9 @@ const Dashboard = () => {
   };
 
   const hitosRecientes = React.useMemo(() => {
-    if (!Array.isArray(indicadoresFiltrados)) return [];
+    if (!Array.isArray(indicadoresRecientes)) return [];
     
-    return indicadoresFiltrados
+    return indicadoresRecientes
       .flatMap(indicador => {
         if (!indicador || !Array.isArray(indicador.hitos)) return [];
         
@@ -119,8 +101,8 @@ const Dashboard = () => {
             area: indicador.area || 'Sin área'
           }));
       })
-      .slice(0, 5);
-  }, [indicadoresFiltrados]);
+      .slice(0, HITOS_RECIENTES);
+  }, [indicadoresRecientes]);
 
   return (
     <div className="space-y-6">
@@ -1,42 +1,34 @@
 import React, { useMemo } from 'react';
-import { useIndicadores } from '@/context/IndicadoresContext';
+import { useIndicadores, useBusquedaIndicadores } from '@/context/IndicadoresContext';
 import { Card, CardContent } from '@/components/ui/card';
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@/components/ui/select';
 import { Filter as FilterIcon } from 'lucide-react';
 
 const GanttChart = () => {
-  const { indicadores, vps, areas } = useIndicadores();
+  const { vps, areas, obtenerAreasPorVP } = useIndicadores();
   
   // Estados para filtros (sin forzar jerarquía)
   const [vpFiltro, setVpFiltro] = React.useState('todas');
   const [areaFiltro, setAreaFiltro] = React.useState('todas');
   const [indicadorFiltro, setIndicadorFiltro] = React.useState('');
 
+  // VP y Área se filtran en el servidor
+  const { indicadores } = useBusquedaIndicadores({
+    vp: vpFiltro === 'todas' ? undefined : vpFiltro,
+    area: areaFiltro === 'todas' ? undefined : areaFiltro
+  });
+
   // Obtener áreas disponibles según VP seleccionado (opcional)
   const areasDisponibles = useMemo(() => {
-    if (vpFiltro === 'todas' || !Array.isArray(indicadores)) return areas || [];
-    
-    return [...new Set(
-      indicadores
-        .filter(ind => ind && ind.vp === vpFiltro)
-        .map(ind => ind.area)
-        .filter(Boolean)
-    )];
-  }, [vpFiltro, indicadores, areas]);
+    if (vpFiltro === 'todas') return areas || [];
+    return obtenerAreasPorVP(vpFiltro);
+  }, [vpFiltro, areas]);
 
-  // Obtener indicadores disponibles según filtros
+  // Indicadores disponibles según filtros (ya aplicados en el servidor)
   const indicadoresDisponibles = useMemo(() => {
     if (!Array.isArray(indicadores)) return [];
-    
-    return indicadores.filter(ind => {
-      if (!ind || !ind.nombreIndicador) return false;
-      
-      const cumpleVP = vpFiltro === 'todas' || ind.vp === vpFiltro;
-      const cumpleArea = areaFiltro === 'todas' || ind.area === areaFiltro;
-      
-      return cumpleVP && cumpleArea;
-    });
-  }, [indicadores, vpFiltro, areaFiltro]);
+    return indicadores.filter(ind => ind && ind.nombreIndicador);
+  }, [indicadores]);
 
   // Transformar datos para Gantt - solo hitos, sin barra del indicador
   const datosGantt = useMemo(() => {
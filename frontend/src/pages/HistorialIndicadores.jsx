@@ -1,7 +1,7 @@
 import React, { useState, useMemo } from 'react';
 import { motion } from 'framer-motion';
 import { Download, Filter, Search } from 'lucide-react';
-import { useIndicadores } from '@/context/IndicadoresContext';
+import { useIndicadores, useBusquedaIndicadores } from '@/context/IndicadoresContext';
 import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card';
 import { Button } from '@/components/ui/button';
 import { Input } from '@/components/ui/input';
@@ -10,7 +10,7 @@ import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from '@
 import { Label } from '@/components/ui/label';
 
 const HistorialIndicadores = () => {
-  const { indicadores, vps, areas, estados, exportarXLSX } = useIndicadores();
+  const { vps, obtenerAreasPorVP, exportarXLSX } = useIndicadores();
   
   // Estados para filtros jerárquicos: VP → Área → Indicador
   const [vpFiltro, setVpFiltro] = useState('');
@@ -18,26 +18,25 @@ const HistorialIndicadores = () => {
   const [indicadorFiltro, setIndicadorFiltro] = useState('');
   const [busqueda, setBusqueda] = useState('');
 
-  // Áreas filtradas basadas en VP seleccionado
+  // VP y Área se filtran en el servidor; sin VP se listan (y exportan) todos los indicadores
+  const { indicadores } = useBusquedaIndicadores({
+    vp: vpFiltro || undefined,
+    area: areaFiltro || undefined
+  });
+
+  // Áreas de la VP seleccionada
   const areasFiltradas = useMemo(() => {
-    if (!vpFiltro || !Array.isArray(indicadores)) return [];
-    
-    return [...new Set(
-      indicadores
-        .filter(ind => ind && ind.vp === vpFiltro)
-        .map(ind => ind.area)
-        .filter(Boolean) // Filtrar valores null/undefined
-    )].sort();
-  }, [indicadores, vpFiltro]);
+    if (!vpFiltro) return [];
+    return [...obtenerAreasPorVP(vpFiltro)].sort();
+  }, [vpFiltro]);
 
-  // Indicadores filtrados basados en VP y Área seleccionados
+  // Indicadores del área seleccionada (ya filtrados por VP y Área en el servidor)
   const indicadoresFiltrados = useMemo(() => {
-    if (!vpFiltro || !areaFiltro || !Array.isArray(indicadores)) return [];
+    if (!areaFiltro || !Array.isArray(indicadores)) return [];
     
-    return indicadores
-      .filter(ind => ind && ind.vp === vpFiltro && ind.area === areaFiltro)
+    return [...indicadores]
       .sort((a, b) => (a.nombreIndicador || '').localeCompare(b.nombreIndicador || ''));
-  }, [indicadores, vpFiltro, areaFiltro]);
+  }, [indicadores, areaFiltro]);
 
   // Limpiar filtros dependientes cuando cambia un filtro padre
   const handleVpChange = (nuevoVp) => {
@@ -57,13 +56,7 @@ const HistorialIndicadores = () => {
     
     let indicadoresParaMostrar = indicadores;
 
-    // Aplicar filtros jerárquicos con validaciones
-    if (vpFiltro) {
-      indicadoresParaMostrar = indicadoresParaMostrar.filter(ind => ind && ind.vp === vpFiltro);
-    }
-    if (areaFiltro) {
-      indicadoresParaMostrar = indicadoresParaMostrar.filter(ind => ind && ind.area === areaFiltro);
-    }
+    // VP y Área ya vienen filtrados del servidor; el indicador se elige dentro del área
     if (indicadorFiltro) {
       const indicadorId = parseInt(indicadorFiltro);
       if (!isNaN(indicadorId)) {
@@ -106,10 +99,10 @@ const HistorialIndicadores = () => {
         campo && typeof campo === 'string' && campo.toLowerCase().includes(terminoBusqueda)
       );
     });
-  }, [indicadores, vpFiltro, areaFiltro, indicadorFiltro, busqueda]);
+  }, [indicadores, indicadorFiltro, busqueda]);
 
   const handleExportar = () => {
-    exportarXLSX();
+    exportarXLSX(indicadores);
   };
 
   return (